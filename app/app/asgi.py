@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
 
 application = get_asgi_application()
+
+# Build caches before serving the first request
+from core.warmup import warm_up  # noqa: E402
+
+warm_up()
@@ -20,21 +20,19 @@ from django.urls import include, path
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
 from django.conf import settings
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-)
 
 from app.settings import DEBUG
+from utils.imports import lazy_view
 
 urlpatterns = [
     path("", include("core.urls")),
     path("admin/", admin.site.urls),
     path("api/docs/", RedirectView.as_view(url="/api/v1/docs/"), name="api-docs-base"),
-    path("api/v1/schema/club-manager", SpectacularAPIView.as_view(), name="api-schema"),
+    # Schema views import drf-spectacular, only when requested
+    path("api/v1/schema/club-manager", lazy_view("drf_spectacular.views.SpectacularAPIView"), name="api-schema"),
     path(
         "api/v1/docs/",
-        SpectacularSwaggerView.as_view(url_name="api-schema"),
+        lazy_view("drf_spectacular.views.SpectacularSwaggerView", url_name="api-schema"),
         name="api-docs",
     ),
 ]
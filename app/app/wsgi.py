@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
 
 application = get_wsgi_application()
+
+# Build caches before serving, in the uwsgi master before workers are forked
+from core.warmup import warm_up  # noqa: E402
+
+warm_up()
@@ -1,14 +1,11 @@
-import json
-
-from pygments import highlight
-from pygments.lexers import JsonLexer
-from pygments.formatters import HtmlFormatter
-
 from django.utils.safestring import mark_safe
 
 
 from django.contrib import admin
 
+from core.paginator import EstimatedCountPaginator
+from utils import json
+
 
 class ModelAdminBase(admin.ModelAdmin):
     """Base class for all model admins."""
@@ -17,6 +14,9 @@ class ModelAdminBase(admin.ModelAdmin):
     select_related_fields = []
     readonly_fields = ["created_at", "updated_at"]
 
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
     ###########################
     # Django method overrides #
     ###########################
@@ -40,14 +40,18 @@ class ModelAdminBase(admin.ModelAdmin):
         Reference: https://daniel.feldroy.com/posts/pretty-formatting-json-django-admin
         """
 
+        # Only needed when viewing an object
+        from pygments import highlight
+        from pygments.formatters import HtmlFormatter
+        from pygments.lexers import JsonLexer
+
         if obj is None:
             return None
-        print(obj)
 
-        if isinstance(obj, dict) or isinstance(obj, list):
-            obj = json.dumps(obj)
+        if isinstance(obj, (str, bytes)):
+            obj = json.loads(obj)
 
-        response = json.dumps(json.loads(obj), indent=2)
+        response = json.dumps(obj, indent=True).decode()
 
         formatter = HtmlFormatter(style="colorful")
 
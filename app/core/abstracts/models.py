@@ -1,46 +1,296 @@
-from typing import Any, ClassVar, Generic, MutableMapping, Optional, Self
-from django.db import models
-
+import copy
+from typing import Any, ClassVar, Generic, Iterable, Iterator, MutableMapping, Optional, Self
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.db.models import sql
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from core.cache import query_cache
+from core.identity import get_identity_map
+from core.registry import registry
+from utils.tools import chunk_list
 from utils.types import T
 
 
+class QuerySetBase(models.QuerySet, Generic[T]):
+    """Extends django queryset, keeps cached results in sync with writes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cache_ttl: Optional[int] = None
+
+    @property
+    def db_for_write(self) -> str:
+        """Database that writes for this queryset are sent to, reading it does not pin reads to the primary."""
+        return self._db or router.db_for_write(self.model, pin=False, **self._hints)
+
+    def cached(self, ttl: Optional[int] = None) -> Self:
+        """Read results from the query cache, see `core.cache`."""
+        assert query_cache.is_cacheable(self.model), f"{self.model.__name__}'s manager must set cacheable = True."
+
+        clone = self._chain()
+        clone._cache_ttl = ttl or query_cache.default_timeout
+
+        return clone
+
+    def estimated_count(self, threshold: Optional[int] = None) -> int:
+        """
+        Count rows using the planner's estimate for large unfiltered tables,
+        falls back to an exact count for filtered queries and small tables.
+
+        Parameters
+        ----------
+            - threshold (int): Tables estimated under this many rows are counted exactly,
+                defaults to settings `ESTIMATED_COUNT_THRESHOLD`.
+        """
+        if threshold is None:
+            threshold = settings.ESTIMATED_COUNT_THRESHOLD
+
+        is_filtered = self.query.where or self.query.is_sliced or self.query.distinct or self.query.combinator
+        if self._result_cache is not None or is_filtered:
+            return self.count()
+
+        estimate = self._table_estimate()
+        if estimate is not None and estimate >= threshold:
+            return estimate
+
+        return self.count()
+
+    def _table_estimate(self) -> Optional[int]:
+        """Estimated row count of the model's table, from postgres statistics."""
+        connection = connections[self.db]
+
+        if connection.vendor != "postgresql":
+            return None
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(self.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+
+        # Tables that were never vacuumed or analyzed have an estimate of -1
+        if row is None or row[0] < 0:
+            return None
+
+        return row[0]
+
+    def update(self, **kwargs) -> int:
+        rows = super().update(**kwargs)
+        query_cache.bump_model(self.model, self.db_for_write)
+
+        return rows
+
+    def delete(self) -> tuple[int, dict[str, int]]:
+        deleted, deleted_per_model = super().delete()
+
+        for label in deleted_per_model.keys():
+            query_cache.bump_model(apps.get_model(label), self.db_for_write)
+
+        return deleted, deleted_per_model
+
+    def bulk_create(self, *args, **kwargs) -> list[T]:
+        objs = super().bulk_create(*args, **kwargs)
+        query_cache.bump_model(self.model, self.db_for_write)
+
+        return objs
+
+    def bulk_update(self, *args, **kwargs) -> int:
+        rows = super().bulk_update(*args, **kwargs)
+        query_cache.bump_model(self.model, self.db_for_write)
+
+        return rows
+
+    def _clone(self) -> Self:
+        clone = super()._clone()
+        clone._cache_ttl = self._cache_ttl
+
+        return clone
+
+    def _fetch_all(self) -> None:
+        if self._result_cache is None and self._cache_ttl is not None:
+            self._result_cache = query_cache.fetch(self, self._cache_ttl)
+
+        super()._fetch_all()
+
+
 class ManagerBase(models.Manager, Generic[T]):
     """Extends django manager for improved db access."""
 
+    _queryset_class = QuerySetBase
+    _cache_ttl: Optional[int] = None
+
+    cacheable = False
+    """Whether results can be read from the query cache with `cached()`, see `core.cache`."""
+
+    bulk_batch_size = 1000
+    """Default max rows per query for bulk operations."""
+
+    returning_vendors = ("postgresql",)
+    """Database vendors that use `UPDATE/DELETE ... RETURNING` instead of separate reads."""
+
+    @property
+    def db_for_write(self) -> str:
+        """Database that writes for this manager are sent to, reading it does not pin reads to the primary."""
+        return self._db or router.db_for_write(self.model, pin=False, **self._hints)
+
+    def get_queryset(self) -> QuerySetBase[T]:
+        queryset = super().get_queryset()
+
+        if self._cache_ttl is not None:
+            return queryset.cached(self._cache_ttl)
+
+        return queryset
+
+    def cached(self, ttl: Optional[int] = None) -> Self:
+        """
+        Get manager that reads results from the query cache, see `core.cache`.
+        The manager must set `cacheable = True`.
+
+        Parameters
+        ----------
+            - ttl (int): Seconds to cache results for, defaults to settings `QUERY_CACHE["TIMEOUT"]`.
+
+        Example
+        -------
+        ```
+        User.objects.cached(ttl=300).find_by_id(1)
+        ```
+        """
+        manager = copy.copy(self)
+        manager._cache_ttl = ttl or query_cache.default_timeout
+
+        return manager
+
     def create(self, **kwargs) -> T:
         """Create new model."""
         return super().create(**kwargs)
 
+    def estimated_count(self, threshold: Optional[int] = None) -> int:
+        """Fast approximate count of all rows, see `QuerySetBase.estimated_count`."""
+        return self.get_queryset().estimated_count(threshold)
+
     def find_one(self, **kwargs) -> Optional[T]:
         """Return first model matching query, or none."""
         return self.filter_one(**kwargs)
 
     def find_by_id(self, id: int) -> Optional[T]:
         """Return model if exists."""
+        identity = get_identity_map()
+        if identity is not None and (obj := identity.get(self.model, id)) is not None:
+            return obj
+
         return self.find_one(id=id)
 
-    def find(self, **kwargs) -> Optional[T]:
-        """Return models matching kwargs, if exist."""
-        return self.filter(**kwargs)
+    def find(self, *args, **kwargs) -> Optional[T]:
+        """Return models matching Q objects and kwargs, if exist."""
+        return self.filter(*args, **kwargs)
+
+    def iter_batches(
+        self, filter: Optional[dict] = None, batch_size: Optional[int] = None, order: str = "id"
+    ) -> Iterator[list[T]]:
+        """
+        Iterate over all models matching filter in batches, using keyset pagination.
+
+        Each batch is fetched with `WHERE <order> > <last value> ORDER BY <order> LIMIT <batch_size>`,
+        so every batch costs the same no matter how deep into the table it is, and only
+        one batch is held in memory at a time.
+
+        Parameters
+        ----------
+            - filter (dict): Query to filter models by.
+            - batch_size (int): Max models per batch, defaults to `bulk_batch_size`.
+            - order (str): Field to order by, prefix with "-" for descending.
+                Must not be null, ties are ordered by pk.
+
+        Example
+        -------
+        ```
+        for users in User.objects.iter_batches({"is_active": True}, batch_size=500, order="-id"):
+            ...
+        ```
+        """
+        batch_size = batch_size or self.bulk_batch_size
+        descending = order.startswith("-")
+        field = self.model._meta.get_field(order.removeprefix("-"))
+        pk = self.model._meta.pk
+        lookup = "lt" if descending else "gt"
+
+        queryset = self.filter(**(filter or {}))
+        if field.primary_key:
+            queryset = queryset.order_by(order)
+        else:
+            queryset = queryset.order_by(order, f"-{pk.attname}" if descending else pk.attname)
 
-    def filter_one(self, **kwargs) -> Optional[T]:
-        """Find object matching any of the fields (or)."""
-        query = self.all().order_by("-id")
+        last = None
 
-        for key, value in kwargs.items():
-            res = query.filter(**{key: value})
+        while True:
+            page = queryset
 
-            if res.exists():
-                query = res
+            if last is not None and field.primary_key:
+                page = page.filter(**{f"pk__{lookup}": last.pk})
+            elif last is not None:
+                value = getattr(last, field.attname)
+                page = page.filter(
+                    models.Q(**{f"{field.attname}__{lookup}": value})
+                    | models.Q(**{field.attname: value, f"pk__{lookup}": last.pk})
+                )
 
-        if query.count() < self.count():
-            return query.first()
-        else:
+            batch = list(page[:batch_size])
+            if batch:
+                yield batch
+
+            if len(batch) < batch_size:
+                return
+
+            last = batch[-1]
+
+    def filter_one(self, **kwargs) -> Optional[T]:
+        """
+        Find object matching any of the fields (or).
+
+        Each field narrows the result if at least one of the remaining rows
+        matches it, in the order the fields are given. This is equivalent to
+        ranking rows by which fields they match (lexicographically), so the
+        lookup is done in a single query.
+        """
+        if not kwargs:
             return None
 
+        return self._remember(self._filter_one_queryset(**kwargs).first())
+
+    def _filter_one_queryset(self, **kwargs) -> models.QuerySet[T]:
+        """Build query for `filter_one`, best match is first row."""
+        conditions = [models.Q(**{key: value}) for key, value in kwargs.items()]
+        ranks = {
+            f"_match_{index}": models.Case(
+                models.When(condition, then=models.Value(1)),
+                default=models.Value(0),
+                output_field=models.IntegerField(),
+            )
+            for index, condition in enumerate(conditions)
+        }
+
+        any_match = conditions[0]
+        for condition in conditions[1:]:
+            any_match |= condition
+
+        return self.filter(any_match).alias(**ranks).order_by(*[f"-{name}" for name in ranks.keys()], "-id")
+
     def get(self, *args, **kwargs) -> T:
         """Return object matching query, throw error if not found."""
-        return super().get(*args, **kwargs)
+        identity = get_identity_map()
+        if identity is not None and not args and len(kwargs) == 1:
+            key, value = next(iter(kwargs.items()))
+
+            if key in ("id", "pk") and (obj := identity.get(self.model, value)) is not None:
+                return obj
+
+        return self._remember(super().get(*args, **kwargs))
 
     def get_by_id(self, id: int) -> T:
         """Return object with id, throw error if not found."""
@@ -51,35 +301,350 @@ class ManagerBase(models.Manager, Generic[T]):
 
     def update_one(self, id: int, **kwargs) -> Optional[T]:
         """Update model if it exists."""
-        obj = self.find_by_id(id=id)
+        kwargs = self._with_auto_now(kwargs)
+        self._forget(id)
 
-        if obj:
-            self.filter(id=id).update(**kwargs)
-            obj.refresh_from_db(using=self._db)
+        if self._can_return_rows():
+            objs = self._update_returning(self.filter(id=id), kwargs)
+            return objs[0] if objs else None
+
+        obj = self.filter(id=id).first()
+
+        if obj is None:
+            return None
+
+        self.filter(id=id).update(**kwargs)
+
+        expressions = [key for key, value in kwargs.items() if hasattr(value, "resolve_expression")]
+        for key, value in kwargs.items():
+            if key not in expressions:
+                setattr(obj, key, value)
+
+        if expressions:
+            obj.refresh_from_db(using=self.db_for_write, fields=expressions)
 
         return obj
 
     def update_many(self, query: dict, **kwargs) -> models.QuerySet[T]:
         """Update models with kwargs if they match query."""
-        self.filter(**query).update(**kwargs)
-        return self.filter(**query)
+        kwargs = self._with_auto_now(kwargs)
+        self._forget()
+
+        if self._can_return_rows():
+            pk = self.model._meta.pk
+            ids = [obj.pk for obj in self._update_returning(self.filter(**query), kwargs, fields=[pk])]
+
+            return self.filter(pk__in=ids)
+
+        using = self.db_for_write
+
+        with transaction.atomic(using=using):
+            ids = list(self.filter(**query).using(using).values_list("pk", flat=True))
+            self.filter(pk__in=ids).update(**kwargs)
+
+        return self.filter(pk__in=ids)
 
     def delete_one(self, id: int) -> Optional[T]:
         """Delete model if exists."""
-        obj = self.find_by_id(id)
+        query = self.filter(id=id)
+        self._forget(id)
+
+        if self._can_return_rows() and self._can_fast_delete(query):
+            objs = self._delete_returning(query)
+            return objs[0] if objs else None
+
+        obj = query.first()
 
         if obj:
             self.filter(id=id).delete()
 
         return obj
 
-    def delete_many(self, **kwargs) -> models.QuerySet[T]:
-        """Delete models that match query."""
-        objs = self.filter(**kwargs)
-        objs.delete()
+    def delete_many(self, batch_size: Optional[int] = None, **kwargs) -> list[int]:
+        """Delete models that match query, returns list of deleted ids."""
+        query = self.filter(**kwargs)
+        self._forget()
+
+        if self._can_return_rows() and self._can_fast_delete(query):
+            pk = self.model._meta.pk
+            return [obj.pk for obj in self._delete_returning(query, fields=[pk])]
+
+        batch_size = batch_size or self.bulk_batch_size
+
+        using = self.db_for_write
+
+        with transaction.atomic(using=using):
+            ids = list(query.using(using).values_list("pk", flat=True))
+
+            for chunk in chunk_list(ids, batch_size):
+                self.filter(pk__in=chunk).delete()
+
+        return ids
+
+    ####################
+    # Async operations #
+    ####################
+
+    async def acreate(self, **kwargs) -> T:
+        """Create new model."""
+        return await super().acreate(**kwargs)
+
+    async def afind_one(self, **kwargs) -> Optional[T]:
+        """Return first model matching query, or none."""
+        return await self.afilter_one(**kwargs)
+
+    async def afind_by_id(self, id: int) -> Optional[T]:
+        """Return model if exists."""
+        identity = get_identity_map()
+        if identity is not None and (obj := identity.get(self.model, id)) is not None:
+            return obj
+
+        return await self.afind_one(id=id)
+
+    async def afind(self, **kwargs) -> list[T]:
+        """Return list of models matching kwargs."""
+        return [obj async for obj in self.filter(**kwargs)]
+
+    async def afilter_one(self, **kwargs) -> Optional[T]:
+        """Find object matching any of the fields (or), see `filter_one`."""
+        if not kwargs:
+            return None
+
+        return self._remember(await self._filter_one_queryset(**kwargs).afirst())
+
+    async def aget(self, *args, **kwargs) -> T:
+        """Return object matching query, throw error if not found."""
+        identity = get_identity_map()
+        if identity is not None and not args and len(kwargs) == 1:
+            key, value = next(iter(kwargs.items()))
+
+            if key in ("id", "pk") and (obj := identity.get(self.model, value)) is not None:
+                return obj
+
+        return self._remember(await super().aget(*args, **kwargs))
+
+    async def aget_by_id(self, id: int) -> T:
+        """Return object with id, throw error if not found."""
+        return await self.aget(id=id)
+
+    async def aupdate_one(self, id: int, **kwargs) -> Optional[T]:
+        """Update model if it exists."""
+        return await sync_to_async(self.update_one)(id, **kwargs)
+
+    async def adelete_one(self, id: int) -> Optional[T]:
+        """Delete model if exists."""
+        return await sync_to_async(self.delete_one)(id)
+
+    ###########################
+    # RETURNING query helpers #
+    ###########################
+
+    def _can_return_rows(self) -> bool:
+        """Whether updates and deletes can return rows in the same query."""
+        return connections[self.db_for_write].vendor in self.returning_vendors and not self.model._meta.parents
+
+    def _can_fast_delete(self, query: models.QuerySet[T]) -> bool:
+        """Whether rows can be deleted directly, without cascades or signals."""
+        return Collector(using=self.db_for_write, origin=query).can_fast_delete(query)
+
+    def _update_returning(self, query: models.QuerySet[T], values: dict, fields=None) -> list[T]:
+        """Run `UPDATE ... RETURNING` for the query, build models from returned rows."""
+        update_query = query.query.chain(sql.UpdateQuery)
+        update_query.add_update_values(values)
+        update_query.annotations = {}
+
+        # Models with parents are excluded by `_can_return_rows`
+        assert not update_query.related_updates
+
+        statement, params = update_query.get_compiler(self.db_for_write).as_sql()
+
+        return self._execute_returning(statement, params, fields)
+
+    def _delete_returning(self, query: models.QuerySet[T], fields=None) -> list[T]:
+        """Run `DELETE ... RETURNING` for the query, build models from returned rows."""
+        delete_query = query.query.clone()
+        delete_query.__class__ = sql.DeleteQuery
+
+        statement, params = delete_query.get_compiler(self.db_for_write).as_sql()
+
+        return self._execute_returning(statement, params, fields)
+
+    def _execute_returning(self, statement: str, params, fields=None) -> list[T]:
+        """Execute statement with a RETURNING clause, convert rows to models."""
+        # Routing the write pins reads to the primary, like Django's own writes, see `core.routers`
+        using = self._db or router.db_for_write(self.model, **self._hints)
+        connection = connections[using]
+        fields = fields or self.model._meta.concrete_fields
+        columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+
+        with transaction.mark_for_rollback_on_error(using=using):
+            with connection.cursor() as cursor:
+                cursor.execute(f"{statement} RETURNING {columns}", params)
+                rows = cursor.fetchall()
+
+        query_cache.bump_model(self.model, using)
+
+        table = self.model._meta.db_table
+        converters = []
+        for field in fields:
+            col = field.get_col(table)
+            converters.append((col, connection.ops.get_db_converters(col) + field.get_db_converters(connection)))
+
+        attnames = [field.attname for field in fields]
+        objs = []
+
+        for row in rows:
+            values = []
+            for value, (col, field_converters) in zip(row, converters):
+                for converter in field_converters:
+                    value = converter(value, col, connection)
+                values.append(value)
+
+            objs.append(self.model.from_db(using, attnames, values))
 
         return objs
 
+    ###################
+    # Bulk operations #
+    ###################
+
+    def create_many(self, objs: Iterable[T | dict], batch_size: Optional[int] = None) -> list[T]:
+        """
+        Create models in batches, instead of one insert per model.
+
+        Parameters
+        ----------
+            - objs (list[Model | dict]): Model instances, or dicts of field values.
+            - batch_size (int): Max rows per insert, defaults to `bulk_batch_size`.
+        """
+        objs = [self._as_instance(obj) for obj in objs]
+
+        return self.bulk_create(objs, batch_size=batch_size or self.bulk_batch_size)
+
+    def upsert_many(
+        self,
+        objs: Iterable[T | dict],
+        unique_fields: list[str],
+        update_fields: Optional[list[str]] = None,
+        batch_size: Optional[int] = None,
+    ) -> list[T]:
+        """
+        Insert models, or update existing rows that conflict on unique fields.
+
+        Uses `INSERT ... ON CONFLICT DO UPDATE`, so each batch is one query.
+        Returned instances are not guaranteed to have their pk set.
+
+        Parameters
+        ----------
+            - objs (list[Model | dict]): Model instances, or dicts of field values.
+            - unique_fields (list[str]): Fields with a unique constraint to check conflicts on.
+            - update_fields (list[str]): Fields to update on conflict, required when passing instances.
+                Defaults to the keys of the dicts, except unique fields, so other columns of
+                existing rows are left as they are. `auto_now` fields are always updated.
+            - batch_size (int): Max rows per insert, defaults to `bulk_batch_size`.
+        """
+        objs = list(objs)
+
+        if update_fields is None:
+            assert all(isinstance(obj, dict) for obj in objs), "Update fields are required for instances."
+
+            opts = self.model._meta
+            supplied = dict.fromkeys(opts.get_field(key).name for obj in objs for key in obj.keys())
+            update_fields = [
+                name for name in supplied if name not in unique_fields and not opts.get_field(name).primary_key
+            ]
+
+        update_fields = list(dict.fromkeys([*update_fields, *self._auto_now_field_names()]))
+        objs = [self._as_instance(obj) for obj in objs]
+        self._forget()
+
+        if not update_fields:
+            # Nothing to update, existing rows are kept as they are
+            return self.bulk_create(objs, batch_size=batch_size or self.bulk_batch_size, ignore_conflicts=True)
+
+        return self.bulk_create(
+            objs,
+            batch_size=batch_size or self.bulk_batch_size,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+
+    def update_each(
+        self,
+        updates: dict[int, dict] | Iterable[T],
+        fields: Optional[list[str]] = None,
+        batch_size: Optional[int] = None,
+    ) -> int:
+        """
+        Update many models where each row gets different values, returns rows updated.
+
+        Parameters
+        ----------
+            - updates (dict[int, dict] | list[Model]): Mapping of id to field values,
+                or model instances with modified fields.
+            - fields (list[str]): Fields to update, required when passing instances.
+            - batch_size (int): Max rows per update, defaults to `bulk_batch_size`.
+        """
+        if isinstance(updates, dict):
+            objs = [self.model(pk=pk, **values) for pk, values in updates.items()]
+            fields = fields or list(dict.fromkeys(key for values in updates.values() for key in values))
+        else:
+            objs = list(updates)
+            assert fields is not None, "Fields must be provided when updating model instances."
+
+        if not objs:
+            return 0
+
+        self._forget()
+        now = timezone.now()
+        auto_now_fields = self._auto_now_field_names()
+
+        for obj in objs:
+            for field_name in auto_now_fields:
+                setattr(obj, field_name, now)
+
+        fields = list(dict.fromkeys([*fields, *auto_now_fields]))
+
+        return self.bulk_update(objs, fields, batch_size=batch_size or self.bulk_batch_size)
+
+    def _remember(self, obj: Optional[T]) -> Optional[T]:
+        """Add model to the active identity map."""
+        identity = get_identity_map()
+
+        if identity is not None:
+            identity.add(obj)
+
+        return obj
+
+    def _forget(self, id: Optional[int] = None) -> None:
+        """Remove model with id, or all models of this type, from the active identity map."""
+        identity = get_identity_map()
+
+        if identity is None:
+            return
+        elif id is None:
+            identity.discard_model(self.model)
+        else:
+            identity.discard(self.model, id)
+
+    def _as_instance(self, obj: T | dict) -> T:
+        """Convert dict of field values to model instance."""
+        if isinstance(obj, dict):
+            return self.model(**obj)
+
+        return obj
+
+    def _auto_now_field_names(self) -> list[str]:
+        """Fields that should be set to now on every update."""
+        return [field.name for field in self.model._meta.concrete_fields if getattr(field, "auto_now", False)]
+
+    def _with_auto_now(self, kwargs: dict) -> dict:
+        """Add `auto_now` fields to update kwargs, since `QuerySet.update` skips them."""
+        now = timezone.now()
+
+        return {**{field_name: now for field_name in self._auto_now_field_names()}, **kwargs}
+
 
 class ModelBase(models.Model):
     """Default fields for all models."""
@@ -93,13 +658,7 @@ class ModelBase(models.Model):
     def get_fields_list(cls, include_parents=True, exclude_read_only=False) -> list[str]:
         """Return a list of editable fields."""
 
-        fields = [
-            str(field.name)
-            for field in cls._meta.get_fields(include_parents=include_parents)
-            if (not exclude_read_only or (exclude_read_only and field.editable is True))
-        ]
-
-        return fields
+        return list(registry.model_fields(cls, include_parents=include_parents, exclude_read_only=exclude_read_only))
 
     def __str__(self) -> str:
         if hasattr(self, "name"):
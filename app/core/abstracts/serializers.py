@@ -1,6 +1,21 @@
-from typing import Type
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Optional, Type
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
 from django.db import models
-from rest_framework import serializers
+from django.db.models.signals import post_save, pre_save
+from django.utils.functional import cached_property
+from rest_framework import ISO_8601, serializers
+from rest_framework.exceptions import ErrorDetail, ValidationError
+from rest_framework.settings import api_settings
+from rest_framework.utils import model_meta
+from rest_framework.validators import UniqueValidator
+
+from core.cache import bump_saved_model
+from core.identity import discard_saved_model
+from core.instrumentation import timed_section
+from core.registry import SerializerMetadata, registry
+from utils.tools import chunk_list
 
 
 class ModelSerializerBase(serializers.ModelSerializer):
@@ -13,30 +28,166 @@ class ModelSerializerBase(serializers.ModelSerializer):
     created_at = serializers.DateTimeField(format=datetime_format, read_only=True, required=False, allow_null=True)
     updated_at = serializers.DateTimeField(format=datetime_format, read_only=True, required=False, allow_null=True)
 
+    sparse_options = ("fields", "omit", "expand")
+    """Init args and query params that select which fields are serialized."""
+
     class Meta:
         read_only_fields = ["id", "created_at", "updated_at"]
+        expandable_fields = {}
+        """Map field names to a serializer class, or (class, kwargs), used when the field is expanded."""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        # Subclasses define their own Meta, time list output unless set, bulk saves are opt-in
+        meta = getattr(cls, "Meta", None)
+        if meta is not None and not hasattr(meta, "list_serializer_class"):
+            meta.list_serializer_class = ListSerializerBase
+
+    def __init__(self, *args, fields=None, omit=None, expand=None, **kwargs):
+        """
+        Sparse fieldsets can be given as comma separated strings or lists, use dots for nested fields.
+        If not given, they are read from the request query params of a top level serializer:
+        `?fields=id,name,groups.name&omit=created_at&expand=groups`.
+        They only select the fields in the output, input is always validated with all fields.
+
+        Parameters
+        ----------
+            - fields (str | list[str]): Only include these fields.
+            - omit (str | list[str]): Exclude these fields.
+            - expand (str | list[str]): Replace these fields with the serializer in `Meta.expandable_fields`.
+        """
+        super().__init__(*args, **kwargs)
+        self._sparse = {"fields": fields, "omit": omit, "expand": expand}
 
     @property
     def model_class(self) -> Type[models.Model]:
         return self.Meta.model
 
     @property
-    def readable_field_names(self) -> list[str]:
+    def data(self):
+        with timed_section("serializer"):
+            return super().data
+
+    @classmethod
+    def compile_reader(cls) -> Optional["CompiledReader"]:
+        """Get fast read-only row function for this serializer, or None if its fields are not supported."""
+        return registry.reader(cls)
+
+    @classmethod
+    def read_many(cls, queryset: models.QuerySet, **kwargs) -> list[dict]:
+        """
+        Serialize models for reading, same output as `cls(queryset, many=True, **kwargs).data`.
+        Uses the compiled reader if possible, which only selects the columns it needs.
+        """
+        reader = cls(**kwargs).get_reader()
+
+        if reader is None:
+            return cls(queryset, many=True, **kwargs).data
+
+        return reader(queryset)
+
+    def get_reader(self) -> Optional["CompiledReader"]:
+        """Compiled reader for this serializer's fields, including sparse fieldsets."""
+        if not self.is_sparse:
+            return self.compile_reader()
+
+        return CompiledReader.compile(self) if registry.is_cacheable(type(self)) else None
+
+    def get_sparse_options(self) -> dict[str, list[str]]:
+        """Sparse fieldset options from init args, or request query params for top level serializers."""
+        options = {}
+        request = self.context.get("request")
+        is_root = self.parent is None or (
+            isinstance(self.parent, serializers.ListSerializer) and self.parent.parent is None
+        )
+        params = getattr(request, "query_params", None) if is_root else None
+
+        for key in self.sparse_options:
+            value = self._sparse.get(key)
+            if value is None and params is not None:
+                value = params.get(key)
+            if isinstance(value, str):
+                value = value.split(",")
+
+            options[key] = [path.strip() for path in value or [] if path.strip()]
+
+        return options
+
+    @cached_property
+    def output_fields(self) -> dict[str, serializers.Field]:
+        """Fields to serialize, after applying sparse fieldset options to `fields`."""
+        fields = dict(self.fields)
+        options = self.get_sparse_options()
+        self._is_sparse = any(options.values())
+
+        if not self._is_sparse:
+            return fields
+
+        requested, requested_nested = split_field_paths(options["fields"])
+        _, omitted_nested = split_field_paths(options["omit"])
+        expanded, expanded_nested = split_field_paths(options["expand"])
+        omitted = {path for path in options["omit"] if "." not in path}
+        expandable = getattr(self.Meta, "expandable_fields", {})
+
+        for name in expanded:
+            if name not in expandable:
+                continue
+
+            option = expandable[name]
+            serializer_class, kwargs = option if isinstance(option, tuple) else (option, {})
+            fields[name] = serializer_class(read_only=True, **kwargs)
+            fields[name].bind(name, self)
+
+        for name in list(fields.keys()):
+            if (requested and name not in requested) or name in omitted:
+                del fields[name]
+                continue
+
+            nested = fields[name].child if isinstance(fields[name], serializers.ListSerializer) else fields[name]
+            if isinstance(nested, ModelSerializerBase):
+                nested._sparse = {
+                    "fields": requested_nested.get(name),
+                    "omit": omitted_nested.get(name),
+                    "expand": expanded_nested.get(name),
+                }
+
+        return fields
+
+    @property
+    def _readable_fields(self):
+        for field in self.output_fields.values():
+            if not field.write_only:
+                yield field
+
+    @property
+    def is_sparse(self) -> bool:
+        """Whether fields were limited or expanded with sparse fieldset options."""
+        self.output_fields
+        return self._is_sparse
+
+    @property
+    def metadata(self) -> SerializerMetadata:
+        """Precomputed field names for this serializer class, see `core.registry`."""
+        return registry.serializer(self)
+
+    @property
+    def readable_field_names(self) -> tuple[str, ...]:
         """Get list of all fields in serializer that can be read."""
 
-        return [key for key in self.get_fields().keys()]
+        return self.metadata.readable_field_names
 
     @property
-    def writable_field_names(self) -> list[str]:
+    def writable_field_names(self) -> tuple[str, ...]:
         """Get list of all fields that can be written to."""
 
-        return [key for key, value in self.get_fields().items() if value.read_only is False]
+        return self.metadata.writable_field_names
 
     @property
-    def readonly_field_names(self) -> list[str]:
+    def readonly_field_names(self) -> tuple[str, ...]:
         """Get list of all fields that can only be read, not written."""
 
-        return [key for key, value in self.get_fields().items() if value.read_only is True]
+        return self.metadata.readonly_field_names
 
     @property
     def required_field_names(self) -> list[str]:
@@ -45,31 +196,372 @@ class ModelSerializerBase(serializers.ModelSerializer):
         return [key for key, value in self.fields.items() if value.required is True and value.read_only is False]
 
     @property
-    def unique_field_names(self) -> list[str]:
+    def unique_field_names(self) -> tuple[str, ...]:
         """Get list of all fields that can be used to unique identify models."""
 
-        model_fields = self.model_class._meta.get_fields()
-        unique_fields = [
-            field for field in model_fields if getattr(field, "primary_key", False) or getattr(field, "_unique", False)
-        ]
-        unique_field_names = [field.name for field in unique_fields]
-
-        return [field for field in self.readable_field_names if field in unique_field_names]
+        return self.metadata.unique_field_names
 
     @property
-    def related_field_names(self) -> list[str]:
+    def related_field_names(self) -> tuple[str, ...]:
         """List of fields that inherit RelatedField, representing foreign key relations."""
 
-        return [key for key, value in self.get_fields().items() if isinstance(value, serializers.RelatedField)]
+        return self.metadata.related_field_names
 
     @property
-    def many_related_field_names(self) -> list[str]:
+    def many_related_field_names(self) -> tuple[str, ...]:
         """List of fields that inherit ManyRelatedField, representing M2M relations."""
 
-        return [key for key, value in self.get_fields().items() if isinstance(value, serializers.ManyRelatedField)]
+        return self.metadata.many_related_field_names
 
     @property
-    def any_related_field_names(self) -> list[str]:
+    def any_related_field_names(self) -> tuple[str, ...]:
         """List of fields that are single or many related."""
 
-        return self.related_field_names + self.many_related_field_names
+        return self.metadata.any_related_field_names
+
+
+class ListSerializerBase(serializers.ListSerializer):
+    """Default list serializer for `ModelSerializerBase`, saves each item with the child serializer."""
+
+    @property
+    def data(self):
+        with timed_section("serializer"):
+            return super().data
+
+
+BULK_SAFE_RECEIVERS = (bump_saved_model, discard_saved_model)
+"""Save receivers of core, bulk saves invalidate the query cache and identity map themselves."""
+
+
+def has_save_receivers(model: Type[models.Model]) -> bool:
+    """Whether model has `pre_save` or `post_save` receivers that bulk saves would skip."""
+    return any(
+        receiver not in BULK_SAFE_RECEIVERS
+        for signal in (pre_save, post_save)
+        for receiver in signal._live_receivers(model)
+    )
+
+
+class ModelListSerializerBase(ListSerializerBase):
+    """
+    List serializer for `ModelSerializerBase`, used with `many=True` when set as
+    the serializer's `Meta.list_serializer_class`.
+
+    Unique fields are validated for the whole list with one `IN` query per field,
+    and values repeated within the list are errors. Models are saved with
+    `bulk_create` or `bulk_update`, unless the data has to-many relations, the
+    child serializer overrides `create` or `update`, or the model overrides `save()`
+    or has save signal receivers, which bulk saves would skip.
+
+    Updates take the models to update as `instance`, each item is matched by its "id".
+    """
+
+    batch_size: Optional[int] = None
+    """Max rows per insert or update, defaults to the manager's `bulk_batch_size`."""
+
+    lookup_batch_size = 1000
+    """Max values in each unique `IN` query."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._child_results: list[tuple[Optional[dict], Optional[models.Model]]] = []
+        self._validated_instances: list[Optional[models.Model]] = []
+
+    @property
+    def model_class(self) -> Type[models.Model]:
+        return self.child.Meta.model
+
+    @cached_property
+    def instance_map(self) -> dict:
+        """Models being updated by pk."""
+        return {obj.pk: obj for obj in self.instance} if self.instance is not None else {}
+
+    def get_unique_validators(self) -> dict[str, UniqueValidator]:
+        """Exact unique validators for the child's writable unique fields, by field name."""
+        validators = {}
+
+        for name in self.child.unique_field_names:
+            field = self.child.fields.get(name)
+            if field is None or field.read_only or len(field.source_attrs) != 1:
+                continue
+
+            for validator in field.validators:
+                if isinstance(validator, UniqueValidator) and validator.lookup == "exact":
+                    validators[name] = validator
+
+        return validators
+
+    def run_child_validation(self, data):
+        instance = None
+
+        if self.instance is not None:
+            pk = data.get("id") if isinstance(data, dict) else None
+            try:
+                instance = self.instance_map.get(self.model_class._meta.pk.to_python(pk))
+            except DjangoValidationError:
+                instance = None
+
+            if instance is None:
+                message = serializers.PrimaryKeyRelatedField.default_error_messages["does_not_exist"]
+                raise ValidationError({"id": [message.format(pk_value=pk)]}, code="does_not_exist")
+
+            self.child.instance = instance
+            self.child.initial_data = data
+
+        try:
+            validated = super().run_child_validation(data)
+        except ValidationError:
+            self._child_results.append((None, instance))
+            raise
+
+        self._child_results.append((validated, instance))
+        return validated
+
+    def to_internal_value(self, data):
+        validators = self.get_unique_validators()
+        fields = {name: self.child.fields[name] for name in validators}
+        original_validators = {name: field.validators for name, field in fields.items()}
+        self._child_results = []
+
+        # Unique fields are validated for all items at once below
+        for name, field in fields.items():
+            field.validators = [validator for validator in field.validators if validator is not validators[name]]
+
+        try:
+            try:
+                super().to_internal_value(data)
+                errors = [{} for _ in self._child_results]
+            except ValidationError as exc:
+                if not isinstance(exc.detail, list):
+                    raise
+
+                errors = exc.detail
+        finally:
+            for name, field in fields.items():
+                field.validators = original_validators[name]
+            self.child.instance = None
+
+        for index, field_errors in self.validate_unique_batch(validators).items():
+            errors[index] = {**errors[index], **field_errors}
+
+        if any(errors):
+            raise ValidationError(errors)
+
+        self._validated_instances = [instance for _, instance in self._child_results]
+        return [validated for validated, _ in self._child_results]
+
+    def validate_unique_batch(self, validators: dict[str, UniqueValidator]) -> dict[int, dict]:
+        """Check unique fields of all validated items, returns errors by item index."""
+        errors: dict[int, dict] = defaultdict(dict)
+
+        for name, validator in validators.items():
+            source = self.child.fields[name].source
+            indexes_by_value: dict = defaultdict(list)
+
+            for index, (validated, _) in enumerate(self._child_results):
+                if validated is not None and validated.get(source) is not None:
+                    indexes_by_value[validated[source]].append(index)
+
+            existing = {}
+            for values in chunk_list(indexes_by_value.keys(), self.lookup_batch_size):
+                existing.update(validator.queryset.filter(**{f"{source}__in": values}).values_list(source, "pk"))
+
+            for value, indexes in indexes_by_value.items():
+                for position, index in enumerate(indexes):
+                    instance = self._child_results[index][1]
+                    conflicts = value in existing and (instance is None or existing[value] != instance.pk)
+
+                    if conflicts or position > 0:
+                        errors[index][name] = [ErrorDetail(str(validator.message), code="unique")]
+
+        return errors
+
+    def can_bulk_save(self, validated_data: list[dict], method: str) -> bool:
+        """Whether items can be saved in bulk, instead of with the child's `create` or `update`."""
+        if getattr(type(self.child), method) is not getattr(serializers.ModelSerializer, method):
+            return False
+        elif self.model_class._meta.parents:
+            return False
+        elif self.model_class.save is not models.Model.save or has_save_receivers(self.model_class):
+            return False
+
+        relations = model_meta.get_field_info(self.model_class).relations
+        return not any(key in relations and relations[key].to_many for attrs in validated_data for key in attrs.keys())
+
+    def create(self, validated_data):
+        if not self.can_bulk_save(validated_data, "create"):
+            return super().create(validated_data)
+
+        manager = self.model_class._default_manager
+        objs = [self.model_class(**attrs) for attrs in validated_data]
+
+        if hasattr(manager, "create_many"):
+            return manager.create_many(objs, batch_size=self.batch_size)
+
+        return manager.bulk_create(objs, batch_size=self.batch_size)
+
+    def update(self, instance, validated_data):
+        objs = self._validated_instances
+
+        if not self.can_bulk_save(validated_data, "update"):
+            return [self.child.update(obj, attrs) for obj, attrs in zip(objs, validated_data)]
+
+        for obj, attrs in zip(objs, validated_data):
+            for key, value in attrs.items():
+                setattr(obj, key, value)
+
+        manager = self.model_class._default_manager
+        fields = list(dict.fromkeys(key for attrs in validated_data for key in attrs.keys()))
+
+        if fields and hasattr(manager, "update_each"):
+            manager.update_each(objs, fields=fields, batch_size=self.batch_size)
+        elif fields:
+            manager.bulk_update(objs, fields, batch_size=self.batch_size)
+
+        return objs
+
+
+def split_field_paths(paths: Iterable[str]) -> tuple[set[str], dict[str, list[str]]]:
+    """Split dotted field paths into top level names, and remaining paths for each name."""
+    names, nested = set(), defaultdict(list)
+
+    for path in paths:
+        name, _, rest = path.partition(".")
+        names.add(name)
+
+        if rest:
+            nested[name].append(rest)
+
+    return names, dict(nested)
+
+
+class CompiledReader:
+    """
+    Flat row function compiled from a serializer, for read-only list endpoints.
+
+    Instead of loading models and running each field's `get_attribute` and
+    `to_representation`, only the needed columns are selected with `values_list`
+    and converted directly. Supports model fields and primary key related fields,
+    serializers with other fields (nested, method, many related, dotted sources)
+    are not compiled.
+    """
+
+    identity_types = {
+        serializers.CharField: str,
+        serializers.EmailField: str,
+        serializers.IntegerField: int,
+        serializers.BooleanField: bool,
+    }
+    """Fields that return values of these types unchanged."""
+
+    def __init__(self, field_names: list[str], columns: list[str], converters: list[Callable]):
+        self.field_names = field_names
+        self.columns = columns
+        self.converters = converters
+
+    @classmethod
+    def compile(cls, serializer: serializers.ModelSerializer) -> Optional["CompiledReader"]:
+        if type(serializer).to_representation is not serializers.Serializer.to_representation:
+            return None
+
+        model = serializer.Meta.model
+        field_names, columns, converters = [], [], []
+
+        for field in serializer._readable_fields:
+            compiled = cls._compile_field(model, field)
+            if compiled is None:
+                return None
+
+            field_names.append(field.field_name)
+            columns.append(compiled[0])
+            converters.append(compiled[1])
+
+        return cls(field_names, columns, converters)
+
+    @classmethod
+    def _compile_field(cls, model: Type[models.Model], field: serializers.Field):
+        """Get column and converter factory for field, or None if not supported."""
+        if field.source == "*" or len(field.source_attrs) != 1:
+            return None
+
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+
+        if not model_field.concrete:
+            return None
+
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            field_class = type(field)
+            is_default = (
+                field_class.get_attribute is serializers.RelatedField.get_attribute
+                and field_class.to_representation is serializers.PrimaryKeyRelatedField.to_representation
+            )
+            if not is_default or field.pk_field is not None or not model_field.many_to_one:
+                return None
+
+            return model_field.attname, lambda: None
+
+        is_plain_field = not isinstance(
+            field, (serializers.RelatedField, serializers.ManyRelatedField, serializers.BaseSerializer)
+        ) and (type(field).get_attribute is serializers.Field.get_attribute)
+
+        if not is_plain_field or model_field.is_relation:
+            return None
+
+        if isinstance(field, serializers.DateTimeField):
+            return model_field.attname, lambda: cls._datetime_converter(field)
+
+        identity_type = cls.identity_types.get(type(field))
+        if identity_type is not None:
+            to_representation = field.to_representation
+            return model_field.attname, lambda: (
+                lambda value: value if type(value) is identity_type else to_representation(value)
+            )
+
+        return model_field.attname, lambda: field.to_representation
+
+    @staticmethod
+    def _datetime_converter(field: serializers.DateTimeField) -> Callable:
+        """
+        Format datetimes, resolving the output timezone and format once per
+        batch instead of once per value.
+        """
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        if output_format is None or output_format.lower() == ISO_8601:
+            return field.to_representation
+
+        field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+        if field_timezone is None:
+            return field.to_representation
+
+        def convert(value):
+            if type(value) is datetime and value.tzinfo is not None:
+                return value.astimezone(field_timezone).strftime(output_format)
+
+            return field.to_representation(value)
+
+        return convert
+
+    def __call__(self, queryset: models.QuerySet) -> list[dict]:
+        return self.convert_rows(self.get_rows(queryset))
+
+    def iterate(self, queryset: models.QuerySet, chunk_size: int = 2000) -> Iterator[list[dict]]:
+        """Yield serialized chunks, rows are read with a server side cursor if the database supports it."""
+        for rows in chunk_list(self.get_rows(queryset).iterator(chunk_size=chunk_size), chunk_size):
+            yield self.convert_rows(rows)
+
+    def get_rows(self, queryset: models.QuerySet) -> models.QuerySet:
+        return queryset.prefetch_related(None).values_list(*self.columns)
+
+    def convert_rows(self, rows: Iterable[tuple]) -> list[dict]:
+        pairs = list(zip(self.field_names, [factory() for factory in self.converters]))
+
+        return [
+            {
+                name: value if value is None or convert is None else convert(value)
+                for (name, convert), value in zip(pairs, row)
+            }
+            for row in rows
+        ]
@@ -1,21 +1,134 @@
-from typing import Generic
+from typing import Generic, Iterable, Optional, Self
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
 
 from core.abstracts.models import ModelBase
+from core.identity import get_identity_map
 from utils.types import T
 
+_NOT_LOADED = object()
+
 
 class ServiceBase(Generic[T]):
     model = ModelBase
     obj: T
 
     str_lookup = "id"
+    lazy = False
+    """Load obj on first access instead of on init, can be overridden per service with `lazy=`."""
 
-    def __init__(self, obj: T | int | str) -> None:
-        if isinstance(obj, int) or (isinstance(obj, str) and obj.isnumeric()):
-            obj = self.model.objects.find_by_id(obj)
-        elif isinstance(obj, str):
-            obj = self.model.objects.find_one(**{self.str_lookup: obj})
+    def __init__(self, obj: T | int | str, lazy: Optional[bool] = None) -> None:
+        self._key = None
+        self._obj = obj
 
-        self.obj = obj
+        if isinstance(obj, (int, str)):
+            self._key = obj
+            self._obj = _NOT_LOADED if (self.lazy if lazy is None else lazy) else self.resolve(obj)
 
         super().__init__()
+
+    @property
+    def obj(self) -> T:
+        if self._obj is _NOT_LOADED:
+            self._obj = self.resolve(self._key)
+
+        return self._obj
+
+    @obj.setter
+    def obj(self, value: T):
+        self._obj = value
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether obj has been fetched, always true unless service is lazy."""
+        return self._obj is not _NOT_LOADED
+
+    @classmethod
+    def is_id(cls, key: int | str) -> bool:
+        return isinstance(key, int) or (isinstance(key, str) and key.isnumeric())
+
+    @classmethod
+    def resolve(cls, key: int | str) -> Optional[T]:
+        """Find model by id, or by `str_lookup` for non numeric strings."""
+        if cls.is_id(key):
+            return cls.model.objects.find_by_id(key)
+
+        return cls.model.objects.find_one(**{cls.str_lookup: key})
+
+    @classmethod
+    def get_lookup_attname(cls) -> Optional[str]:
+        """Model attribute holding the `str_lookup` value, None if the lookup spans relations."""
+        try:
+            return cls.model._meta.get_field(cls.str_lookup).attname
+        except FieldDoesNotExist:
+            return None
+
+    @classmethod
+    def many(cls, keys: Iterable[T | int | str]) -> list[Self]:
+        """
+        Create services for many ids, lookup strings, or models, in the same order.
+        Objects are loaded with one query, ids or lookups that don't exist have obj None.
+        Lookups that span relations are resolved one at a time.
+        """
+        keys = list(keys)
+        ids = {int(key) for key in keys if cls.is_id(key)}
+        lookups = {key for key in keys if isinstance(key, str) and not cls.is_id(key)}
+        lookup_attname = cls.get_lookup_attname()
+
+        objs_by_id, objs_by_lookup = {}, {}
+        identity = get_identity_map()
+
+        if lookups and lookup_attname is None:
+            objs_by_lookup = {key: cls.resolve(key) for key in lookups}
+            lookups = set()
+
+        if identity is not None:
+            for id in list(ids):
+                if (obj := identity.get(cls.model, id)) is not None:
+                    objs_by_id[id] = obj
+                    ids.discard(id)
+
+        if ids or lookups:
+            query = models.Q(pk__in=ids)
+            if lookups:
+                query |= models.Q(**{f"{cls.str_lookup}__in": lookups})
+
+            for obj in cls.model.objects.find(query):
+                objs_by_id[obj.pk] = obj
+                if lookups:
+                    objs_by_lookup[str(getattr(obj, lookup_attname))] = obj
+
+                if identity is not None:
+                    identity.add(obj)
+
+        services = []
+        for key in keys:
+            if cls.is_id(key):
+                obj = objs_by_id.get(int(key))
+            elif isinstance(key, str):
+                obj = objs_by_lookup.get(key)
+            else:
+                obj = key
+
+            service = cls(obj)
+            service._key = key
+            services.append(service)
+
+        return services
+
+    @classmethod
+    async def aload(cls, obj: T | int | str) -> Self:
+        """Create service in an async context, resolving obj with the async ORM."""
+        if cls.is_id(obj):
+            obj = await cls.model.objects.afind_by_id(obj)
+        elif isinstance(obj, str):
+            obj = await cls.model.objects.afind_one(**{cls.str_lookup: obj})
+
+        return cls(obj)
+
+    @classmethod
+    async def amany(cls, keys: Iterable[T | int | str]) -> list[Self]:
+        """Create services for many keys in an async context, see `many`."""
+        return await sync_to_async(cls.many)(list(keys))
@@ -1,6 +1,9 @@
 import os
+from typing import Any, Callable, Iterable
 from django import forms
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import serializers
 from rest_framework.status import HTTP_200_OK
@@ -52,6 +55,24 @@ class TestsBase(TestCase):
 
         self.assertTrue(os.path.exists(path), f"File does not exist at {path}.")
 
+    def assertConstantQueries(self, func: Callable[[int], Any], sizes: Iterable[int] = (1, 10), num=None):
+        """
+        Calling `func(size)` should run the same number of queries for every size,
+        for example fetching pages of different sizes. Optionally checks the number.
+        """
+        counts = {}
+
+        for size in sizes:
+            with CaptureQueriesContext(connection) as context:
+                func(size)
+
+            counts[size] = len(context.captured_queries)
+
+        self.assertEqual(len(set(counts.values())), 1, f"Query count changes with size: {counts}.")
+
+        if num is not None:
+            self.assertEqual(list(counts.values())[0], num, f"Expected {num} queries, got {counts}.")
+
     def assertValidSerializer(self, serializer: serializers.Serializer):
         """Check `.is_valid()` function on serializer, prints errors if invalid."""
 
@@ -0,0 +1,74 @@
+"""
+Abstract viewset utilities.
+"""
+
+from typing import Optional
+
+from rest_framework.permissions import SAFE_METHODS
+
+from core.optimizer import optimize_queryset
+from core.streaming import STREAM_RENDERERS, NDJSONStreamRenderer, stream_response
+
+
+class OptimizedQuerySetMixin:
+    """
+    Applies the `select_related`, `prefetch_related` and `.only()` calls
+    needed by the viewset's serializer to `get_queryset`, see `core.optimizer`.
+
+    Column limits are only applied for read requests, since models loaded
+    for writes are saved by the serializer.
+    """
+
+    optimize_queryset = True
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        if not self.optimize_queryset:
+            return queryset
+
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        request = getattr(self, "request", None)
+        limit_columns = request is None or request.method in SAFE_METHODS
+
+        return optimize_queryset(queryset, serializer, limit_columns=limit_columns)
+
+
+class StreamingListMixin:
+    """
+    Stream list responses without pagination, see `core.streaming`.
+
+    Enabled with `?stream=json` or `?stream=ndjson`, or an `Accept: application/x-ndjson` header.
+    """
+
+    stream_param = "stream"
+    stream_chunk_size = 2000
+
+    def get_stream_format(self, request) -> Optional[str]:
+        stream_format = request.query_params.get(self.stream_param)
+
+        if stream_format in STREAM_RENDERERS:
+            return stream_format
+        elif NDJSONStreamRenderer.media_type in request.headers.get("Accept", ""):
+            return NDJSONStreamRenderer.format
+
+        return None
+
+    def perform_content_negotiation(self, request, force=False):
+        # Streamed responses are not rendered by the api renderers
+        force = force or self.get_stream_format(request) is not None
+        return super().perform_content_negotiation(request, force=force)
+
+    def list(self, request, *args, **kwargs):
+        stream_format = self.get_stream_format(request)
+
+        if stream_format is None:
+            return super().list(request, *args, **kwargs)
+
+        return stream_response(
+            self.filter_queryset(self.get_queryset()),
+            self.get_serializer_class(),
+            format=stream_format,
+            context=self.get_serializer_context(),
+            chunk_size=self.stream_chunk_size,
+        )
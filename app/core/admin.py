@@ -0,0 +1,39 @@
+"""
+Core admin config.
+"""
+
+from django.contrib import admin
+
+from core.abstracts.admin import ModelAdminBase
+from core.models import QueryProfile, TaskRecord
+
+
+class TaskRecordAdmin(ModelAdminBase):
+    """Inspect queued tasks in admin dashboard."""
+
+    list_display = ("name", "queue", "status", "attempts", "run_at", "finished_at")
+    list_filter = ("status", "queue")
+    search_fields = ("name",)
+    ordering = ("-run_at",)
+    # Workers run the stored name with the stored args, so they can't be changed here
+    readonly_fields = ModelAdminBase.readonly_fields + [
+        "name",
+        "args",
+        "kwargs",
+        "started_at",
+        "finished_at",
+        "locked_by",
+    ]
+
+
+class QueryProfileAdmin(ModelAdminBase):
+    """Inspect queries recorded by the SQL profiler in admin dashboard."""
+
+    list_display = ("__str__", "calls", "total_ms", "max_ms", "updated_at")
+    search_fields = ("sql",)
+    ordering = ("-total_ms",)
+    readonly_fields = ModelAdminBase.readonly_fields + ["fingerprint", "sql", "calls", "total_ms", "max_ms", "plan"]
+
+
+admin.site.register(TaskRecord, TaskRecordAdmin)
+admin.site.register(QueryProfile, QueryProfileAdmin)
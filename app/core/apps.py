@@ -1,6 +1,20 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
 
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from core import cache, checks, identity  # noqa: F401
+        from core.abstracts.models import ModelBase
+        from core.registry import registry
+
+        for model in apps.get_models():
+            if issubclass(model, ModelBase):
+                identity.install_descriptors(model)
+
+            if any(getattr(manager, "cacheable", False) for manager in model._meta.managers):
+                cache.query_cache.register_model(model)
+
+        registry.populate()
@@ -0,0 +1,380 @@
+"""
+Performance benchmarks, run with `python manage.py benchmark <name>`.
+
+Benchmarks run against the configured database, and return a dict of
+results that the command prints.
+"""
+
+import asyncio
+import json as stdlib_json
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from typing import Callable
+
+from django.conf import settings
+from django.db import transaction
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from core.abstracts.serializers import ModelSerializerBase
+from core.renderers import JsonResponse
+from core.streaming import stream_response
+from utils import json
+from users.models import User
+
+BENCHMARKS: dict[str, Callable[..., dict]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark function by name."""
+
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+@contextmanager
+def benchmark_users(rows: int):
+    """Create users in a transaction that is rolled back, yields a queryset of the users."""
+    with transaction.atomic():
+        User.objects.create_many(
+            [User(email=f"benchmark-{i}@example.com", first_name="Bench", last_name=str(i)) for i in range(rows)]
+        )
+        yield User.objects.filter(email__startswith="benchmark-").order_by("id")
+        transaction.set_rollback(True)
+
+
+def timed(func: Callable, *args, **kwargs) -> tuple[float, object]:
+    """Run function, return seconds taken and result."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+
+    return time.perf_counter() - start, result
+
+
+################
+# ASGI vs WSGI #
+################
+
+
+def user_detail(request, id: int):
+    user = User.objects.find_by_id(id)
+    return JsonResponse({"id": user.id if user else None})
+
+
+async def auser_detail(request, id: int):
+    user = await User.objects.afind_by_id(id)
+    return JsonResponse({"id": user.id if user else None})
+
+
+urlpatterns = [
+    path("sync/<int:id>/", user_detail),
+    path("async/<int:id>/", auser_detail),
+]
+"""Views used for benchmarking request handlers."""
+
+
+@benchmark("asgi")
+def asgi_throughput(requests: int = 500, concurrency: int = 50) -> dict:
+    """
+    Compare throughput of concurrent requests for a view doing one lookup,
+    as a sync view under WSGI (one thread per worker, like uwsgi) and as an
+    async view under ASGI (one event loop).
+
+    Handlers are run in process, without a server in front.
+    """
+    user = User.objects.first()
+    user_id = user.id if user else 0
+
+    def wsgi_run():
+        def request(_):
+            return Client().get(f"/sync/{user_id}/").status_code
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(request, range(requests)))
+
+    def asgi_run():
+        async def run():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def request():
+                async with semaphore:
+                    return (await client.get(f"/async/{user_id}/")).status_code
+
+            return await asyncio.gather(*[request() for _ in range(requests)])
+
+        return asyncio.run(run())
+
+    with override_settings(ROOT_URLCONF=__name__, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        wsgi_seconds, _ = timed(wsgi_run)
+        asgi_seconds, _ = timed(asgi_run)
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "wsgi_requests_per_second": round(requests / wsgi_seconds, 1),
+        "asgi_requests_per_second": round(requests / asgi_seconds, 1),
+    }
+
+
+########################
+# Compiled serializers #
+########################
+
+
+class UserReadSerializer(ModelSerializerBase):
+    """Flat user serializer used for benchmarking."""
+
+    created_at = serializers.DateTimeField(
+        source="date_joined", format=ModelSerializerBase.datetime_format, read_only=True
+    )
+    updated_at = serializers.DateTimeField(
+        source="date_modified", format=ModelSerializerBase.datetime_format, read_only=True
+    )
+
+    class Meta:
+        model = User
+        fields = ["id", "email", "first_name", "last_name", "is_staff", "is_active", "created_at", "updated_at"]
+
+
+@benchmark("serializer")
+def serializer_throughput(rows: int = 5000, rounds: int = 3) -> dict:
+    """
+    Compare rows per second serializing a user list with the normal
+    serializer and the compiled reader, rendered output must be identical.
+
+    Test users are created in a transaction that is rolled back.
+    """
+    with benchmark_users(rows) as queryset:
+        stock_seconds, stock = min(
+            (timed(lambda: UserReadSerializer(queryset.all(), many=True).data) for _ in range(rounds)),
+            key=lambda result: result[0],
+        )
+        compiled_seconds, compiled = min(
+            (timed(UserReadSerializer.read_many, queryset.all()) for _ in range(rounds)),
+            key=lambda result: result[0],
+        )
+
+        identical = JSONRenderer().render(stock) == JSONRenderer().render(compiled)
+
+    return {
+        "rows": rows,
+        "identical_output": identical,
+        "stock_rows_per_second": round(rows / stock_seconds, 1),
+        "compiled_rows_per_second": round(rows / compiled_seconds, 1),
+        "speedup": round(stock_seconds / compiled_seconds, 2),
+    }
+
+
+#######################
+# Streaming responses #
+#######################
+
+
+@benchmark("stream")
+def stream_memory(rows: int = 20000, chunk_size: int = 2000) -> dict:
+    """
+    Compare peak memory and time to first byte of a user list rendered
+    in one response and streamed in chunks.
+
+    Test users are created in a transaction that is rolled back.
+    """
+
+    def full_run():
+        content = JSONRenderer().render(UserReadSerializer(queryset.all(), many=True).data)
+        return len(content), 0.0
+
+    def stream_run():
+        start = time.perf_counter()
+        first_byte, size = None, 0
+
+        for content in stream_response(queryset.all(), UserReadSerializer, chunk_size=chunk_size).streaming_content:
+            first_byte = first_byte or time.perf_counter() - start
+            size += len(content)
+
+        return size, first_byte
+
+    results = {"rows": rows, "chunk_size": chunk_size}
+
+    with benchmark_users(rows) as queryset:
+        for name, func in (("full", full_run), ("stream", stream_run)):
+            tracemalloc.start()
+            seconds, (size, first_byte) = timed(func)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[f"{name}_bytes"] = size
+            results[f"{name}_seconds"] = round(seconds, 3)
+            results[f"{name}_first_byte_ms"] = round((first_byte or seconds) * 1000, 1)
+            results[f"{name}_peak_memory_mb"] = round(peak / 1024 / 1024, 2)
+
+    return results
+
+
+#################
+# JSON encoding #
+#################
+
+
+def json_payload(rows: int) -> list[dict]:
+    """List response with the value types api responses usually contain."""
+    now = timezone.now()
+
+    return [
+        {
+            "id": i,
+            "uuid": uuid.uuid4(),
+            "email": f"user{i}@example.com",
+            "name": "Ünïcode Üser",
+            "is_active": i % 2 == 0,
+            "score": i * 1.5,
+            "balance": Decimal("10.25"),
+            "label": gettext_lazy("Active"),
+            "created_at": now - timedelta(days=i),
+            "tags": ["a", "b", "c"],
+            "profile": {"bio": None, "links": [{"url": "https://example.com", "clicks": i}]},
+        }
+        for i in range(rows)
+    ]
+
+
+@benchmark("json")
+def json_throughput(rows: int = 1000, rounds: int = 20) -> dict:
+    """Compare encode and decode throughput of each installed JSON backend."""
+    payload = json_payload(rows)
+    results = {"rows": rows, "default_backend": json.get_backend().name}
+
+    for name, backend in json.BACKENDS.items():
+        encode_seconds = min(timed(backend.dumps, payload)[0] for _ in range(rounds))
+        encoded = backend.dumps(payload)
+        decode_seconds = min(timed(backend.loads, encoded)[0] for _ in range(rounds))
+
+        results[f"{name}_encode_mb_per_second"] = round(len(encoded) / encode_seconds / 1024 / 1024, 1)
+        results[f"{name}_decode_mb_per_second"] = round(len(encoded) / decode_seconds / 1024 / 1024, 1)
+
+    return results
+
+
+##################
+# Request timing #
+##################
+
+
+@benchmark("instrumentation")
+def instrumentation_overhead(requests: int = 1000, rounds: int = 5) -> dict:
+    """
+    Compare time per request for a view doing one lookup, with and without
+    `RequestTimingMiddleware`, overhead should stay within a few percent.
+
+    Rounds alternate between the two so both see the same system noise.
+    """
+    user = User.objects.first()
+    user_id = user.id if user else 0
+    timing_middleware = "core.middleware.RequestTimingMiddleware"
+    middleware = [name for name in settings.MIDDLEWARE if name != timing_middleware]
+
+    def client_with(middleware: list[str]) -> Client:
+        # Middleware is loaded on the client's first request
+        client = Client()
+        with override_settings(MIDDLEWARE=middleware):
+            client.get(f"/sync/{user_id}/")
+
+        return client
+
+    with override_settings(ROOT_URLCONF=__name__, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        clients = {"plain": client_with(middleware), "timed": client_with([timing_middleware, *middleware])}
+        seconds = {name: [] for name in clients}
+
+        for _ in range(rounds):
+            for name, client in clients.items():
+                seconds[name].append(timed(lambda: [client.get(f"/sync/{user_id}/") for _ in range(requests)])[0])
+
+    plain_seconds, timed_seconds = min(seconds["plain"]), min(seconds["timed"])
+
+    return {
+        "requests": requests,
+        "plain_us_per_request": round(plain_seconds / requests * 1_000_000, 1),
+        "timed_us_per_request": round(timed_seconds / requests * 1_000_000, 1),
+        "overhead_percent": round((timed_seconds - plain_seconds) / plain_seconds * 100, 2),
+    }
+
+
+###########
+# Warm-up #
+###########
+
+WARMUP_PATHS = ["/health/", "/admin/login/", "/api/v1/docs/", "/metrics/"]
+"""Mix of json and template responses requested by new workers."""
+
+
+def first_requests(requests: int = 100, warm=False) -> dict:
+    """Time the first requests of this process, run in a fresh worker process by `warmup_latency`."""
+    from core.warmup import warm_up
+
+    warm_up_ms = sum(warm_up(force=True).values()) if warm else 0
+    latencies = []
+
+    # Metrics are scraped with a token, so they are rendered instead of refused
+    metrics = {**getattr(settings, "METRICS", {}), "TOKEN": "benchmark"}
+
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"], METRICS=metrics):
+        # Middleware is loaded when a real worker's application is created, not on its first request
+        client = Client(headers={"Authorization": "Bearer benchmark"})
+        client.handler.load_middleware()
+
+        for i in range(requests):
+            seconds, _ = timed(client.get, WARMUP_PATHS[i % len(WARMUP_PATHS)])
+            latencies.append(seconds * 1000)
+
+    return {"warm_up_ms": warm_up_ms, "latencies_ms": latencies}
+
+
+def run_worker(requests: int, warm: bool) -> dict:
+    """Run `first_requests` in a new python process with the same settings."""
+    code = (
+        "import django, json; django.setup(); "
+        "from core.benchmarks import first_requests; "
+        f"print(json.dumps(first_requests({requests}, warm={warm})))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+    ).stdout
+
+    return stdlib_json.loads(output.strip().splitlines()[-1])
+
+
+@benchmark("warmup")
+def warmup_latency(requests: int = 100, workers: int = 5) -> dict:
+    """
+    Compare latency of the first requests of new worker processes, with and
+    without `core.warmup`, p99 is over the first requests of every worker.
+    """
+    results = {}
+
+    for mode, warm in (("cold", False), ("warm", True)):
+        runs = [run_worker(requests, warm) for _ in range(workers)]
+        latencies = [latency for run in runs for latency in run["latencies_ms"]]
+
+        results[f"{mode}_first_request_ms"] = round(statistics.mean(run["latencies_ms"][0] for run in runs), 2)
+        results[f"{mode}_p50_ms"] = round(statistics.median(latencies), 2)
+        results[f"{mode}_p99_ms"] = round(statistics.quantiles(latencies, n=100)[98], 2)
+
+        if warm:
+            results["warm_up_ms"] = round(statistics.mean(run["warm_up_ms"] for run in runs), 2)
+
+    return results
@@ -0,0 +1,315 @@
+"""
+Query result cache for `ManagerBase.cached()`.
+
+Results are keyed on the compiled sql and params, along with the current
+version of every table in the query. Writes bump the version of the tables
+they touch, so stale results are never read, they are just left to expire.
+
+Models opt in by setting `cacheable = True` on their manager. Only writes to
+cacheable models bump versions, and queries joining other tables are not
+cached, since their writes are not tracked.
+
+Configured in settings.py as `QUERY_CACHE`:
+```
+QUERY_CACHE = {
+    "ENABLED": None,  # defaults to whether the store is shared across processes
+    "STORE": "core.cache.DjangoCacheStore",  # or "core.cache.LocMemStore"
+    "OPTIONS": {"alias": "default"},
+    "TIMEOUT": 60,
+}
+```
+
+A process local store, like `LocMemStore` or a `DjangoCacheStore` backed by
+`LocMemCache`, only sees writes made by its own worker, so other workers would
+read stale results. The cache is disabled for these unless `ENABLED` is set.
+"""
+
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Optional, Type
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import EmptyResultSet
+from django.core.signals import setting_changed
+from django.db import connections, models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from core.metrics import query_cache_requests_total
+
+_MISSING = object()
+
+
+class QueryCacheStore:
+    """Backing storage for cached results and table versions."""
+
+    is_shared = True
+    """Whether all worker processes read and write the same entries."""
+
+    def get(self, key: str, default=None) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, timeout: int) -> None:
+        raise NotImplementedError
+
+    def get_versions(self, tables: list[str]) -> dict[str, int]:
+        raise NotImplementedError
+
+    def bump_version(self, table: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class LocMemStore(QueryCacheStore):
+    """In-process LRU store, used for testing and single process deployments."""
+
+    is_shared = False
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return default
+            elif entry[0] < time.monotonic():
+                del self._entries[key]
+                return default
+
+            self._entries.move_to_end(key)
+            return pickle.loads(entry[1])
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_versions(self, tables):
+        with self._lock:
+            return {table: self._versions.get(table, 0) for table in tables}
+
+    def bump_version(self, table):
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+class DjangoCacheStore(QueryCacheStore):
+    """Store results in one of the caches in settings.py `CACHES`, shared across processes."""
+
+    version_prefix = "query_cache:version:"
+
+    def __init__(self, alias: str = "default"):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def is_shared(self):
+        return not isinstance(self.cache, (LocMemCache, DummyCache))
+
+    def get(self, key, default=None):
+        return self.cache.get(key, default)
+
+    def set(self, key, value, timeout):
+        self.cache.set(key, value, timeout)
+
+    def get_versions(self, tables):
+        keys = {self.version_prefix + table: table for table in tables}
+        versions = self.cache.get_many(keys.keys())
+
+        for key, table in keys.items():
+            if key not in versions:
+                # Versions that were evicted restart at a unique value, never reusing old keys
+                self.cache.add(key, time.time_ns(), None)
+                versions[key] = self.cache.get(key)
+
+        return {table: versions[key] for key, table in keys.items()}
+
+    def bump_version(self, table):
+        self.cache.set(self.version_prefix + table, time.time_ns(), None)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class QueryCache:
+    """Caches queryset results, tracks hits and misses per model."""
+
+    def __init__(self):
+        self._store: Optional[QueryCacheStore] = None
+        self.tables: set[str] = set()
+        self.stats: defaultdict[str, dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    @property
+    def store(self) -> QueryCacheStore:
+        if self._store is None:
+            config = getattr(settings, "QUERY_CACHE", {})
+            store_class = import_string(config.get("STORE", "core.cache.LocMemStore"))
+            self._store = store_class(**config.get("OPTIONS", {}))
+
+        return self._store
+
+    @property
+    def enabled(self) -> bool:
+        enabled = getattr(settings, "QUERY_CACHE", {}).get("ENABLED")
+
+        if enabled is None:
+            return self.store.is_shared
+
+        return enabled
+
+    @property
+    def default_timeout(self) -> int:
+        return getattr(settings, "QUERY_CACHE", {}).get("TIMEOUT", 60)
+
+    def register_model(self, model: Type[models.Model]) -> None:
+        """Track writes to a cacheable model and its parents, so their results can be cached."""
+        for cache_model in [model, *model._meta.get_parent_list()]:
+            self.tables.add(cache_model._meta.db_table)
+            post_save.connect(bump_saved_model, sender=cache_model, dispatch_uid="query_cache")
+            post_delete.connect(bump_saved_model, sender=cache_model, dispatch_uid="query_cache")
+
+        # Many to many changes are tracked by `bump_m2m_model`
+        self.tables.update(field.remote_field.through._meta.db_table for field in model._meta.many_to_many)
+
+    def is_cacheable(self, model: Type[models.Model]) -> bool:
+        return model._meta.db_table in self.tables
+
+    def reset(self) -> None:
+        """Rebuild store from settings and clear stats."""
+        self._store = None
+        self.stats.clear()
+
+    def get_key(self, queryset: models.QuerySet) -> Optional[str]:
+        """
+        Key for queryset results, changes when any of its tables are written to.
+        None if the query reads tables of models that are not cacheable.
+        """
+        sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+        tables = sorted({alias.table_name for alias in queryset.query.alias_map.values()})
+
+        if not self.tables.issuperset(tables):
+            return None
+
+        versions = self.store.get_versions(tables)
+
+        raw = repr((queryset.db, queryset._iterable_class.__name__, sql, params, sorted(versions.items())))
+        return f"query_cache:{queryset.model._meta.label}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+    def fetch(self, queryset: models.QuerySet, timeout: Optional[int] = None) -> list:
+        """Return queryset results from cache, or run query and store results."""
+        if not self.enabled or self.has_pending_writes(queryset.db):
+            return list(queryset._iterable_class(queryset))
+
+        try:
+            key = self.get_key(queryset)
+        except EmptyResultSet:
+            return []
+
+        if key is None:
+            return list(queryset._iterable_class(queryset))
+
+        stats = self.stats[queryset.model._meta.label]
+        results = self.store.get(key, _MISSING)
+
+        if results is not _MISSING:
+            stats["hits"] += 1
+            query_cache_requests_total.inc(model=queryset.model._meta.label, result="hit")
+            return list(results)
+
+        stats["misses"] += 1
+        query_cache_requests_total.inc(model=queryset.model._meta.label, result="miss")
+        results = list(queryset._iterable_class(queryset))
+        self.store.set(key, results, timeout or self.default_timeout)
+
+        return results
+
+    def bump_tables(self, tables: list[str], using: Optional[str] = None) -> None:
+        """Invalidate cached results for tables, again after the transaction commits."""
+        tables = [table for table in tables if table in self.tables]
+        if not tables or not self.enabled:
+            return
+
+        for table in tables:
+            self.store.bump_version(table)
+
+        connection = connections[using or "default"]
+        if connection.in_atomic_block:
+            transaction.on_commit(_BumpOnCommit(self, tables), using=connection.alias)
+
+    def bump_model(self, model: Type[models.Model], using: Optional[str] = None) -> None:
+        """Invalidate cached results for model, including parent tables."""
+        tables = [model._meta.db_table, *[parent._meta.db_table for parent in model._meta.get_parent_list()]]
+        self.bump_tables(tables, using)
+
+    def has_pending_writes(self, using: str) -> bool:
+        """
+        Whether the current transaction has uncommitted writes, if so results are
+        not cached since they may not be visible to other connections.
+        """
+        connection = connections[using]
+
+        return connection.in_atomic_block and any(
+            isinstance(callback[1], _BumpOnCommit) for callback in connection.run_on_commit
+        )
+
+
+class _BumpOnCommit:
+    """Bump table versions again once written rows are visible to other connections."""
+
+    def __init__(self, query_cache: QueryCache, tables: list[str]):
+        self.query_cache = query_cache
+        self.tables = tables
+
+    def __call__(self):
+        for table in self.tables:
+            self.query_cache.store.bump_version(table)
+
+
+query_cache = QueryCache()
+
+
+def bump_saved_model(sender, using=None, **kwargs):
+    """Connected for cacheable models by `QueryCache.register_model`."""
+    query_cache.bump_model(sender, using)
+
+
+@receiver(m2m_changed)
+def bump_m2m_model(sender, instance, model, action, using=None, **kwargs):
+    if not action.startswith("post_"):
+        return
+
+    query_cache.bump_tables(
+        [sender._meta.db_table, type(instance)._meta.db_table, model._meta.db_table],
+        using,
+    )
+
+
+@receiver(setting_changed)
+def reset_query_cache(setting, **kwargs):
+    if setting == "QUERY_CACHE":
+        query_cache.reset()
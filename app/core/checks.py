@@ -0,0 +1,301 @@
+"""
+System checks for performance anti-patterns.
+
+Registered with the `performance` tag, run them in CI with:
+```
+python manage.py check --tag performance --fail-level WARNING
+```
+
+Checks:
+- core.W001: `ModelAdminBase` sets `select_related_fields` without `prefetch_related_fields`,
+  so `get_queryset` ignores them.
+- core.W002: Foreign key in an admin's `list_display` is not loaded with `select_related`.
+- core.W003: View serializes related models, but its queryset is not optimized.
+- core.W004: `ModelBase` foreign key used in filters has no index.
+- core.W005: Template loaders are listed without the cached loader.
+
+Checks are registered when the app is ready, so DRF and the views are only
+imported once the checks run.
+"""
+
+import sys
+from typing import TYPE_CHECKING, Iterable, Optional, Type
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.admin import ModelAdmin
+from django.contrib.admin.sites import all_sites
+from django.core.checks import Warning, register
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.urls import get_resolver
+
+from core.abstracts.admin import ModelAdminBase
+from core.abstracts.models import ModelBase
+from core.registry import get_subclasses, registry
+
+if TYPE_CHECKING:
+    from rest_framework.generics import GenericAPIView
+
+PERFORMANCE = "performance"
+
+CACHED_LOADER = "django.template.loaders.cached.Loader"
+
+
+def get_app_models(app_configs=None) -> list[Type[models.Model]]:
+    if app_configs is None:
+        return apps.get_models()
+
+    return [model for app_config in app_configs for model in app_config.get_models()]
+
+
+def is_project_class(cls: type) -> bool:
+    """Whether class is defined in the project, not an installed package."""
+    module = sys.modules.get(cls.__module__)
+    return str(getattr(module, "__file__", "")).startswith(str(settings.BASE_DIR))
+
+
+#########
+# Admin #
+#########
+
+
+def get_model_admins(app_configs=None) -> Iterable[ModelAdmin]:
+    models_set = set(get_app_models(app_configs))
+
+    for site in all_sites:
+        for model, model_admin in site._registry.items():
+            if model in models_set:
+                yield model_admin
+
+
+def is_select_related(model_admin: ModelAdmin, field: models.Field) -> bool:
+    """Whether the admin changelist joins the foreign key's table."""
+    list_select_related = model_admin.list_select_related
+
+    if isinstance(list_select_related, (list, tuple)):
+        if field.name in list_select_related:
+            return True
+    elif not field.null:
+        # Changelist calls `select_related()`, which only follows non null foreign keys
+        return True
+
+    if isinstance(model_admin, ModelAdminBase) and model_admin.prefetch_related_fields:
+        return field.name in model_admin.select_related_fields
+
+    return False
+
+
+def check_admin(model_admin: ModelAdmin) -> list[Warning]:
+    """Performance warnings for a registered model admin."""
+    warnings = []
+    opts = model_admin.model._meta
+
+    if (
+        isinstance(model_admin, ModelAdminBase)
+        and model_admin.select_related_fields
+        and not model_admin.prefetch_related_fields
+    ):
+        warnings.append(
+            Warning(
+                "select_related_fields is ignored when prefetch_related_fields is empty.",
+                hint="Use list_select_related for changelist joins, or set prefetch_related_fields.",
+                obj=model_admin.__class__,
+                id="core.W001",
+            )
+        )
+
+    for name in model_admin.list_display:
+        if not isinstance(name, str):
+            continue
+
+        try:
+            field = opts.get_field(name)
+        except FieldDoesNotExist:
+            continue
+
+        if not (field.many_to_one or field.one_to_one) or not field.concrete:
+            continue
+
+        if not is_select_related(model_admin, field):
+            warnings.append(
+                Warning(
+                    f"list_display shows foreign key '{name}' without select_related, "
+                    "causing a query per changelist row.",
+                    hint=f"Add '{name}' to list_select_related.",
+                    obj=model_admin.__class__,
+                    id="core.W002",
+                )
+            )
+
+    return warnings
+
+
+@register(PERFORMANCE)
+def check_admins(app_configs=None, **kwargs):
+    return [warning for model_admin in get_model_admins(app_configs) for warning in check_admin(model_admin)]
+
+
+#########
+# Views #
+#########
+
+
+def is_queryset_optimized(view_class: Type["GenericAPIView"]) -> Optional[bool]:
+    """Whether view optimizes its queryset, None if view overrides `get_queryset` itself."""
+    from rest_framework.generics import GenericAPIView
+
+    from core.abstracts.viewsets import OptimizedQuerySetMixin
+
+    get_queryset = view_class.get_queryset
+
+    if get_queryset is OptimizedQuerySetMixin.get_queryset:
+        return view_class.optimize_queryset
+    elif get_queryset is GenericAPIView.get_queryset:
+        return False
+
+    return None
+
+
+def check_view(view_class: Type["GenericAPIView"]) -> list[Warning]:
+    """Performance warnings for an api view serializing a model queryset."""
+    if getattr(view_class, "queryset", None) is None or getattr(view_class, "serializer_class", None) is None:
+        return []
+
+    if is_queryset_optimized(view_class) is not False:
+        return []
+
+    try:
+        optimizer = registry.optimizer(view_class.serializer_class())
+    except Exception:
+        # Serializers needing init args or request context can't be inspected
+        return []
+
+    related = sorted(optimizer.select_related) + sorted(optimizer.prefetch_related)
+    if not related:
+        return []
+
+    return [
+        Warning(
+            f"{view_class.serializer_class.__name__} reads related models ({', '.join(related)}), "
+            "but the view's queryset is not optimized, causing a query per object.",
+            hint="Add OptimizedQuerySetMixin to the view, or use optimize_queryset in get_queryset.",
+            obj=view_class,
+            id="core.W003",
+        )
+    ]
+
+
+@register(PERFORMANCE)
+def check_views(app_configs=None, **kwargs):
+    from rest_framework.generics import GenericAPIView
+
+    # Views are imported by the url config
+    get_resolver().url_patterns
+
+    warnings = []
+    app_models = set(get_app_models(app_configs))
+
+    for view_class in get_subclasses(GenericAPIView):
+        queryset = getattr(view_class, "queryset", None)
+
+        if is_project_class(view_class) and getattr(queryset, "model", None) in app_models:
+            warnings.extend(check_view(view_class))
+
+    return warnings
+
+
+##########
+# Models #
+##########
+
+
+def get_filtered_field_names(model: Type[models.Model]) -> set[str]:
+    """Fields that admins and views filter model by."""
+    from rest_framework.generics import GenericAPIView
+
+    names = set()
+
+    for site in all_sites:
+        model_admin = site._registry.get(model)
+        if model_admin is not None:
+            names.update(name for name in model_admin.list_filter if isinstance(name, str))
+
+    for view_class in get_subclasses(GenericAPIView):
+        if getattr(getattr(view_class, "queryset", None), "model", None) is model:
+            names.update(getattr(view_class, "filterset_fields", None) or [])
+
+    return {name.split("__")[0] for name in names}
+
+
+def check_model_indexes(model: Type[models.Model]) -> list[Warning]:
+    """Warn for foreign keys without an index that rows are looked up by."""
+    from core.indexes import get_existing_indexes
+
+    warnings = []
+    opts = model._meta
+    leading_columns = {index.spec.columns[0].lstrip("-") for index in get_existing_indexes(model)}
+    filtered = get_filtered_field_names(model)
+
+    for field in opts.concrete_fields:
+        if not field.many_to_one or field.column in leading_columns:
+            continue
+
+        # Reverse accessors filter by the foreign key
+        has_reverse = not field.remote_field.is_hidden()
+        if not has_reverse and field.name not in filtered:
+            continue
+
+        warnings.append(
+            Warning(
+                f"Foreign key '{field.name}' is used in filters but has no index.",
+                hint="Remove db_index=False, or add an index starting with the field to Meta.indexes.",
+                obj=field,
+                id="core.W004",
+            )
+        )
+
+    return warnings
+
+
+@register(PERFORMANCE)
+def check_models(app_configs=None, **kwargs):
+    return [
+        warning
+        for model in get_app_models(app_configs)
+        if issubclass(model, ModelBase) and model._meta.managed and not model._meta.proxy
+        for warning in check_model_indexes(model)
+    ]
+
+
+#############
+# Templates #
+#############
+
+
+def is_cached_loader(loader) -> bool:
+    name = loader[0] if isinstance(loader, (list, tuple)) else loader
+    return name == CACHED_LOADER
+
+
+@register(PERFORMANCE)
+def check_templates(app_configs=None, **kwargs):
+    warnings = []
+
+    for config in settings.TEMPLATES:
+        loaders = config.get("OPTIONS", {}).get("loaders")
+
+        if config["BACKEND"] != "django.template.backends.django.DjangoTemplates" or loaders is None:
+            continue
+
+        if not any(is_cached_loader(loader) for loader in loaders):
+            warnings.append(
+                Warning(
+                    "TEMPLATES lists loaders without the cached loader, so templates are parsed on every render.",
+                    hint="Remove OPTIONS['loaders'] and set APP_DIRS, or wrap the loaders in "
+                    f"('{CACHED_LOADER}', [...]).",
+                    id="core.W005",
+                )
+            )
+
+    return warnings
@@ -0,0 +1,193 @@
+"""
+Identity map for models loaded during a request.
+
+When active, models looked up by id through `ManagerBase`, or through a
+foreign key on a `ModelBase` subclass, are loaded once and reused.
+
+Usage:
+```
+with identity_map() as identity:
+    user = User.objects.get_by_id(1)
+    User.objects.get_by_id(1)  # no query
+
+identity.stats  # {"hits": 1, "misses": 1, "saved_queries": 1, "size": 1}
+```
+
+Saved and deleted models are discarded from the map by signal receivers,
+which are only connected while a map is active. Django skips loading rows
+for `QuerySet.delete()` only when no delete signals are connected, so
+deletes stay fast outside of identity maps.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional, Type
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor, ForwardOneToOneDescriptor
+from django.db.models.signals import post_delete, post_save
+
+_current_identity_map: ContextVar[Optional["IdentityMap"]] = ContextVar("identity_map", default=None)
+
+_active_maps = 0
+"""Number of identity maps active across threads, receivers are connected while above zero."""
+
+_active_maps_lock = threading.Lock()
+
+
+class IdentityMap:
+    """Stores one model instance per database row."""
+
+    def __init__(self) -> None:
+        self._objects: dict[tuple[str, Any], models.Model] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(model: Type[models.Model], pk: Any) -> tuple[str, Any]:
+        concrete_model = model._meta.concrete_model
+        return (concrete_model._meta.label, concrete_model._meta.pk.to_python(pk))
+
+    @property
+    def saved_queries(self) -> int:
+        """Number of queries avoided by returning loaded models."""
+        return self.hits
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "saved_queries": self.saved_queries, "size": len(self)}
+
+    def get(self, model: Type[models.Model], pk: Any) -> Optional[models.Model]:
+        """Return loaded model if exists, counts towards hits and misses."""
+        try:
+            obj = self._objects.get(self._key(model, pk))
+        except ValidationError:
+            obj = None
+
+        if obj is None or not isinstance(obj, model):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return obj
+
+    def add(self, obj: Optional[models.Model]) -> Optional[models.Model]:
+        """Store a fully loaded model, returns the model."""
+        if obj is None or obj.pk is None or obj.get_deferred_fields():
+            return obj
+
+        self._objects.setdefault(self._key(type(obj), obj.pk), obj)
+        return obj
+
+    def discard(self, model: Type[models.Model], pk: Any) -> None:
+        """Remove model with pk from map."""
+        self._objects.pop(self._key(model, pk), None)
+
+    def discard_model(self, model: Type[models.Model]) -> None:
+        """Remove all models of a given type from the map."""
+        label = model._meta.concrete_model._meta.label
+        self._objects = {key: obj for key, obj in self._objects.items() if key[0] != label}
+
+    def clear(self) -> None:
+        self._objects.clear()
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+
+def get_identity_map() -> Optional[IdentityMap]:
+    """Get the active identity map, if any."""
+    return _current_identity_map.get()
+
+
+@contextmanager
+def identity_map():
+    """Activate an identity map, nested calls share the outer map."""
+    current = get_identity_map()
+
+    if current is not None:
+        yield current
+        return
+
+    identity = IdentityMap()
+    token = _current_identity_map.set(identity)
+    _connect_receivers()
+
+    try:
+        yield identity
+    finally:
+        _disconnect_receivers()
+        identity.clear()
+        _current_identity_map.reset(token)
+
+
+class IdentityMapDescriptorMixin:
+    """Resolve foreign keys from the identity map before querying."""
+
+    def get_object(self, instance):
+        identity = get_identity_map()
+
+        if identity is None or not self.field.target_field.primary_key:
+            return super().get_object(instance)
+
+        obj = identity.get(self.field.remote_field.model, getattr(instance, self.field.attname))
+        if obj is not None:
+            return obj
+
+        return identity.add(super().get_object(instance))
+
+
+class IdentityMapForwardManyToOneDescriptor(IdentityMapDescriptorMixin, ForwardManyToOneDescriptor):
+    pass
+
+
+class IdentityMapForwardOneToOneDescriptor(IdentityMapDescriptorMixin, ForwardOneToOneDescriptor):
+    pass
+
+
+def install_descriptors(model: Type[models.Model]) -> None:
+    """Replace forward relation descriptors on model with identity map aware ones."""
+    for field in model._meta.local_fields:
+        if not isinstance(field, models.ForeignKey):
+            continue
+
+        if isinstance(field, models.OneToOneField):
+            descriptor = IdentityMapForwardOneToOneDescriptor(field)
+        else:
+            descriptor = IdentityMapForwardManyToOneDescriptor(field)
+
+        setattr(model, field.name, descriptor)
+
+
+def discard_saved_model(sender, instance, **kwargs):
+    """Saved or deleted models are removed from the active identity map."""
+    identity = get_identity_map()
+
+    if identity is not None and instance.pk is not None:
+        identity.discard(sender, instance.pk)
+
+
+def _connect_receivers() -> None:
+    """Listen for saves and deletes when the first identity map is activated."""
+    global _active_maps
+
+    with _active_maps_lock:
+        _active_maps += 1
+
+        if _active_maps == 1:
+            post_save.connect(discard_saved_model, dispatch_uid="identity_map")
+            post_delete.connect(discard_saved_model, dispatch_uid="identity_map")
+
+
+def _disconnect_receivers() -> None:
+    """Stop listening once the last identity map is deactivated."""
+    global _active_maps
+
+    with _active_maps_lock:
+        _active_maps -= 1
+
+        if _active_maps == 0:
+            post_save.disconnect(dispatch_uid="identity_map")
+            post_delete.disconnect(dispatch_uid="identity_map")
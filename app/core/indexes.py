@@ -0,0 +1,415 @@
+"""
+Index advisor, used by `python manage.py advise_indexes`.
+
+Reads normalized queries, recorded by `core.profiler` or from a query log,
+finds the columns each table is filtered and ordered on, and compares them
+to the indexes declared on the models. Recommends B-tree indexes for
+equality, range and order columns, partial indexes for `IS NULL` filters,
+and expression indexes for case insensitive lookups, along with existing
+indexes that are covered by a longer index.
+
+Benefit is estimated from the recorded time of the queries an index would
+serve. On PostgreSQL 16+ with the hypopg extension, query costs are also
+compared with the index created hypothetically.
+"""
+
+import hashlib
+import json
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Iterable, Optional, Type
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, connections, models
+from django.db.models.functions import Lower, Upper
+
+from core.profiler import fingerprint_sql
+
+
+@dataclass
+class RecordedQuery:
+    """Normalized query and its recorded totals."""
+
+    sql: str
+    calls: int = 1
+    total_ms: float = 0.0
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """Columns of an index, with "-" prefixes for descending order."""
+
+    table: str
+    columns: tuple[str, ...] = ()
+    condition: tuple[tuple[str, bool], ...] = ()
+    """Partial index condition, as (column, is null) pairs."""
+    expression: Optional[tuple[str, str]] = None
+    """Function and column for expression indexes, like ("UPPER", "email")."""
+    equalities: int = field(default=0, compare=False)
+    """Number of leading columns compared by equality."""
+
+    @property
+    def column_names(self) -> tuple[str, ...]:
+        return tuple(column.lstrip("-") for column in self.columns)
+
+    def covers(self, other: "IndexSpec") -> bool:
+        """Whether this index can serve every lookup `other` would, with `other` as its leading columns."""
+        if self.table != other.table or self.expression != other.expression or len(other.columns) > len(self.columns):
+            return False
+        elif self.condition and self.condition != other.condition:
+            # Partial indexes only serve queries with the same condition
+            return False
+
+        # B-tree indexes can be read in either direction
+        prefix = self.columns[: len(other.columns)]
+        reversed_prefix = tuple(column[1:] if column.startswith("-") else f"-{column}" for column in prefix)
+
+        return other.columns in (prefix, reversed_prefix)
+
+
+@dataclass
+class ExistingIndex:
+    spec: IndexSpec
+    name: str
+    unique: bool = False
+    meta_index: Optional[models.Index] = None
+    """Index from the model's `Meta.indexes`, which can be removed by a migration."""
+
+
+@dataclass
+class Recommendation:
+    spec: IndexSpec
+    model: Type[models.Model]
+    queries: list[RecordedQuery] = field(default_factory=list)
+    estimated_costs: list[tuple[float, float]] = field(default_factory=list)
+    """Query cost (before, after) from hypothetical plans."""
+
+    @property
+    def calls(self) -> int:
+        return sum(query.calls for query in self.queries)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(query.total_ms for query in self.queries)
+
+    def get_index(self) -> models.Index:
+        """Django index for the recommendation, named within the 30 character limit."""
+        opts = self.model._meta
+        fields_by_column = {model_field.column: model_field for model_field in opts.concrete_fields}
+
+        def field_name(column: str) -> str:
+            prefix = "-" if column.startswith("-") else ""
+            return prefix + fields_by_column[column.lstrip("-")].name
+
+        digest = hashlib.md5(repr(self.spec).encode()).hexdigest()[:6]
+        first_column = self.spec.expression[1] if self.spec.expression else self.spec.column_names[0]
+        name = f"{opts.db_table[:10]}_{first_column[:8]}_{digest}_idx"
+
+        condition = None
+        for column, is_null in self.spec.condition:
+            query = models.Q(**{f"{field_name(column)}__isnull": is_null})
+            condition = query if condition is None else condition & query
+
+        if self.spec.expression:
+            function = {"UPPER": Upper, "LOWER": Lower}[self.spec.expression[0]]
+            return models.Index(function(field_name(self.spec.expression[1])), name=name, condition=condition)
+
+        return models.Index(fields=[field_name(column) for column in self.spec.columns], name=name, condition=condition)
+
+
+@dataclass
+class Redundancy:
+    index: ExistingIndex
+    covered_by: ExistingIndex
+    model: Type[models.Model]
+
+
+###########
+# Queries #
+###########
+
+LOG_LINE = re.compile(r"duration: (?P<ms>[\d.]+) ms\s+(?:statement|execute [^:]*): (?P<sql>.*)")
+"""PostgreSQL `log_min_duration_statement` lines, other lines are read as plain sql."""
+
+
+def read_query_log(path: str) -> list[RecordedQuery]:
+    """Read queries from a log file, one statement per line, grouped by fingerprint."""
+    queries: dict[str, RecordedQuery] = {}
+
+    for line in Path(path).read_text().splitlines():
+        line = line.strip().rstrip(";")
+        match = LOG_LINE.search(line)
+        sql, milliseconds = (match["sql"], float(match["ms"])) if match else (line, 0.0)
+
+        if not re.match(r"(SELECT|UPDATE|DELETE|WITH)\b", sql, re.IGNORECASE):
+            continue
+
+        normalized, fingerprint = fingerprint_sql(sql)
+        query = queries.setdefault(fingerprint, RecordedQuery(normalized, calls=0))
+        query.calls += 1
+        query.total_ms += milliseconds
+
+    return list(queries.values())
+
+
+def get_profiled_queries(min_calls: int = 1) -> list[RecordedQuery]:
+    """Queries recorded by the SQL profiler."""
+    from core.models import QueryProfile
+
+    return [
+        RecordedQuery(profile.sql, profile.calls, profile.total_ms)
+        for profile in QueryProfile.objects.filter(calls__gte=min_calls).order_by("-total_ms")
+    ]
+
+
+KEYWORDS = "ON|WHERE|SET|INNER|LEFT|RIGHT|FULL|OUTER|CROSS|JOIN|ORDER|GROUP|HAVING|LIMIT|OFFSET|FOR|UNION"
+TABLE_REF = re.compile(rf'\b(?:FROM|JOIN|UPDATE)\s+"(\w+)"(?:\s+(?:AS\s+)?(?!(?:{KEYWORDS})\b)"?(\w+)"?)?', re.I)
+COLUMN_REF = r'(?:"?(\w+)"?\.)?"(\w+)"(?:::\w+)?'
+EQUALS = re.compile(COLUMN_REF + r"\s*(?:=\s*\?|IN\s*\()", re.I)
+RANGE = re.compile(COLUMN_REF + r"\s*(?:[<>]=?\s*\?|BETWEEN\b|LIKE\s+\?)", re.I)
+NULL = re.compile(COLUMN_REF + r"\s+IS\s+(NOT\s+)?NULL", re.I)
+EXPRESSION = re.compile(r"\b(UPPER|LOWER)\(" + COLUMN_REF + r"\)\s*(?:=|LIKE)\s*(?:UPPER|LOWER)?\(?\?", re.I)
+ORDER_COLUMN = re.compile(r"^\s*" + COLUMN_REF + r"(?:\s+(ASC|DESC))?\s*$", re.I)
+
+
+def split_clauses(sql: str) -> tuple[str, str]:
+    """WHERE and ORDER BY clauses of a query."""
+    where = re.search(r"\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|\bFOR UPDATE\b|$)", sql, re.I | re.S)
+    order = re.search(r"\bORDER BY\b(.*?)(?:\bLIMIT\b|\bOFFSET\b|\bFOR UPDATE\b|$)", sql, re.I | re.S)
+
+    return (where[1] if where else ""), (order[1] if order else "")
+
+
+def get_query_specs(sql: str) -> list[IndexSpec]:
+    """Indexes that would serve a query, one per filtered or ordered table."""
+    tables: dict[str, str] = {}
+    for match in TABLE_REF.finditer(sql):
+        tables[match[1]] = match[1]
+        if match[2]:
+            tables[match[2]] = match[1]
+
+    if not tables:
+        return []
+
+    default_table = TABLE_REF.search(sql)[1]
+    where, order = split_clauses(sql)
+
+    def table_for(alias: Optional[str]) -> Optional[str]:
+        return tables.get(alias) if alias else default_table
+
+    equals, ranges, nulls = defaultdict(list), defaultdict(list), defaultdict(list)
+    specs = []
+
+    # Columns in OR branches can't be combined into one index
+    if not re.search(r"\bOR\b", where, re.I):
+        for match in EXPRESSION.finditer(where):
+            if table := table_for(match[2]):
+                specs.append(IndexSpec(table, expression=(match[1].upper(), match[3])))
+
+        where = EXPRESSION.sub("", where)
+
+        for pattern, columns in ((EQUALS, equals), (RANGE, ranges)):
+            for match in pattern.finditer(where):
+                table = table_for(match[1])
+                if table and match[2] not in columns[table]:
+                    columns[table].append(match[2])
+
+        for match in NULL.finditer(where):
+            if table := table_for(match[1]):
+                nulls[table].append((match[2], not match[3]))
+
+    order_columns: list[tuple[str, str]] = []
+    for part in order.split(","):
+        match = ORDER_COLUMN.match(part)
+        if not match:
+            # Expressions end the part of the order an index can serve
+            break
+
+        prefix = "-" if (match[3] or "").upper() == "DESC" else ""
+        order_columns.append((table_for(match[1]), prefix + match[2]))
+
+    for table in {*equals, *ranges, *nulls, *(table for table, _ in order_columns)}:
+        if table is None:
+            continue
+
+        columns = list(equals[table])
+        if ranges[table]:
+            columns.append(ranges[table][0])
+
+        # Order columns can follow equality columns, if every order column is on this table
+        if order_columns and all(order_table == table for order_table, _ in order_columns) and not ranges[table]:
+            columns.extend(column for _, column in order_columns if column.lstrip("-") not in columns)
+
+        condition = tuple(sorted(set(nulls[table])))
+        if columns:
+            specs.append(IndexSpec(table, tuple(columns), condition=condition, equalities=len(equals[table])))
+
+    return specs
+
+
+##########
+# Models #
+##########
+
+
+def get_project_models() -> dict[str, Type[models.Model]]:
+    """Managed models of the project's apps by table name."""
+    base_dir = str(settings.BASE_DIR)
+
+    return {
+        model._meta.db_table: model
+        for model in apps.get_models()
+        if model._meta.managed and not model._meta.proxy and str(model._meta.app_config.path).startswith(base_dir)
+    }
+
+
+def get_existing_indexes(model: Type[models.Model]) -> list[ExistingIndex]:
+    """Indexes declared by a model's fields and Meta."""
+    opts = model._meta
+    table = opts.db_table
+    indexes = []
+
+    for model_field in opts.concrete_fields:
+        if model_field.primary_key or model_field.unique or model_field.db_index:
+            unique = model_field.primary_key or model_field.unique
+            indexes.append(ExistingIndex(IndexSpec(table, (model_field.column,)), model_field.name, unique=unique))
+
+    def columns(field_names: Iterable[str]) -> tuple[str, ...]:
+        return tuple(
+            ("-" if name.startswith("-") else "") + opts.get_field(name.lstrip("-")).column for name in field_names
+        )
+
+    for field_names in opts.unique_together:
+        indexes.append(ExistingIndex(IndexSpec(table, columns(field_names)), ", ".join(field_names), unique=True))
+
+    for constraint in opts.constraints:
+        if isinstance(constraint, models.UniqueConstraint) and constraint.fields and constraint.condition is None:
+            indexes.append(ExistingIndex(IndexSpec(table, columns(constraint.fields)), constraint.name, unique=True))
+
+    for index in opts.indexes:
+        if index.expressions or index.condition is not None:
+            # Compared by name only, recommendations use generated names
+            continue
+
+        indexes.append(ExistingIndex(IndexSpec(table, columns(index.fields)), index.name, meta_index=index))
+
+    return indexes
+
+
+def trim_after_unique(spec: IndexSpec, indexes: list[ExistingIndex]) -> IndexSpec:
+    """Drop columns after a unique column compared by equality, since at most one row matches."""
+    unique_columns = {index.spec.columns[0] for index in indexes if index.unique and len(index.spec.columns) == 1}
+
+    for position, column in enumerate(spec.columns[: spec.equalities]):
+        if column in unique_columns:
+            return replace(spec, columns=spec.columns[: position + 1], equalities=position + 1)
+
+    return spec
+
+
+def find_redundant_indexes(indexes: list[ExistingIndex], model: Type[models.Model]) -> list[Redundancy]:
+    """Non unique indexes whose columns lead another index, so the other can serve their lookups."""
+    redundant = []
+
+    for position, index in enumerate(indexes):
+        if index.unique:
+            continue
+
+        for other_position, other in enumerate(indexes):
+            if other is index or not other.spec.covers(index.spec):
+                continue
+
+            # Of two identical non unique indexes, only the later one is redundant
+            if len(other.spec.columns) > len(index.spec.columns) or other.unique or other_position < position:
+                redundant.append(Redundancy(index, other, model))
+                break
+
+    return redundant
+
+
+###########
+# Advisor #
+###########
+
+
+def advise(queries: Iterable[RecordedQuery]) -> tuple[list[Recommendation], list[Redundancy]]:
+    """Indexes that would serve the queries, ordered by recorded time, and redundant existing indexes."""
+    models_by_table = get_project_models()
+    existing = {table: get_existing_indexes(model) for table, model in models_by_table.items()}
+    recommendations: dict[IndexSpec, Recommendation] = {}
+
+    for query in queries:
+        for spec in get_query_specs(query.sql):
+            model = models_by_table.get(spec.table)
+            if model is None:
+                continue
+
+            spec = trim_after_unique(spec, existing[spec.table])
+            if any(index.spec.covers(spec) for index in existing[spec.table]):
+                continue
+
+            recommendation = recommendations.setdefault(spec, Recommendation(spec, model))
+            recommendation.queries.append(query)
+
+    # Merge recommendations whose columns lead a longer recommendation
+    merged: list[Recommendation] = []
+    for recommendation in sorted(recommendations.values(), key=lambda item: -len(item.spec.columns)):
+        covering = next((other for other in merged if other.spec.covers(recommendation.spec)), None)
+
+        if covering is None:
+            merged.append(recommendation)
+        else:
+            covering.queries.extend(query for query in recommendation.queries if query not in covering.queries)
+
+    redundant = [
+        redundancy
+        for table, indexes in sorted(existing.items())
+        for redundancy in find_redundant_indexes(indexes, models_by_table[table])
+    ]
+
+    return sorted(merged, key=lambda item: (-item.total_ms, -item.calls)), redundant
+
+
+def estimate_costs(recommendation: Recommendation, using: str = "default", max_queries: int = 3) -> bool:
+    """
+    Compare query costs with and without the index, created hypothetically with hypopg.
+    Needs PostgreSQL 16+ for generic plans of queries without their values, returns whether estimated.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql" or connection.pg_version < 160000:
+        return False
+
+    with connection.schema_editor(atomic=False) as schema_editor:
+        index_sql = str(recommendation.get_index().create_sql(recommendation.model, schema_editor))
+
+    def get_cost(cursor, sql: str) -> float:
+        cursor.execute(f"EXPLAIN (GENERIC_PLAN, FORMAT JSON) {sql}")
+        plan = cursor.fetchone()[0]
+        return (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]["Total Cost"]
+
+    try:
+        with connection.cursor() as cursor:
+            for query in recommendation.queries[:max_queries]:
+                sql = to_generic_sql(query.sql)
+                cursor.execute("SELECT hypopg_reset()")
+                before = get_cost(cursor, sql)
+
+                cursor.execute("SELECT indexrelid FROM hypopg_create_index(%s)", [index_sql])
+                recommendation.estimated_costs.append((before, get_cost(cursor, sql)))
+
+            cursor.execute("SELECT hypopg_reset()")
+    except DatabaseError:
+        return False
+
+    return bool(recommendation.estimated_costs)
+
+
+def to_generic_sql(sql: str) -> str:
+    """Replace "?" placeholders of normalized sql with numbered parameters."""
+    sql = re.sub(r"IN \(\.\.\.\)", "= ANY(?)", sql)
+    counter = iter(range(1, sql.count("?") + 1))
+
+    return re.sub(r"\?", lambda _: f"${next(counter)}", sql)
@@ -0,0 +1,229 @@
+"""
+Request timing and query counting, see `core.middleware.RequestTimingMiddleware`.
+
+While a request is timed, every query run through a database connection is
+counted and timed with `connection.execute_wrapper`, and sections like
+serialization are timed with `timed_section`. Totals are sent to the client
+in a `Server-Timing` header, slow requests are logged with their SQL, and
+latencies are aggregated per url name in `route_stats`.
+
+Usage:
+```
+with timed_section("render"):
+    html = template.render(context)
+
+route_stats.snapshot()  # {"users:user-list": {"count": 10, "buckets": {...}, ...}}
+```
+
+Configured in settings.py as `REQUEST_TIMING`:
+```
+REQUEST_TIMING = {
+    "SERVER_TIMING": True,  # add Server-Timing header to responses
+    "SLOW_REQUEST_MS": 1000,  # log requests slower than this, with their SQL
+    "SQL_LOG_LIMIT": 50,  # queries kept per request for the slow request log
+}
+```
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "SERVER_TIMING": True,
+    "SLOW_REQUEST_MS": 1000,
+    "SQL_LOG_LIMIT": 50,
+}
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+"""Upper bounds of latency histogram buckets, slower requests are counted in "+Inf"."""
+
+_current_timings: ContextVar[Optional["RequestTimings"]] = ContextVar("request_timings", default=None)
+
+
+def get_timing_setting(key: str) -> Any:
+    return getattr(settings, "REQUEST_TIMING", {}).get(key, DEFAULTS[key])
+
+
+class RequestTimings:
+    """Time spent in a request, in seconds, and the queries it ran."""
+
+    def __init__(self, sql_limit: int = 50) -> None:
+        self.started_at = time.perf_counter()
+        self.total = 0.0
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.sections: dict[str, float] = {}
+        self.queries: list[tuple[str, float]] = []
+        self.sql_limit = sql_limit
+
+    def add_query(self, sql: str, seconds: float) -> None:
+        self.db_queries += 1
+        self.db_time += seconds
+
+        if len(self.queries) < self.sql_limit:
+            self.queries.append((sql, seconds))
+
+    def add_section(self, name: str, seconds: float) -> None:
+        self.sections[name] = self.sections.get(name, 0.0) + seconds
+
+    def stop(self) -> float:
+        self.total = time.perf_counter() - self.started_at
+        return self.total
+
+    def get_server_timing(self) -> str:
+        """Value for the `Server-Timing` header, durations in milliseconds."""
+        metrics = [
+            f"total;dur={self.total * 1000:.1f}",
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+        ]
+        metrics.extend(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.sections.items())
+
+        return ", ".join(metrics)
+
+
+def get_timings() -> Optional[RequestTimings]:
+    """Timings of the current request, None if not being timed."""
+    return _current_timings.get()
+
+
+@contextmanager
+def timing_request(sql_limit: Optional[int] = None):
+    """Time queries and sections run in the block, yields `RequestTimings`."""
+    timings = RequestTimings(sql_limit=sql_limit if sql_limit is not None else get_timing_setting("SQL_LOG_LIMIT"))
+    token = _current_timings.set(timings)
+
+    # New connections get the timer when created
+    for connection in connections.all(initialized_only=True):
+        install_query_timer(connection)
+
+    try:
+        yield timings
+    finally:
+        timings.stop()
+        _current_timings.reset(token)
+
+
+@contextmanager
+def timed_section(name: str):
+    """Add time spent in the block to the current request's timings under name."""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_section(name, time.perf_counter() - start)
+
+
+def query_timer(execute, sql, params, many, context):
+    """Execute wrapper that adds each query to the current request's timings."""
+    timings = _current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, time.perf_counter() - start)
+
+
+def install_query_timer(connection) -> None:
+    """Add `query_timer` to a connection's execute wrappers, once."""
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+@receiver(connection_created)
+def on_connection_created(sender, connection, **kwargs):
+    # Connections are per thread, this covers threads used by async views
+    install_query_timer(connection)
+
+
+class RouteStats:
+    """Latency histograms and totals per url name, shared by threads in a process."""
+
+    def __init__(self) -> None:
+        self._routes: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, timings: RequestTimings, response_size: Optional[int] = None) -> None:
+        milliseconds = timings.total * 1000
+        bucket = next((str(bound) for bound in LATENCY_BUCKETS_MS if milliseconds <= bound), "+Inf")
+
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = {
+                    "count": 0,
+                    "buckets": dict.fromkeys([*map(str, LATENCY_BUCKETS_MS), "+Inf"], 0),
+                    "total_ms": 0.0,
+                    "db_queries": 0,
+                    "db_ms": 0.0,
+                    "sections_ms": {},
+                    "response_bytes": 0,
+                }
+                self._routes[route] = stats
+
+            stats["count"] += 1
+            stats["buckets"][bucket] += 1
+            stats["total_ms"] += milliseconds
+            stats["db_queries"] += timings.db_queries
+            stats["db_ms"] += timings.db_time * 1000
+            stats["response_bytes"] += response_size or 0
+
+            for name, seconds in timings.sections.items():
+                stats["sections_ms"][name] = stats["sections_ms"].get(name, 0.0) + seconds * 1000
+
+    def snapshot(self) -> dict[str, dict]:
+        """Copy of stats per route, with average latency and queries."""
+        with self._lock:
+            routes = {
+                route: {**stats, "buckets": dict(stats["buckets"]), "sections_ms": dict(stats["sections_ms"])}
+                for route, stats in self._routes.items()
+            }
+
+        for stats in routes.values():
+            stats["avg_ms"] = round(stats["total_ms"] / stats["count"], 2)
+            stats["avg_db_queries"] = round(stats["db_queries"] / stats["count"], 2)
+
+        return routes
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+route_stats = RouteStats()
+
+
+def log_slow_request(request, timings: RequestTimings, route: str) -> None:
+    """Log a request that took longer than `SLOW_REQUEST_MS`, with its queries."""
+    queries = "\n".join(f"  {seconds * 1000:.1f}ms {sql}" for sql, seconds in timings.queries)
+    omitted = timings.db_queries - len(timings.queries)
+
+    logger.warning(
+        "Slow request %s %s (%s): %.1fms, %s queries in %.1fms\n%s%s",
+        request.method,
+        request.path,
+        route,
+        timings.total * 1000,
+        timings.db_queries,
+        timings.db_time * 1000,
+        queries,
+        f"\n  ... {omitted} more queries" if omitted > 0 else "",
+    )
@@ -0,0 +1,130 @@
+"""
+Django command to recommend indexes from recorded queries.
+"""
+
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, migrations
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+
+from core.indexes import Recommendation, Redundancy, advise, estimate_costs, get_profiled_queries, read_query_log
+
+
+class Command(BaseCommand):
+    """Recommend missing and redundant indexes, see `core.indexes`."""
+
+    help = "Recommend indexes for queries recorded by the SQL profiler or in a query log, and write a migration."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--log", action="append", help="Read queries from a log file instead of the profiler.")
+        parser.add_argument("--min-calls", type=int, default=1, help="Ignore profiled queries with fewer calls.")
+        parser.add_argument("--limit", type=int, default=10, help="Max indexes to recommend.")
+        parser.add_argument("--database", default="default", help="Database for hypothetical plans.")
+        parser.add_argument("--migration", action="store_true", help="Print a migration applying the advice.")
+        parser.add_argument("--write", action="store_true", help="Write the migration to the app's migrations.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        if options["log"]:
+            queries = [query for path in options["log"] for query in read_query_log(path)]
+        else:
+            queries = get_profiled_queries(min_calls=options["min_calls"])
+
+        if not queries:
+            raise CommandError("No queries to analyze, record some with SQL_PROFILER or pass --log.")
+
+        recommendations, redundant = advise(queries)
+        recommendations = recommendations[: options["limit"]]
+
+        self.stdout.write(self.style.SUCCESS(f"Analyzed {len(queries)} queries."))
+        self.write_recommendations(recommendations, options["database"])
+        self.write_redundant(redundant)
+
+        if options["migration"] or options["write"]:
+            self.write_migrations(recommendations, redundant, options["database"], write=options["write"])
+
+    def write_recommendations(self, recommendations: list[Recommendation], using: str):
+        if not recommendations:
+            self.stdout.write("No missing indexes found.")
+            return
+
+        self.stdout.write(self.style.SUCCESS("Recommended indexes:"))
+
+        for rank, recommendation in enumerate(recommendations, start=1):
+            self.stdout.write(
+                f"{rank}. {recommendation.model._meta.label}: {recommendation.calls} calls, "
+                f"{recommendation.total_ms:.1f}ms in {len(recommendation.queries)} queries"
+            )
+            self.stdout.write(f"   {MigrationWriter.serialize(recommendation.get_index())[0]}")
+
+            if estimate_costs(recommendation, using=using):
+                for before, after in recommendation.estimated_costs:
+                    self.stdout.write(f"   estimated cost {before:.1f} -> {after:.1f}")
+
+            self.stdout.write(f"   e.g. {recommendation.queries[0].sql[:200]}")
+
+    def write_redundant(self, redundant: list[Redundancy]):
+        if not redundant:
+            return
+
+        self.stdout.write(self.style.SUCCESS("Redundant indexes:"))
+
+        for redundancy in redundant:
+            action = "remove from Meta.indexes" if redundancy.index.meta_index else "set db_index=False"
+            self.stdout.write(
+                f"- {redundancy.model._meta.label}: {redundancy.index.name} {redundancy.index.spec.columns} "
+                f"is covered by {redundancy.covered_by.name} {redundancy.covered_by.spec.columns}, {action}"
+            )
+
+    def write_migrations(self, recommendations: list[Recommendation], redundant: list[Redundancy], using, write):
+        concurrent = connections[using].vendor == "postgresql"
+        if concurrent:
+            from django.contrib.postgres.operations import AddIndexConcurrently as AddIndex
+            from django.contrib.postgres.operations import RemoveIndexConcurrently as RemoveIndex
+        else:
+            AddIndex, RemoveIndex = migrations.AddIndex, migrations.RemoveIndex
+
+        operations = defaultdict(list)
+
+        for recommendation in recommendations:
+            opts = recommendation.model._meta
+            operations[opts.app_label].append(AddIndex(model_name=opts.model_name, index=recommendation.get_index()))
+
+        for redundancy in redundant:
+            if redundancy.index.meta_index is not None:
+                opts = redundancy.model._meta
+                operations[opts.app_label].append(RemoveIndex(model_name=opts.model_name, name=redundancy.index.name))
+
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+
+        for app_label, app_operations in sorted(operations.items()):
+            leaf_nodes = loader.graph.leaf_nodes(app_label)
+            number = (MigrationAutodetector.parse_number(leaf_nodes[0][1]) or 0) + 1 if leaf_nodes else 1
+
+            migration = migrations.Migration(f"{number:04d}_advised_indexes", app_label)
+            migration.dependencies = leaf_nodes
+            migration.operations = app_operations
+
+            writer = MigrationWriter(migration)
+            content = writer.as_string()
+
+            if concurrent:
+                # Concurrent index operations can't run in a transaction
+                header = "class Migration(migrations.Migration):\n"
+                content = content.replace(header, header + "    atomic = False\n", 1)
+
+            if write:
+                with open(writer.path, "w") as file:
+                    file.write(content)
+
+                self.stdout.write(self.style.SUCCESS(f"Wrote {writer.path}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"Migration {app_label}/{migration.name}.py:"))
+                self.stdout.write(content)
+
+        if operations:
+            self.stdout.write("Add the same indexes to each model's Meta.indexes, so makemigrations keeps them.")
@@ -0,0 +1,41 @@
+"""
+Django command to run performance benchmarks.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    """Run a benchmark from `core.benchmarks`."""
+
+    help = "Run a performance benchmark, options are passed as key=value."
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", nargs="?", help="Benchmark to run, lists benchmarks if omitted.")
+        parser.add_argument("options", nargs="*", help="Benchmark options as key=value.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        name = options["name"]
+
+        if name is None:
+            for name, func in BENCHMARKS.items():
+                self.stdout.write(f"{name}: {(func.__doc__ or '').strip().splitlines()[0]}")
+            return
+
+        if name not in BENCHMARKS:
+            raise CommandError(f"Unknown benchmark {name}, options are: {', '.join(BENCHMARKS.keys())}.")
+
+        kwargs = {}
+        for option in options["options"]:
+            key, _, value = option.partition("=")
+            kwargs[key] = int(value) if value.isnumeric() else value
+
+        results = BENCHMARKS[name](**kwargs)
+
+        self.stdout.write(self.style.SUCCESS(f"Benchmark {name}:"))
+        for key, value in results.items():
+            self.stdout.write(f"  {key}: {value}")
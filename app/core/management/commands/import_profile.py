@@ -0,0 +1,107 @@
+"""
+Django command to report the import cost of each module at startup.
+"""
+
+import os
+import shlex
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+@dataclass
+class ImportTime:
+    """Import time of a module, from `python -X importtime`."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+    @property
+    def package(self) -> str:
+        return self.module.split(".")[0]
+
+
+def parse_import_times(output: str) -> list[ImportTime]:
+    """Parse the stderr of `python -X importtime`, lines look like `import time: 120 | 450 |   django.db`."""
+    times = []
+
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        self_us, cumulative_us, module = line.removeprefix("import time:").split("|")
+        if not self_us.strip().isdigit():
+            # Header line
+            continue
+
+        name = module.strip()
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        times.append(ImportTime(name, int(self_us), int(cumulative_us), depth))
+
+    return times
+
+
+class Command(BaseCommand):
+    """Profile imports of Django startup, or of another management command."""
+
+    help = "Report cumulative import time per module for django.setup() and the given modules, or a command."
+
+    # Checks would import modules in this process, not the profiled one
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("modules", nargs="*", help="Modules to import after django.setup(), like app.urls.")
+        parser.add_argument("--command", help='Profile a management command instead, like "wait_for_db".')
+        parser.add_argument("--limit", type=int, default=20, help="Modules to report.")
+        parser.add_argument("--packages", action="store_true", help="Also report total time per top level package.")
+        parser.add_argument("--eager", action="store_true", help="Disable lazy imports, see `utils.imports`.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        if options["command"]:
+            target = ["manage.py", *shlex.split(options["command"])]
+        else:
+            code = "import django; django.setup()"
+            code += "".join(f"; import {module}" for module in options["modules"])
+            target = ["-c", code]
+
+        env = {**os.environ, "LAZY_IMPORTS": "0" if options["eager"] else os.environ.get("LAZY_IMPORTS", "1")}
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", *target],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+
+        times = parse_import_times(result.stderr)
+        if not times:
+            raise CommandError(f"No imports recorded, the process failed:\n{result.stderr[-2000:]}")
+
+        total_ms = sum(time.self_us for time in times) / 1000
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(times)} modules in {total_ms:.1f}ms."))
+
+        self.stdout.write(self.style.SUCCESS("Top modules by cumulative time:"))
+        for time in sorted(times, key=lambda time: time.cumulative_us, reverse=True)[: options["limit"]]:
+            self.stdout.write(
+                f"{time.cumulative_us / 1000:8.1f}ms {time.self_us / 1000:8.1f}ms self  "
+                f"{'  ' * time.depth}{time.module}"
+            )
+
+        if options["packages"]:
+            packages = defaultdict(int)
+            for time in times:
+                packages[time.package] += time.self_us
+
+            self.stdout.write(self.style.SUCCESS("Top packages by total time:"))
+            top_packages = sorted(packages.items(), key=lambda item: item[1], reverse=True)[: options["limit"]]
+
+            for package, self_us in top_packages:
+                self.stdout.write(f"{self_us / 1000:8.1f}ms  {package}")
@@ -0,0 +1,98 @@
+"""
+Django command to run workers for the durable task queue.
+"""
+
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.tasks import Worker
+
+
+def run_worker_process(options: dict, results=None) -> dict:
+    """Run a worker until stopped by SIGTERM or SIGINT, puts metrics on results queue if given."""
+    worker = Worker(
+        queues=options["queues"],
+        batch_size=options["batch_size"],
+        poll_interval=options["interval"],
+        on_metrics=options.get("on_metrics"),
+        metrics_interval=options["metrics_interval"],
+    )
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: worker.stop())
+
+    try:
+        return worker.run(burst=options["burst"], max_tasks=options["max_tasks"])
+    finally:
+        if results is not None:
+            results.put(worker.metrics)
+
+
+class Command(BaseCommand):
+    """Run task workers, see `core.tasks`."""
+
+    help = "Run workers that take tasks from the durable queue, with retries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queues", default="default", help="Comma separated queues to run tasks from.")
+        parser.add_argument("--processes", type=int, default=1, help="Number of worker processes.")
+        parser.add_argument("--batch-size", type=int, default=10, help="Tasks claimed at a time by each worker.")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds to wait when no tasks are due.")
+        parser.add_argument("--metrics-interval", type=float, default=60, help="Seconds between metrics logs.")
+        parser.add_argument("--max-tasks", type=int, default=None, help="Stop each worker after this many tasks.")
+        parser.add_argument("--burst", action="store_true", help="Stop once no tasks are due.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        options["queues"] = [queue.strip() for queue in options["queues"].split(",") if queue.strip()]
+        options["on_metrics"] = self.write_metrics
+        processes = max(options["processes"], 1)
+
+        self.stdout.write(f"Starting {processes} worker(s) for queues: {', '.join(options['queues'])}")
+
+        if processes == 1:
+            results = [run_worker_process(options)]
+        else:
+            results = self.run_processes(processes, options)
+
+        total = {key: sum(metrics[key] for metrics in results) for key in ("succeeded", "retried", "failed")}
+        total["processed"] = sum(total.values())
+        total["tasks_per_second"] = round(sum(metrics["tasks_per_second"] for metrics in results), 2)
+
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
+        self.write_metrics(total)
+
+    def run_processes(self, processes: int, options: dict) -> list[dict]:
+        # Forked processes can't share database connections
+        connections.close_all()
+
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        workers = [
+            context.Process(target=run_worker_process, args=(options, results), daemon=True) for _ in range(processes)
+        ]
+
+        for worker in workers:
+            worker.start()
+
+        def stop(*args):
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # children get SIGINT from the terminal
+
+        metrics = [results.get() for _ in workers]
+
+        for worker in workers:
+            worker.join()
+
+        return metrics
+
+    def write_metrics(self, metrics: dict) -> None:
+        self.stdout.write(", ".join(f"{key}: {value}" for key, value in metrics.items()))
@@ -0,0 +1,69 @@
+"""
+Django command to report the slowest queries recorded by the SQL profiler.
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.models import QueryProfile
+from core.profiler import profiler
+
+ORDERINGS = {
+    "total": ("-total_ms", "total time"),
+    "count": ("-calls", "count"),
+    "max": ("-max_ms", "max time"),
+}
+
+
+class Command(BaseCommand):
+    """Report top queries from `QueryProfile`, see `core.profiler`."""
+
+    help = "Print the queries with the most total time and calls in sampled requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--order",
+            choices=ORDERINGS.keys(),
+            action="append",
+            help="Order to report by, can be repeated, defaults to total and count.",
+        )
+        parser.add_argument("--limit", type=int, default=10, help="Queries per report.")
+        parser.add_argument("--plans", action="store_true", help="Include captured query plans.")
+        parser.add_argument("--flush", action="store_true", help="Save this process's sampled queries first.")
+        parser.add_argument("--reset", action="store_true", help="Delete recorded queries after reporting.")
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        if options["flush"]:
+            profiler.flush()
+
+        if not QueryProfile.objects.exists():
+            self.stdout.write("No queries recorded, is SQL_PROFILER SAMPLE_RATE above 0?")
+            return
+
+        for order in options["order"] or ["total", "count"]:
+            ordering, label = ORDERINGS[order]
+            self.stdout.write(self.style.SUCCESS(f"Top queries by {label}:"))
+
+            for rank, profile in enumerate(QueryProfile.objects.order_by(ordering)[: options["limit"]], start=1):
+                self.write_profile(rank, profile, plans=options["plans"])
+
+        if options["reset"]:
+            QueryProfile.objects.all().delete()
+
+    def write_profile(self, rank: int, profile: QueryProfile, plans=False):
+        self.stdout.write(
+            f"{rank}. total {profile.total_ms:.1f}ms, {profile.calls} calls, "
+            f"avg {profile.avg_ms:.2f}ms, max {profile.max_ms:.1f}ms"
+        )
+        self.stdout.write(f"   {profile.sql}")
+
+        for site, count in profile.call_sites.items():
+            self.stdout.write(f"   - {count}x {site}")
+
+        if plans and profile.plan:
+            self.stdout.write("   Plan:")
+            for line in profile.plan.splitlines():
+                self.stdout.write(f"     {line}")
+
+        self.stdout.write("")
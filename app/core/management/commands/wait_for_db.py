@@ -14,6 +14,9 @@ from django.core.management.base import BaseCommand
 class Command(BaseCommand):
     """Django command to wait for database"""
 
+    # Checks are run by handle, once the database is up
+    requires_system_checks = []
+
     def handle(self, *args, **options):
         """Entrypoint for command"""
 
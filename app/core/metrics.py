@@ -0,0 +1,445 @@
+"""
+Prometheus metrics shared by worker processes.
+
+Each process writes its samples to its own memory mapped file in the
+metrics directory, so recording a sample is a write to memory without
+locks between processes. The `/metrics/` endpoint reads every file when
+scraped, adding up counters and histograms from all workers, including
+workers that have exited, and listing gauges per live process.
+
+Usage:
+```
+jobs_total = Counter("jobs_total", "Jobs run.", ["queue"])
+jobs_total.inc(queue="default")
+
+registry.render()  # text exposition format
+```
+
+Configured in settings.py as `METRICS`:
+```
+METRICS = {
+    "ENABLED": True,
+    "DIRECTORY": "/tmp/metrics",  # emptied on deploy, shared by all workers
+    "TOKEN": "",  # scrapes need `Authorization: Bearer <token>`
+}
+```
+
+Without a token the endpoint returns 403 unless DEBUG is on, since it
+exposes routes, latencies and process details.
+"""
+
+import glob
+import json
+import math
+import mmap
+import os
+import resource
+import struct
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+DEFAULTS = {
+    "ENABLED": True,
+    "DIRECTORY": os.path.join(tempfile.gettempdir(), "metrics"),
+    "TOKEN": "",
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def get_metrics_setting(key: str):
+    return getattr(settings, "METRICS", {}).get(key, DEFAULTS[key])
+
+
+class MmapStore:
+    """
+    Float values by key in a memory mapped file, written by one process and read by any.
+
+    The file starts with the number of bytes used, followed by entries of
+    a key length, the utf-8 key padded to 8 bytes, and a double value.
+    Values are 8 byte aligned, so readers never see partly written values.
+    """
+
+    initial_size = 64 * 1024
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a+b")
+        self._positions: dict[str, int] = {}
+
+        capacity = os.fstat(self._file.fileno()).st_size
+        if capacity == 0:
+            capacity = self.initial_size
+            self._file.truncate(capacity)
+
+        self._capacity = capacity
+        self._mmap = mmap.mmap(self._file.fileno(), capacity)
+        self._used = struct.unpack_from("<i", self._mmap, 0)[0]
+
+        if self._used == 0:
+            self._used = 8
+            struct.pack_into("<i", self._mmap, 0, self._used)
+
+        for key, _, position in self.iter_entries(self._mmap):
+            self._positions[key] = position
+
+    @staticmethod
+    def iter_entries(data) -> Iterator[tuple[str, float, int]]:
+        """Key, value, and value position of each entry."""
+        used = struct.unpack_from("<i", data, 0)[0]
+        position = 8
+
+        while position < used:
+            length = struct.unpack_from("<i", data, position)[0]
+            start, end = position + 4, position + 4 + length
+            key = bytes(data[start:end]).decode()
+            position = end + (8 - (length + 4) % 8)
+
+            yield key, struct.unpack_from("<d", data, position)[0], position
+            position += 8
+
+    @classmethod
+    def read(cls, path: str) -> list[tuple[str, float]]:
+        """Read all values from a file, without blocking its writer."""
+        with open(path, "rb") as file:
+            data = file.read()
+
+        if len(data) < 8:
+            return []
+
+        return [(key, value) for key, value, _ in cls.iter_entries(data)]
+
+    def _add_entry(self, key: str) -> int:
+        encoded = key.encode()
+        padding = 8 - (len(encoded) + 4) % 8
+        entry = struct.pack(f"<i{len(encoded) + padding}sd", len(encoded), encoded + b" " * padding, 0.0)
+
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+
+        start, end = self._used, self._used + len(entry)
+        self._mmap[start:end] = entry
+        self._used = end
+
+        # Readers only see the entry once it is complete
+        struct.pack_into("<i", self._mmap, 0, self._used)
+        self._positions[key] = self._used - 8
+
+        return self._positions[key]
+
+    def get(self, key: str) -> float:
+        position = self._positions.get(key)
+        return struct.unpack_from("<d", self._mmap, position)[0] if position is not None else 0.0
+
+    def set(self, key: str, value: float) -> None:
+        position = self._positions.get(key)
+        if position is None:
+            position = self._add_entry(key)
+
+        struct.pack_into("<d", self._mmap, position, value)
+
+    def inc(self, key: str, amount: float) -> None:
+        self.set(key, self.get(key) + amount)
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+
+class MetricsRegistry:
+    """Registered metrics, and the current process's store."""
+
+    def __init__(self):
+        self.metrics: dict[str, "Metric"] = {}
+        self._store: Optional[MmapStore] = None
+        self._pid: Optional[int] = None
+        self._enabled: Optional[bool] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is None:
+            self._enabled = get_metrics_setting("ENABLED")
+
+        return self._enabled
+
+    @property
+    def directory(self) -> str:
+        return get_metrics_setting("DIRECTORY")
+
+    def register(self, metric: "Metric") -> None:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+
+        self.metrics[metric.name] = metric
+
+    def reset(self) -> None:
+        """Close store and read settings again, used when settings change or after fork."""
+        with self._lock:
+            if self._store is not None and self._pid == os.getpid():
+                self._store.close()
+
+            self._store = None
+            self._pid = None
+            self._enabled = None
+
+    def get_store(self) -> MmapStore:
+        """Store for the current process, opened again after a fork."""
+        if self._store is None or self._pid != os.getpid():
+            os.makedirs(self.directory, exist_ok=True)
+            self._store = MmapStore(os.path.join(self.directory, f"{os.getpid()}.db"))
+            self._pid = os.getpid()
+
+        return self._store
+
+    def write(self, key: str, value: float, increment=True) -> None:
+        if not self.enabled:
+            return
+
+        with self._lock:
+            store = self.get_store()
+            store.inc(key, value) if increment else store.set(key, value)
+
+    def write_many(self, increments: Iterable[tuple[str, float]]) -> None:
+        """Add to several values at once."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            store = self.get_store()
+            for key, value in increments:
+                store.inc(key, value)
+
+    def collect(self) -> dict[str, dict[tuple, float]]:
+        """Samples from all processes by metric name, keyed by (sample name, labels)."""
+        samples: dict[str, dict[tuple, float]] = defaultdict(lambda: defaultdict(float))
+
+        for path in glob.glob(os.path.join(self.directory, "*.db")):
+            pid = os.path.basename(path)[:-3]
+            if not pid.isdigit():
+                continue
+
+            try:
+                entries = MmapStore.read(path)
+            except (FileNotFoundError, ValueError, struct.error):
+                continue
+
+            for key, value in entries:
+                name, sample_name, labels = json.loads(key)
+                metric = self.metrics.get(name)
+
+                if metric is None:
+                    continue
+                elif metric.type == "gauge":
+                    if not is_process_alive(int(pid)):
+                        continue
+
+                    labels = [*labels, ["pid", pid]]
+
+                samples[name][(sample_name, tuple(map(tuple, labels)))] += value
+
+        return samples
+
+    def render(self) -> str:
+        """Metrics of all processes in the Prometheus text exposition format."""
+        samples = self.collect()
+        lines = []
+
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.render_samples(samples.get(name, {})))
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+@receiver(setting_changed)
+def reset_metrics(setting, **kwargs):
+    if setting == "METRICS":
+        registry.reset()
+
+
+def is_process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_sample(name: str, labels: Iterable[tuple[str, str]], value: float) -> str:
+    if labels:
+        name += "{" + ",".join(f'{key}="{escape_label(str(val))}"' for key, val in labels) + "}"
+
+    if math.isinf(value):
+        return f"{name} {'+Inf' if value > 0 else '-Inf'}"
+
+    return f"{name} {int(value) if value == int(value) else value}"
+
+
+class Metric:
+    """Named metric with a fixed set of label names."""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), registry=registry):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        self._keys: dict[tuple, str] = {}
+
+        registry.register(self)
+
+    def get_key(self, sample_name: str, labels: dict, extra: tuple = ()) -> str:
+        """Store key for a sample, cached per label values."""
+        cache_key = (sample_name, extra, *labels.items())
+
+        key = self._keys.get(cache_key)
+        if key is None:
+            if len(labels) != len(self.labelnames) or not all(name in labels for name in self.labelnames):
+                raise ValueError(f"Metric {self.name} expects labels: {', '.join(self.labelnames)}.")
+
+            values = [(name, str(labels[name])) for name in self.labelnames]
+            key = json.dumps([self.name, sample_name, [*values, *extra]])
+            self._keys[cache_key] = key
+
+        return key
+
+    def render_samples(self, samples: dict[tuple, float]) -> list[str]:
+        return [format_sample(self.name + suffix, labels, value) for (suffix, labels), value in sorted(samples.items())]
+
+
+class Counter(Metric):
+    """Value that only goes up, added up across processes."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        self.registry.write(self.get_key("", labels), amount)
+
+
+class Gauge(Metric):
+    """Value that can go up and down, reported per live process with a "pid" label."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        self.registry.write(self.get_key("", labels), value, increment=False)
+
+
+class Histogram(Metric):
+    """Counts of observed values in buckets, added up across processes."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Iterable[float] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(name, documentation, labelnames, **kwargs)
+        self.buckets = (*sorted(buckets), math.inf)
+        self._bucket_labels = [(bound, (("le", format_bound(bound)),)) for bound in self.buckets]
+
+    def observe(self, value: float, **labels) -> None:
+        bucket = next(bucket for bound, bucket in self._bucket_labels if value <= bound)
+
+        self.registry.write_many(
+            [
+                (self.get_key("_bucket", labels, bucket), 1),
+                (self.get_key("_sum", labels), value),
+                (self.get_key("_count", labels), 1),
+            ]
+        )
+
+    def render_samples(self, samples):
+        # Buckets are stored per bound, and exposed as cumulative counts
+        by_labels: dict[tuple, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        lines = []
+
+        for (suffix, labels), value in samples.items():
+            if suffix == "_bucket":
+                le = dict(labels)["le"]
+                by_labels[tuple(label for label in labels if label[0] != "le")][le] += value
+            else:
+                by_labels[labels][suffix] += value
+
+        for labels, values in sorted(by_labels.items()):
+            count = 0.0
+            for bound in self.buckets:
+                count += values.get(format_bound(bound), 0.0)
+                lines.append(format_sample(f"{self.name}_bucket", (*labels, ("le", format_bound(bound))), count))
+
+            lines.append(format_sample(f"{self.name}_sum", labels, values.get("_sum", 0.0)))
+            lines.append(format_sample(f"{self.name}_count", labels, values.get("_count", 0.0)))
+
+        return lines
+
+
+def format_bound(bound: float) -> str:
+    return "+Inf" if math.isinf(bound) else repr(float(bound))
+
+
+###################
+# Request metrics #
+###################
+
+http_requests_total = Counter("http_requests_total", "Requests by url name and status.", ["method", "route", "status"])
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "Request latency by url name.", ["route"], buckets=LATENCY_BUCKETS
+)
+db_queries_total = Counter("db_queries_total", "Database queries run by requests, by url name.", ["route"])
+db_query_seconds_total = Counter("db_query_seconds_total", "Time spent in database queries by url name.", ["route"])
+query_cache_requests_total = Counter(
+    "query_cache_requests_total", "Query cache lookups by model and result, hit or miss.", ["model", "result"]
+)
+process_resident_memory_bytes = Gauge("process_resident_memory_bytes", "Resident memory of each worker process.")
+
+MEMORY_INTERVAL = 10
+"""Seconds between memory readings in each process."""
+
+_last_memory_reading = {"pid": None, "time": 0.0}
+
+
+def get_resident_memory() -> int:
+    """Resident memory of this process in bytes, peak memory if /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def record_request(method: str, route: str, status: int, timings) -> None:
+    """Record a request's metrics from its `core.instrumentation.RequestTimings`."""
+    if not registry.enabled:
+        return
+
+    http_requests_total.inc(method=method, route=route, status=status)
+    http_request_duration_seconds.observe(timings.total, route=route)
+    db_queries_total.inc(timings.db_queries, route=route)
+    db_query_seconds_total.inc(timings.db_time, route=route)
+
+    now = time.monotonic()
+    pid = os.getpid()
+
+    if _last_memory_reading["pid"] != pid or now - _last_memory_reading["time"] >= MEMORY_INTERVAL:
+        _last_memory_reading.update(pid=pid, time=now)
+        process_resident_memory_bytes.set(get_resident_memory())
@@ -0,0 +1,166 @@
+"""
+Request middleware for core app functionalities.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from core.identity import identity_map
+from core.instrumentation import get_timing_setting, log_slow_request, route_stats, timing_request
+from core.metrics import record_request
+from core.profiler import flush_query_profiles, is_sampled, profiler, profiling_queries
+from core.tasks import executor
+from core.routers import get_pinned_until, pin_to_primary, unpin_primary
+
+
+class IdentityMapMiddleware:
+    """
+    Share loaded models across a request, see `core.identity`.
+    Add to settings.py MIDDLEWARE after the auth middleware's session setup.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with identity_map():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with identity_map():
+            return await self.get_response(request)
+
+
+class ReplicaPinningMiddleware:
+    """
+    Keep reads on the primary database for clients that recently wrote, see `core.routers`.
+    Uses a cookie so the client's next requests, which may go to another worker, see their writes.
+    """
+
+    cookie_name = "db_pinned"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.COOKIES.get(self.cookie_name):
+            pin_to_primary()
+        else:
+            unpin_primary()
+
+        pinned_until = get_pinned_until()
+        response = self.get_response(request)
+
+        # Any writes during the request will extend the pin
+        if get_pinned_until() > pinned_until:
+            response.set_cookie(
+                self.cookie_name,
+                "1",
+                max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+
+        return response
+
+
+class RequestTimingMiddleware:
+    """
+    Time requests and count their queries, see `core.instrumentation`.
+    Add to settings.py MIDDLEWARE first, so the time of other middleware is included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = get_timing_setting("SERVER_TIMING")
+        self.slow_request_seconds = get_timing_setting("SLOW_REQUEST_MS") / 1000
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with timing_request() as timings:
+            response = self.get_response(request)
+
+        return self.process_timings(request, response, timings)
+
+    async def __acall__(self, request):
+        with timing_request() as timings:
+            response = await self.get_response(request)
+
+        return self.process_timings(request, response, timings)
+
+    def process_timings(self, request, response, timings):
+        resolver_match = getattr(request, "resolver_match", None)
+        route = (resolver_match.view_name if resolver_match else None) or "unresolved"
+        response_size = None if response.streaming else len(response.content)
+
+        route_stats.record(route, timings, response_size)
+        record_request(request.method, route, response.status_code, timings)
+
+        if timings.total >= self.slow_request_seconds:
+            log_slow_request(request, timings, route)
+
+        if self.server_timing:
+            response["Server-Timing"] = timings.get_server_timing()
+
+        return response
+
+
+class QueryProfilerMiddleware:
+    """
+    Profile the queries of a sample of requests, see `core.profiler`.
+    Add to settings.py MIDDLEWARE after `RequestTimingMiddleware`.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not is_sampled():
+            return self.get_response(request)
+
+        with profiling_queries(request):
+            response = self.get_response(request)
+
+        self.schedule_flush()
+        return response
+
+    async def __acall__(self, request):
+        if not is_sampled():
+            return await self.get_response(request)
+
+        with profiling_queries(request):
+            response = await self.get_response(request)
+
+        self.schedule_flush()
+        return response
+
+    def schedule_flush(self):
+        # Written from the task thread pool, so the request isn't slowed down
+        if profiler.due_for_flush():
+            executor.submit(flush_query_profiles)
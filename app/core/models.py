@@ -0,0 +1,165 @@
+"""
+Core models.
+"""
+
+from contextlib import nullcontext
+from datetime import timedelta
+from typing import ClassVar, Iterable
+
+from django.db import IntegrityError, connections, models, transaction
+from django.utils import timezone
+
+from core.abstracts.models import ManagerBase, ModelBase
+
+
+class TaskRecordManager(ManagerBase["TaskRecord"]):
+    """Manage queued tasks."""
+
+    def claim(self, token: str, queues: Iterable[str], limit: int = 10, lock_timeout: int = 300) -> list["TaskRecord"]:
+        """
+        Mark up to `limit` tasks that are due as running by this worker, and return them.
+
+        Rows are selected with `FOR UPDATE SKIP LOCKED`, so concurrent workers claim
+        different tasks without waiting on each other. Tasks running longer than
+        `lock_timeout` seconds are assumed lost and claimed again.
+        """
+        now = timezone.now()
+        claimable = models.Q(status=TaskRecord.Status.QUEUED, run_at__lte=now) | models.Q(
+            status=TaskRecord.Status.RUNNING, started_at__lt=now - timedelta(seconds=lock_timeout)
+        )
+        claimable &= models.Q(queue__in=list(queues))
+
+        using = self.db_for_write
+        has_row_locks = connections[using].features.has_select_for_update_skip_locked
+
+        # Without row locks, like SQLite, a read then write transaction would wait on other workers
+        with transaction.atomic(using=using) if has_row_locks else nullcontext():
+            ids = list(
+                self.select_for_update(skip_locked=True)
+                .filter(claimable)
+                .order_by("run_at", "id")
+                .values_list("id", flat=True)[:limit]
+            )
+
+            if not ids:
+                return []
+
+            # Filtered again for databases without row locks, so each task is only claimed once
+            self.filter(claimable, id__in=ids).update(
+                status=TaskRecord.Status.RUNNING,
+                locked_by=token,
+                started_at=now,
+                attempts=models.F("attempts") + 1,
+                updated_at=now,
+            )
+
+        return list(self.filter(id__in=ids, locked_by=token).using(using).order_by("run_at", "id"))
+
+
+class TaskRecord(ModelBase):
+    """Task in the durable queue, run by `python manage.py run_worker`, see `core.tasks`."""
+
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        RUNNING = "running"
+        SUCCEEDED = "succeeded"
+        FAILED = "failed"
+
+    name = models.CharField(max_length=255)
+    queue = models.CharField(max_length=64, default="default")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_retries = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+
+    locked_by = models.CharField(max_length=64, blank=True, default="")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    objects: ClassVar[TaskRecordManager] = TaskRecordManager()
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.status})"
+
+    class Meta:
+        indexes = [models.Index(fields=["queue", "status", "run_at"], name="core_task_claim_idx")]
+
+
+class QueryProfileManager(ManagerBase["QueryProfile"]):
+    """Manage recorded query fingerprints."""
+
+    max_call_sites = 20
+
+    def record(
+        self,
+        fingerprint: str,
+        sql: str,
+        calls: int,
+        total_ms: float,
+        max_ms: float,
+        call_sites: dict[str, int],
+        plan: str = "",
+    ) -> "QueryProfile":
+        """Add sampled calls of a query to its totals, creating it if first seen."""
+        using = self.db_for_write
+
+        with transaction.atomic(using=using):
+            profile = self.select_for_update().filter(fingerprint=fingerprint).using(using).first()
+
+            if profile is None:
+                try:
+                    with transaction.atomic(using=using):
+                        return self.create(
+                            fingerprint=fingerprint,
+                            sql=sql,
+                            calls=calls,
+                            total_ms=total_ms,
+                            max_ms=max_ms,
+                            call_sites=self.top_call_sites(call_sites),
+                            plan=plan,
+                        )
+                except IntegrityError:
+                    # Created by another process since the lookup
+                    profile = self.select_for_update().using(using).get(fingerprint=fingerprint)
+
+            merged = dict(profile.call_sites)
+            for site, count in call_sites.items():
+                merged[site] = merged.get(site, 0) + count
+
+            profile.calls += calls
+            profile.total_ms += total_ms
+            profile.max_ms = max(profile.max_ms, max_ms)
+            profile.call_sites = self.top_call_sites(merged)
+            profile.plan = plan or profile.plan
+            profile.save()
+
+        return profile
+
+    def top_call_sites(self, call_sites: dict[str, int]) -> dict[str, int]:
+        return dict(sorted(call_sites.items(), key=lambda item: -item[1])[: self.max_call_sites])
+
+
+class QueryProfile(ModelBase):
+    """Totals of a normalized query from sampled requests, see `core.profiler`."""
+
+    fingerprint = models.CharField(max_length=32, unique=True)
+    sql = models.TextField()
+
+    calls = models.PositiveBigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    call_sites = models.JSONField(default=dict, blank=True)
+    plan = models.TextField(blank=True, default="")
+
+    objects: ClassVar[QueryProfileManager] = QueryProfileManager()
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    def __str__(self) -> str:
+        return self.sql[:80]
@@ -0,0 +1,176 @@
+"""
+Queryset optimizer for serializers.
+
+Reads a serializer's field tree, including nested serializers and `source`
+paths, and applies the `select_related`, `prefetch_related` and `.only()`
+calls needed to serialize the queryset without N+1 queries.
+
+Usage:
+```
+queryset = optimize_queryset(User.objects.all(), UserSerializer())
+UserSerializer(queryset, many=True).data  # 1 query, plus 1 per prefetched relation
+```
+"""
+
+from typing import Optional, Type
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+
+
+class QueryOptimizer:
+    """Joins, prefetches, and columns needed to serialize a model."""
+
+    def __init__(self, model: Type[models.Model]):
+        self.model = model
+        self.select_related: set[str] = set()
+        self.prefetch_related: dict[str, "QueryOptimizer"] = {}
+        self.only_fields: set[str] = set()
+        self.full_paths: set[str] = set()
+        """Path prefixes where every column is needed, `""` for the model itself."""
+
+    @classmethod
+    def from_serializer(cls, serializer: serializers.BaseSerializer) -> "QueryOptimizer":
+        """Build optimizer from a model serializer, or list serializer of one."""
+        if isinstance(serializer, serializers.ListSerializer):
+            serializer = serializer.child
+
+        optimizer = cls(serializer.Meta.model)
+        optimizer.add_serializer(serializer, optimizer.model)
+
+        return optimizer
+
+    def add_serializer(self, serializer: serializers.BaseSerializer, model: Type[models.Model], prefix="") -> None:
+        """Add the readable fields of a serializer for model at path prefix."""
+        if isinstance(serializer, serializers.ListSerializer):
+            serializer = serializer.child
+
+        for field in serializer._readable_fields:
+            if field.source == "*":
+                if isinstance(field, serializers.BaseSerializer):
+                    self.add_serializer(field, model, prefix)
+                else:
+                    # Method fields and similar get the whole model
+                    self.full_paths.add(prefix)
+                continue
+
+            self.add_field(field, model, prefix)
+
+    def add_field(self, field: serializers.Field, model: Type[models.Model], prefix="") -> None:
+        """Add joins and columns for a serializer field's source path."""
+        source_attrs = field.source_attrs
+
+        for index, attr in enumerate(source_attrs):
+            is_last = index == len(source_attrs) - 1
+
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                # Properties and methods can read any column
+                self.full_paths.add(prefix)
+                return
+
+            path = prefix + attr
+
+            if not model_field.is_relation:
+                self.only_fields.add(path)
+                return
+
+            if model_field.many_to_many or model_field.one_to_many:
+                self.add_prefetch(field if is_last else None, model_field, path)
+                return
+
+            if is_last and self._is_pk_only(field) and model_field.concrete:
+                # Primary key is read from the foreign key column, no join needed
+                self.only_fields.add(path)
+                return
+
+            self.select_related.add(path)
+            if model_field.concrete:
+                self.only_fields.add(path)
+
+            model = model_field.related_model
+            prefix = path + "__"
+
+            if is_last:
+                if isinstance(field, serializers.BaseSerializer):
+                    self.add_serializer(field, model, prefix)
+                else:
+                    self.full_paths.add(prefix)
+
+    def add_prefetch(self, field: Optional[serializers.Field], model_field, path: str) -> None:
+        """Prefetch a to-many relation, with its own optimizer for the related queryset."""
+        related = self.prefetch_related.get(path)
+        if related is None:
+            related = QueryOptimizer(model_field.related_model)
+            self.prefetch_related[path] = related
+
+        if model_field.one_to_many:
+            # Prefetched rows are matched to their parent by the foreign key
+            related.only_fields.add(model_field.field.name)
+
+        if isinstance(field, serializers.ManyRelatedField) and self._is_pk_only(field.child_relation):
+            related.only_fields.add("pk")
+        elif isinstance(field, serializers.BaseSerializer):
+            related.add_serializer(field, related.model)
+        else:
+            related.full_paths.add("")
+
+    @staticmethod
+    def _is_pk_only(field: serializers.Field) -> bool:
+        return isinstance(field, serializers.RelatedField) and field.use_pk_only_optimization()
+
+    def get_only_fields(self) -> Optional[list[str]]:
+        """Columns to load with `.only()`, None if the whole model is needed."""
+        if "" in self.full_paths:
+            return None
+
+        only_fields = set(self.only_fields)
+
+        for path in self.full_paths:
+            model = self.model
+            for attr in path[:-2].split("__"):
+                model = model._meta.get_field(attr).related_model
+
+            only_fields.update(path + field.name for field in model._meta.concrete_fields)
+
+        return sorted(only_fields)
+
+    def optimize(self, queryset: models.QuerySet, limit_columns=True) -> models.QuerySet:
+        """Apply joins, prefetches, and column limits to queryset."""
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(
+                *[
+                    models.Prefetch(
+                        path, queryset=related.optimize(related.model._default_manager.all(), limit_columns)
+                    )
+                    for path, related in sorted(self.prefetch_related.items())
+                ]
+            )
+
+        only_fields = self.get_only_fields() if limit_columns else None
+        if only_fields is not None:
+            queryset = queryset.only(*only_fields)
+
+        return queryset
+
+
+def optimize_queryset(
+    queryset: models.QuerySet, serializer: serializers.BaseSerializer, limit_columns=True
+) -> models.QuerySet:
+    """
+    Apply the joins, prefetches and `.only()` column limits needed to serialize queryset.
+
+    Parameters
+    ----------
+        - queryset (QuerySet): Queryset to optimize.
+        - serializer (Serializer): Model serializer instance that will serialize the queryset.
+        - limit_columns (bool): Whether to apply `.only()`, disable when models will be saved.
+    """
+    from core.registry import registry
+
+    return registry.optimizer(serializer).optimize(queryset, limit_columns=limit_columns)
@@ -0,0 +1,30 @@
+"""
+Pagination classes for api views.
+"""
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from core.paginator import EstimatedCountPaginator
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginate by id, each page is fetched with `WHERE id < <last id> ORDER BY -id`.
+
+    Unlike page number pagination, there is no OFFSET or COUNT(*), so the
+    last page of a large table is as fast as the first.
+    """
+
+    ordering = "-id"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """Page number pagination that estimates total count for large tables."""
+
+    django_paginator_class = EstimatedCountPaginator
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 1000
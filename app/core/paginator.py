@@ -0,0 +1,21 @@
+"""
+Django paginators, kept apart from the api pagination classes in
+`core.pagination` so admins can use them without importing DRF.
+"""
+
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Django paginator that uses `QuerySetBase.estimated_count`, so unfiltered
+    pages of large tables don't run a full `COUNT(*)`.
+    """
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, "estimated_count"):
+            return self.object_list.estimated_count()
+
+        return super().count
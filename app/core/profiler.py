@@ -0,0 +1,290 @@
+"""
+Sampled SQL profiler, see `core.middleware.QueryProfilerMiddleware`.
+
+A fraction of requests are profiled. Each query they run is normalized to
+a fingerprint, with values and `IN` lists replaced, and its duration is
+added to the fingerprint's totals along with where it was called from: the
+view, the `ManagerBase` method, the serializer, and the first line of
+project code. Fingerprints slower than a threshold get their query plan
+captured with `EXPLAIN`.
+
+Totals are kept in memory and flushed to `QueryProfile` rows periodically,
+where `python manage.py slow_queries` reports on them.
+
+Configured in settings.py as `SQL_PROFILER`:
+```
+SQL_PROFILER = {
+    "SAMPLE_RATE": 0.01,  # fraction of requests profiled
+    "EXPLAIN_THRESHOLD_MS": 100,  # capture plans for queries slower than this
+    "FLUSH_INTERVAL": 60,  # seconds between writes to the database
+}
+```
+"""
+
+import hashlib
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from core.tasks import task
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "SAMPLE_RATE": 0.0,
+    "EXPLAIN_THRESHOLD_MS": 100,
+    "FLUSH_INTERVAL": 60,
+}
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("query_profile", default=None)
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+"""Frames from files in this directory, outside of the profiling modules, are project code."""
+
+MANAGERS_FILE = os.path.join(PROJECT_DIR, "core", "abstracts", "models.py")
+
+_IGNORED_FILES = {
+    os.path.abspath(__file__),
+    os.path.join(PROJECT_DIR, "core", "instrumentation.py"),
+    MANAGERS_FILE,
+    os.path.join(PROJECT_DIR, "core", "abstracts", "serializers.py"),
+}
+
+
+def get_profiler_setting(key: str) -> Any:
+    return getattr(settings, "SQL_PROFILER", {}).get(key, DEFAULTS[key])
+
+
+##################
+# Fingerprinting #
+##################
+
+_NORMALIZERS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\b(?:TRUE|FALSE)\b", re.IGNORECASE), "?"),
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\s+"), " "),
+    (re.compile(r"\bIN \(\?(?:, ?\?)*\)", re.IGNORECASE), "IN (...)"),
+    (re.compile(r"\bVALUES (\(\?(?:, ?\?)*\))(?:, ?\(\?(?:, ?\?)*\))+", re.IGNORECASE), r"VALUES \1, ..."),
+]
+
+
+@lru_cache(maxsize=2048)
+def fingerprint_sql(sql: str) -> tuple[str, str]:
+    """Normalized sql, with values replaced by "?", and its hash."""
+    normalized = sql.strip()
+    for pattern, replacement in _NORMALIZERS:
+        normalized = pattern.sub(replacement, normalized)
+
+    return normalized, hashlib.md5(normalized.encode()).hexdigest()
+
+
+def get_call_site(view_name: Optional[str]) -> str:
+    """Where the current query was called from, by view, manager method, serializer, and project code."""
+    from rest_framework.serializers import BaseSerializer
+
+    from core.abstracts.models import ManagerBase, QuerySetBase
+
+    manager, serializer, code = None, None, None
+    frame = sys._getframe(2)
+
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        owner = frame.f_locals.get("self") if frame.f_code.co_varnames[:1] == ("self",) else None
+
+        if filename == MANAGERS_FILE and isinstance(owner, (ManagerBase, QuerySetBase)):
+            # Outermost public method, the one project code called
+            if not frame.f_code.co_name.startswith("_"):
+                manager = f"{type(owner).__name__}.{frame.f_code.co_name}"
+        elif serializer is None and isinstance(owner, BaseSerializer):
+            serializer = type(getattr(owner, "child", owner)).__name__
+        elif code is None and filename.startswith(PROJECT_DIR) and filename not in _IGNORED_FILES:
+            code = f"{os.path.relpath(filename, PROJECT_DIR)}:{frame.f_lineno}"
+
+        frame = frame.f_back
+
+    parts = [("view", view_name), ("manager", manager), ("serializer", serializer), ("code", code)]
+    return " ".join(f"{name}={value}" for name, value in parts if value) or "unknown"
+
+
+#############
+# Profiling #
+#############
+
+
+class RequestProfile:
+    """Request being profiled."""
+
+    def __init__(self, request=None) -> None:
+        self.request = request
+
+    @property
+    def view_name(self) -> Optional[str]:
+        resolver_match = getattr(self.request, "resolver_match", None)
+        return resolver_match.view_name if resolver_match else None
+
+
+class QueryProfiler:
+    """Totals of sampled queries in this process, until flushed to `QueryProfile`."""
+
+    def __init__(self) -> None:
+        self._entries: dict[str, dict] = {}
+        self._explained: set[str] = set()
+        self._lock = threading.Lock()
+        self.last_flush = time.monotonic()
+
+    def record(self, sql: str, params, milliseconds: float, call_site: str, using: str) -> None:
+        normalized, fingerprint = fingerprint_sql(sql)
+
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                entry = {"sql": normalized, "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "call_sites": {}}
+                self._entries[fingerprint] = entry
+
+            entry["calls"] += 1
+            entry["total_ms"] += milliseconds
+            entry["max_ms"] = max(entry["max_ms"], milliseconds)
+            entry["call_sites"][call_site] = entry["call_sites"].get(call_site, 0) + 1
+
+            if (
+                milliseconds >= get_profiler_setting("EXPLAIN_THRESHOLD_MS")
+                and fingerprint not in self._explained
+                and normalized[:6].upper() == "SELECT"
+            ):
+                # Plans are captured once per process, with the values of a slow call.
+                # Only selects, since ANALYZE runs the query
+                self._explained.add(fingerprint)
+                entry["explain"] = (sql, params, using)
+
+    def due_for_flush(self) -> bool:
+        """Whether `FLUSH_INTERVAL` has passed with totals to flush, only true for one caller."""
+        with self._lock:
+            now = time.monotonic()
+            if not self._entries or now - self.last_flush < get_profiler_setting("FLUSH_INTERVAL"):
+                return False
+
+            self.last_flush = now
+            return True
+
+    def flush(self) -> int:
+        """Write totals to `QueryProfile` rows, capturing pending plans, returns number of fingerprints."""
+        from core.models import QueryProfile
+
+        with self._lock:
+            entries, self._entries = self._entries, {}
+            self.last_flush = time.monotonic()
+
+        for fingerprint, entry in entries.items():
+            explain = entry.pop("explain", None)
+            plan = explain_query(*explain) if explain else ""
+
+            try:
+                QueryProfile.objects.record(fingerprint, plan=plan, **entry)
+            except DatabaseError:
+                logger.exception("Could not save query profile %s.", fingerprint)
+
+        return len(entries)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._explained.clear()
+            self.last_flush = time.monotonic()
+
+
+profiler = QueryProfiler()
+
+
+@task
+def flush_query_profiles() -> int:
+    """Write sampled query totals of this process to the database."""
+    return profiler.flush()
+
+
+def explain_query(sql: str, params, using: str = "default") -> str:
+    """
+    Query plan, with actual timings and buffer usage on PostgreSQL.
+    The query is run in a transaction that is rolled back.
+    """
+    connection = connections[using]
+
+    if connection.vendor == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) "
+    elif connection.vendor == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        prefix = "EXPLAIN "
+
+    try:
+        with transaction.atomic(using=using):
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+
+            transaction.set_rollback(True, using=using)
+    except DatabaseError as exc:
+        return f"Could not explain query: {exc}"
+
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def is_sampled() -> bool:
+    """Whether to profile the current request, for a fraction of `SAMPLE_RATE` requests."""
+    rate = get_profiler_setting("SAMPLE_RATE")
+    return rate > 0 and random.random() < rate
+
+
+@contextmanager
+def profiling_queries(request=None):
+    """Profile queries run in the block, yields `RequestProfile`."""
+    profile = RequestProfile(request)
+    token = _current_profile.set(profile)
+
+    for connection in connections.all(initialized_only=True):
+        install_query_profiler(connection)
+
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+def query_profiler(execute, sql, params, many, context):
+    """Execute wrapper that records each query of a profiled request."""
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        milliseconds = (time.perf_counter() - start) * 1000
+        call_site = get_call_site(profile.view_name)
+        profiler.record(sql, None if many else params, milliseconds, call_site, context["connection"].alias)
+
+
+def install_query_profiler(connection) -> None:
+    """Add `query_profiler` to a connection's execute wrappers, once."""
+    if query_profiler not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_profiler)
+
+
+@receiver(connection_created)
+def on_connection_created(sender, connection, **kwargs):
+    install_query_profiler(connection)
@@ -0,0 +1,190 @@
+"""
+Registry of model and serializer metadata.
+
+Field lists for `ModelBase` models and `ModelSerializerBase` serializers are
+computed once, populated in `CoreConfig.ready()` and on first use for
+serializers imported later, and stored as immutable tuples.
+
+DRF is imported lazily, so commands that only use models don't import it.
+"""
+
+import sys
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, Type
+from weakref import WeakKeyDictionary
+
+from django.apps import apps
+from django.db import models
+
+from utils.imports import lazy_import
+
+if TYPE_CHECKING:
+    from core.abstracts.serializers import CompiledReader, ModelSerializerBase
+    from core.optimizer import QueryOptimizer
+
+serializers = lazy_import("rest_framework.serializers")
+
+
+@dataclass(frozen=True)
+class SerializerMetadata:
+    """Field names for a serializer class."""
+
+    readable_field_names: tuple[str, ...]
+    writable_field_names: tuple[str, ...]
+    readonly_field_names: tuple[str, ...]
+    unique_field_names: tuple[str, ...]
+    related_field_names: tuple[str, ...]
+    many_related_field_names: tuple[str, ...]
+    any_related_field_names: tuple[str, ...]
+
+    @classmethod
+    def from_serializer(cls, serializer: "ModelSerializerBase") -> "SerializerMetadata":
+        fields = serializer.get_fields()
+
+        model_fields = serializer.model_class._meta.get_fields()
+        unique_model_field_names = {
+            field.name
+            for field in model_fields
+            if getattr(field, "primary_key", False) or getattr(field, "_unique", False)
+        }
+
+        related = tuple(key for key, value in fields.items() if isinstance(value, serializers.RelatedField))
+        many_related = tuple(key for key, value in fields.items() if isinstance(value, serializers.ManyRelatedField))
+
+        return cls(
+            readable_field_names=tuple(fields.keys()),
+            writable_field_names=tuple(key for key, value in fields.items() if value.read_only is False),
+            readonly_field_names=tuple(key for key, value in fields.items() if value.read_only is True),
+            unique_field_names=tuple(key for key in fields.keys() if key in unique_model_field_names),
+            related_field_names=related,
+            many_related_field_names=many_related,
+            any_related_field_names=related + many_related,
+        )
+
+
+class MetadataRegistry:
+    """Caches metadata per model and serializer class."""
+
+    def __init__(self):
+        self._model_fields: WeakKeyDictionary[Type[models.Model], dict[tuple, tuple[str, ...]]] = WeakKeyDictionary()
+        self._serializers: WeakKeyDictionary[Type["ModelSerializerBase"], SerializerMetadata] = WeakKeyDictionary()
+        self._readers: WeakKeyDictionary[Type["ModelSerializerBase"], Optional["CompiledReader"]] = WeakKeyDictionary()
+        self._optimizers: WeakKeyDictionary[Type["serializers.BaseSerializer"], "QueryOptimizer"] = WeakKeyDictionary()
+
+    def model_fields(self, model: Type[models.Model], include_parents=True, exclude_read_only=False) -> tuple[str, ...]:
+        """Field names for model, see `ModelBase.get_fields_list`."""
+        options = (include_parents, exclude_read_only)
+        model_fields = self._model_fields.setdefault(model, {})
+
+        if options not in model_fields:
+            model_fields[options] = tuple(
+                str(field.name)
+                for field in model._meta.get_fields(include_parents=include_parents)
+                if not exclude_read_only or field.editable is True
+            )
+
+        return model_fields[options]
+
+    def serializer(self, serializer: "ModelSerializerBase") -> SerializerMetadata:
+        """
+        Field names for the serializer's class, computed from the serializer on first use.
+
+        Serializers that override `get_fields` can change fields per instance,
+        so their metadata is computed every time instead of being stored.
+        """
+        serializer_class = type(serializer)
+
+        if not self.is_cacheable(serializer_class):
+            return SerializerMetadata.from_serializer(serializer)
+
+        metadata = self._serializers.get(serializer_class)
+        if metadata is None:
+            metadata = SerializerMetadata.from_serializer(serializer)
+            self._serializers[serializer_class] = metadata
+
+        return metadata
+
+    def reader(self, serializer_class: Type["ModelSerializerBase"]) -> Optional["CompiledReader"]:
+        """Compiled reader for serializer class, None if the serializer can't be compiled."""
+        from core.abstracts.serializers import CompiledReader
+
+        if not self.is_cacheable(serializer_class):
+            return None
+
+        if serializer_class not in self._readers:
+            self._readers[serializer_class] = CompiledReader.compile(serializer_class())
+
+        return self._readers[serializer_class]
+
+    def optimizer(self, serializer: "serializers.BaseSerializer") -> "QueryOptimizer":
+        """Queryset optimizer for serializer, see `core.optimizer`."""
+        from core.optimizer import QueryOptimizer
+
+        if isinstance(serializer, serializers.ListSerializer):
+            serializer = serializer.child
+
+        serializer_class = type(serializer)
+        if not self.is_cacheable(serializer_class) or getattr(serializer, "is_sparse", False):
+            return QueryOptimizer.from_serializer(serializer)
+
+        if serializer_class not in self._optimizers:
+            self._optimizers[serializer_class] = QueryOptimizer.from_serializer(serializer)
+
+        return self._optimizers[serializer_class]
+
+    def is_cacheable(self, serializer_class: Type["ModelSerializerBase"]) -> bool:
+        return serializer_class.get_fields is serializers.ModelSerializer.get_fields
+
+    def populate(self) -> None:
+        """Compute metadata for all installed models, and all serializers imported so far."""
+        from core.abstracts.models import ModelBase
+
+        for model in apps.get_models():
+            if issubclass(model, ModelBase):
+                self.model_fields(model)
+                self.model_fields(model, exclude_read_only=True)
+
+        serializers_module = sys.modules.get("core.abstracts.serializers")
+        if serializers_module is None:
+            # No serializers imported yet
+            return
+
+        ModelSerializerBase = serializers_module.ModelSerializerBase
+
+        for serializer_class in get_subclasses(ModelSerializerBase):
+            meta = getattr(serializer_class, "Meta", None)
+            if getattr(meta, "model", None) is None or not self.is_cacheable(serializer_class):
+                continue
+
+            try:
+                self.serializer(serializer_class())
+            except Exception:
+                # Misconfigured serializers raise their errors when used
+                continue
+
+    def invalidate(self, cls: Optional[type] = None) -> None:
+        """Remove metadata for a model or serializer class, or everything if not provided."""
+        if cls is None:
+            self._model_fields.clear()
+            self._serializers.clear()
+            self._readers.clear()
+            self._optimizers.clear()
+        else:
+            self._model_fields.pop(cls, None)
+            self._serializers.pop(cls, None)
+            self._readers.pop(cls, None)
+            self._optimizers.pop(cls, None)
+
+
+def get_subclasses(cls: type) -> list[type]:
+    """Get all subclasses of a class, recursively."""
+    subclasses = []
+
+    for subclass in cls.__subclasses__():
+        subclasses.append(subclass)
+        subclasses.extend(get_subclasses(subclass))
+
+    return subclasses
+
+
+registry = MetadataRegistry()
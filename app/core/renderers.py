@@ -0,0 +1,71 @@
+"""
+Api renderers, parsers and responses using the fast JSON backend, see `utils.json`.
+"""
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+
+from utils import json
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """
+    Renders compact JSON with the configured backend, same output as DRF's renderer
+    except for float formatting with orjson, see `utils.json`.
+    Indented and ascii-only output is rendered by DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = json.dumps(data)
+
+        # Same as DRF, escape line separators so output is a strict javascript subset
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+        return ret
+
+
+class JSONParser(parsers.JSONParser):
+    """Parses JSON request bodies with the configured backend."""
+
+    renderer_class = JSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        try:
+            data = stream.read()
+            if encoding.lower().replace("-", "") != "utf8":
+                data = data.decode(encoding)
+
+            return json.loads(data)
+        except ValueError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
+
+
+class JsonResponse(HttpResponse):
+    """
+    Same as Django's `JsonResponse`, encoded with the configured backend.
+
+    Parameters
+    ----------
+        - data (dict): Data to encode, other types are allowed if `safe` is False.
+        - safe (bool): Only allow dicts, same as Django's `JsonResponse`.
+    """
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=json.dumps(data), **kwargs)
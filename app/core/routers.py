@@ -0,0 +1,84 @@
+"""
+Database routers, linked in settings.py as DATABASE_ROUTERS.
+"""
+
+import random
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_pinned_until: ContextVar[float] = ContextVar("primary_pinned_until", default=0.0)
+
+
+def pin_to_primary(seconds: Optional[float] = None) -> None:
+    """Send reads in the current context to the primary database for a number of seconds."""
+    seconds = settings.DATABASE_REPLICA_PIN_SECONDS if seconds is None else seconds
+    _pinned_until.set(max(_pinned_until.get(), time.monotonic() + seconds))
+
+
+def unpin_primary() -> None:
+    """Allow reads in the current context to use replicas again."""
+    _pinned_until.set(0.0)
+
+
+def get_pinned_until() -> float:
+    """Monotonic time until reads in the current context must use the primary database."""
+    return _pinned_until.get()
+
+
+def is_pinned_to_primary() -> bool:
+    """Whether reads in the current context must use the primary database."""
+    return get_pinned_until() > time.monotonic()
+
+
+class ReplicaRouter:
+    """
+    Send reads to replica databases in settings.py `DATABASE_REPLICAS`, and writes to the primary.
+
+    After a write, reads in the same context stick to the primary for
+    `DATABASE_REPLICA_PIN_SECONDS`, so they always see that write. Use
+    `ReplicaPinningMiddleware` to carry this over to the client's next requests.
+
+    Pass the `pin=False` hint to `db_for_write` to look up the write database
+    without pinning, when no write is made yet.
+    """
+
+    @property
+    def replicas(self) -> list[str]:
+        return getattr(settings, "DATABASE_REPLICAS", [])
+
+    def db_for_read(self, model, **hints):
+        replicas = self.replicas
+
+        if not replicas or is_pinned_to_primary():
+            return DEFAULT_DB_ALIAS
+
+        # Keep related lookups on the database the instance was loaded from
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db in replicas:
+            return instance._state.db
+
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if self.replicas and hints.get("pin", True):
+            pin_to_primary()
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *self.replicas}
+
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in self.replicas:
+            return False
+
+        return None
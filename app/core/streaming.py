@@ -0,0 +1,104 @@
+"""
+Streaming list responses for large result sets.
+
+Querysets are read with a server side cursor in chunks, each chunk is
+serialized and encoded, then sent before the next chunk is read, so memory
+stays bounded by the chunk size instead of the result size.
+
+Usage:
+```
+response = stream_response(User.objects.all(), UserSerializer, format="ndjson")
+```
+"""
+
+from typing import Iterable, Iterator, Optional, Type
+
+from django.db import models
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+
+from core.abstracts.serializers import ModelSerializerBase
+from utils import json
+from utils.tools import chunk_list
+
+
+class StreamRenderer:
+    """Encodes chunks of serialized rows as a JSON array."""
+
+    format = "json"
+    media_type = "application/json"
+
+    def encode(self, item: dict) -> bytes:
+        return json.dumps(item)
+
+    def render(self, chunks: Iterable[list[dict]]) -> Iterator[bytes]:
+        yield b"["
+        separator = b""
+
+        for chunk in chunks:
+            if not chunk:
+                continue
+
+            # Encode the chunk as one array, without its brackets
+            yield separator + json.dumps(chunk)[1:-1]
+            separator = b","
+
+        yield b"]"
+
+
+class NDJSONStreamRenderer(StreamRenderer):
+    """Encodes chunks of serialized rows as newline delimited JSON, one object per line."""
+
+    format = "ndjson"
+    media_type = "application/x-ndjson"
+
+    def render(self, chunks):
+        for chunk in chunks:
+            if chunk:
+                yield b"".join(self.encode(item) + b"\n" for item in chunk)
+
+
+STREAM_RENDERERS = {renderer.format: renderer for renderer in (StreamRenderer, NDJSONStreamRenderer)}
+
+
+def iter_serialized(
+    queryset: models.QuerySet,
+    serializer_class: Type[serializers.BaseSerializer],
+    context: Optional[dict] = None,
+    chunk_size: int = 2000,
+) -> Iterator[list[dict]]:
+    """
+    Serialize queryset in chunks, using the compiled reader if the serializer supports it.
+
+    Parameters
+    ----------
+        - queryset (QuerySet): Models to serialize, prefetches are applied per chunk.
+        - serializer_class (Serializer): Serializer for each model.
+        - context (dict): Serializer context.
+        - chunk_size (int): Rows read from the cursor and serialized at a time.
+    """
+    context = context or {}
+    serializer = serializer_class(context=context)
+    reader = serializer.get_reader() if isinstance(serializer, ModelSerializerBase) else None
+
+    if reader is not None:
+        yield from reader.iterate(queryset, chunk_size)
+        return
+
+    for chunk in chunk_list(queryset.iterator(chunk_size=chunk_size), chunk_size):
+        yield serializer_class(chunk, many=True, context=context).data
+
+
+def stream_response(
+    queryset: models.QuerySet,
+    serializer_class: Type[serializers.BaseSerializer],
+    format="json",
+    context: Optional[dict] = None,
+    chunk_size: int = 2000,
+    **kwargs,
+) -> StreamingHttpResponse:
+    """Stream serialized queryset as a JSON array, or NDJSON if format is "ndjson"."""
+    renderer = STREAM_RENDERERS[format]()
+    chunks = iter_serialized(queryset, serializer_class, context=context, chunk_size=chunk_size)
+
+    return StreamingHttpResponse(renderer.render(chunks), content_type=renderer.media_type, **kwargs)
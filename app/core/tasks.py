@@ -0,0 +1,326 @@
+"""
+Background tasks without an external broker.
+
+Functions decorated with `@task` can be:
+- called directly, running inline.
+- deferred with `.defer()`, running in an in-process thread pool after the
+  current transaction commits. Fire and forget, lost if the process exits.
+- enqueued with `.enqueue()`, stored as a `TaskRecord` and run by
+  `python manage.py run_worker` with retries. Args must be JSON serializable.
+
+Usage:
+```
+@task(max_retries=5)
+def send_welcome_email(user_id: int):
+    UserService(user_id).send_welcome_email()
+
+send_welcome_email.defer(user.id)
+send_welcome_email.enqueue(user.id, run_at=timezone.now() + timedelta(hours=1))
+```
+
+Configured in settings.py as `TASKS`:
+```
+TASKS = {
+    "EAGER": False,  # run deferred tasks inline, used for testing
+    "THREADS": 4,  # thread pool size for deferred tasks
+    "MAX_RETRIES": 3,  # default retries for enqueued tasks
+    "RETRY_BACKOFF": 2,  # seconds before first retry, doubles each attempt
+    "RETRY_BACKOFF_MAX": 3600,
+    "LOCK_TIMEOUT": 300,  # seconds before a running task is assumed lost and requeued
+}
+```
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connections, models, transaction
+from django.utils import timezone
+
+from utils.tools import get_import_path, import_from_path
+
+logger = logging.getLogger(__name__)
+
+TASKS: dict[str, "Task"] = {}
+"""Registered tasks by name."""
+
+DEFAULTS = {
+    "EAGER": False,
+    "THREADS": 4,
+    "MAX_RETRIES": 3,
+    "RETRY_BACKOFF": 2,
+    "RETRY_BACKOFF_MAX": 3600,
+    "LOCK_TIMEOUT": 300,
+}
+
+
+def get_task_setting(key: str) -> Any:
+    return getattr(settings, "TASKS", {}).get(key, DEFAULTS[key])
+
+
+class Task:
+    """Function that can run inline, in the thread pool, or from the durable queue."""
+
+    def __init__(self, func: Callable, name: Optional[str] = None, queue="default", max_retries=None):
+        self.func = func
+        self.name = name or get_import_path(func)
+        self.queue = queue
+        self.max_retries = max_retries
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<Task {self.name}>"
+
+    def get_max_retries(self) -> int:
+        return self.max_retries if self.max_retries is not None else get_task_setting("MAX_RETRIES")
+
+    def defer(self, *args, using: Optional[str] = None, **kwargs) -> None:
+        """Run task in the thread pool once the current transaction commits, or now if not in one."""
+        transaction.on_commit(lambda: executor.submit(self, *args, **kwargs), using=using)
+
+    def enqueue(self, *args, run_at: Optional[datetime] = None, queue: Optional[str] = None, **kwargs):
+        """Store task in the durable queue, returns the `TaskRecord`."""
+        from core.models import TaskRecord
+
+        return TaskRecord.objects.create(
+            name=self.name,
+            queue=queue or self.queue,
+            args=list(args),
+            kwargs=kwargs,
+            max_retries=self.get_max_retries(),
+            run_at=run_at or timezone.now(),
+        )
+
+
+def task(func: Optional[Callable] = None, *, name: Optional[str] = None, queue="default", max_retries=None):
+    """
+    Register a function as a task, can be used as `@task` or `@task(...)`.
+
+    Parameters
+    ----------
+        - name (str): Name stored in the queue, defaults to the function's import path.
+        - queue (str): Queue for enqueued tasks, workers can be limited to some queues.
+        - max_retries (int): Retries for enqueued tasks that raise, defaults to `TASKS["MAX_RETRIES"]`.
+    """
+
+    def decorator(func):
+        registered = Task(func, name=name, queue=queue, max_retries=max_retries)
+        TASKS[registered.name] = registered
+
+        return registered
+
+    return decorator(func) if func is not None else decorator
+
+
+class TaskNotRegistered(LookupError):
+    """Task name does not refer to a function decorated with `@task`."""
+
+
+def get_task(name: str) -> Task:
+    """
+    Get registered task by name, importing it by path if its module was not imported yet.
+    Only `@task` functions are returned, names stored in `TaskRecord` rows are not trusted.
+    """
+    if name not in TASKS:
+        try:
+            imported = import_from_path(name)
+        except ImportError:
+            imported = None
+
+        if not isinstance(imported, Task):
+            raise TaskNotRegistered(f"Unregistered task {name}, only functions decorated with @task can be run.")
+
+        TASKS.setdefault(name, imported)
+
+    return TASKS[name]
+
+
+def get_retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff before retrying a task that failed `attempts` times."""
+    seconds = get_task_setting("RETRY_BACKOFF") * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, get_task_setting("RETRY_BACKOFF_MAX")))
+
+
+class TaskExecutor:
+    """Thread pool for deferred tasks, started on first use."""
+
+    def __init__(self):
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=get_task_setting("THREADS"), thread_name_prefix="task")
+
+            return self._pool
+
+    def submit(self, task: Task, *args, **kwargs) -> Optional[Future]:
+        if get_task_setting("EAGER"):
+            self.run(task, *args, **kwargs)
+            return None
+
+        return self.pool.submit(self.run, task, *args, **kwargs)
+
+    def run(self, task: Task, *args, **kwargs) -> None:
+        is_worker_thread = threading.current_thread() is not threading.main_thread() and not get_task_setting("EAGER")
+
+        try:
+            task(*args, **kwargs)
+        except Exception:
+            logger.exception("Deferred task %s failed.", task.name)
+        finally:
+            if is_worker_thread:
+                # Connections are per thread, close them so they aren't left open when idle
+                connections.close_all()
+
+    def shutdown(self, wait=True) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
+
+
+executor = TaskExecutor()
+
+
+def run_task_record(record) -> str:
+    """Run a claimed `TaskRecord`, then mark it succeeded, or retry or fail it. Returns the outcome."""
+    from core.models import TaskRecord
+
+    close_old_connections()
+    claimed = TaskRecord.objects.filter(id=record.id, locked_by=record.locked_by)
+
+    try:
+        get_task(record.name)(*record.args, **record.kwargs)
+    except Exception as exc:
+        now = timezone.now()
+        error = f"{type(exc).__name__}: {exc}"
+
+        if record.attempts <= record.max_retries and not isinstance(exc, TaskNotRegistered):
+            logger.warning("Task %s failed, attempt %s, retrying: %s", record.name, record.attempts, error)
+            claimed.update(
+                status=TaskRecord.Status.QUEUED,
+                run_at=now + get_retry_delay(record.attempts),
+                locked_by="",
+                error=error,
+                updated_at=now,
+            )
+            return "retried"
+
+        logger.error("Task %s failed after %s attempts: %s", record.name, record.attempts, error)
+        claimed.update(status=TaskRecord.Status.FAILED, finished_at=now, locked_by="", error=error, updated_at=now)
+        return "failed"
+
+    now = timezone.now()
+    claimed.update(status=TaskRecord.Status.SUCCEEDED, finished_at=now, locked_by="", updated_at=now)
+    return "succeeded"
+
+
+class Worker:
+    """
+    Runs tasks from the durable queue until stopped, used by `python manage.py run_worker`.
+
+    Parameters
+    ----------
+        - queues (list[str]): Queues to take tasks from.
+        - batch_size (int): Tasks claimed per query.
+        - poll_interval (float): Seconds to wait when no tasks are due.
+        - on_metrics (callable): Called with `metrics` every `metrics_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        queues: Iterable[str] = ("default",),
+        batch_size: int = 10,
+        poll_interval: float = 1.0,
+        on_metrics: Optional[Callable[[dict], None]] = None,
+        metrics_interval: float = 60,
+    ):
+        self.queues = list(queues)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.on_metrics = on_metrics
+        self.metrics_interval = metrics_interval
+
+        self.token = f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.counts = {"succeeded": 0, "retried": 0, "failed": 0}
+        self.started_at = time.monotonic()
+        self._stopped = threading.Event()
+
+    @property
+    def metrics(self) -> dict:
+        """Counts of task outcomes, and tasks run per second since the worker started."""
+        seconds = time.monotonic() - self.started_at
+        processed = sum(self.counts.values())
+
+        return {
+            **self.counts,
+            "processed": processed,
+            "seconds": round(seconds, 2),
+            "tasks_per_second": round(processed / seconds, 2) if seconds else 0.0,
+        }
+
+    def stop(self) -> None:
+        """Finish the current task and stop, other claimed tasks are released."""
+        self._stopped.set()
+
+    def run_once(self) -> int:
+        """Claim and run one batch of tasks, returns number claimed."""
+        from core.models import TaskRecord
+
+        records = TaskRecord.objects.claim(
+            self.token, self.queues, limit=self.batch_size, lock_timeout=get_task_setting("LOCK_TIMEOUT")
+        )
+
+        for index, record in enumerate(records):
+            if self._stopped.is_set():
+                TaskRecord.objects.filter(id__in=[r.id for r in records[index:]], locked_by=self.token).update(
+                    status=TaskRecord.Status.QUEUED, locked_by="", attempts=models.F("attempts") - 1
+                )
+                break
+
+            self.counts[run_task_record(record)] += 1
+
+        return len(records)
+
+    def run(self, burst=False, max_tasks: Optional[int] = None) -> dict:
+        """
+        Run tasks until stopped, returns metrics.
+
+        Parameters
+        ----------
+            - burst (bool): Stop once no tasks are due.
+            - max_tasks (int): Stop after running this many tasks.
+        """
+        last_metrics = time.monotonic()
+
+        while not self._stopped.is_set():
+            claimed = self.run_once()
+
+            if max_tasks is not None and sum(self.counts.values()) >= max_tasks:
+                break
+
+            if self.on_metrics is not None and time.monotonic() - last_metrics >= self.metrics_interval:
+                self.on_metrics(self.metrics)
+                last_metrics = time.monotonic()
+
+            if not claimed:
+                if burst:
+                    break
+
+                self._stopped.wait(self.poll_interval)
+
+        return self.metrics
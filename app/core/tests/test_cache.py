@@ -0,0 +1,161 @@
+"""
+Tests for the query result cache.
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.deletion import Collector
+from django.test import TransactionTestCase, override_settings
+
+from core.abstracts.tests import TestsBase
+from core.cache import DjangoCacheStore, LocMemStore, query_cache
+from core.models import QueryProfile
+from users.models import User
+
+
+class QueryCacheTests(TransactionTestCase):
+    """
+    Unit tests for ManagerBase.cached().
+    Results are not cached while a transaction has pending writes, so tests run outside of one.
+    """
+
+    def setUp(self):
+        query_cache.reset()
+        self.user = User.objects.create_user(email="one@example.com", first_name="Alex")
+
+    def test_cached_reads(self):
+        """Repeated reads should be served from cache."""
+
+        with self.assertNumQueries(2):
+            User.objects.cached().find_by_id(self.user.id)
+            user = User.objects.cached().find_by_id(self.user.id)
+            users = list(User.objects.cached(ttl=30).find(first_name="Alex"))
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(len(users), 1)
+        self.assertEqual(query_cache.stats["users.User"], {"hits": 1, "misses": 2})
+
+    def test_uncached_reads(self):
+        """Managers should not cache unless requested."""
+
+        with self.assertNumQueries(2):
+            User.objects.find_by_id(self.user.id)
+            User.objects.find_by_id(self.user.id)
+
+    def test_save_invalidates(self):
+        """Saving a model should invalidate results for its table."""
+
+        User.objects.cached().get_by_id(self.user.id)
+
+        self.user.first_name = "Sam"
+        self.user.save()
+
+        self.assertEqual(User.objects.cached().get_by_id(self.user.id).first_name, "Sam")
+
+    def test_bulk_operations_invalidate(self):
+        """Manager writes should invalidate results for its table."""
+
+        self.assertEqual(len(User.objects.cached().find()), 1)
+
+        User.objects.create_many([{"email": "two@example.com"}])
+
+        self.assertEqual(len(User.objects.cached().find()), 2)
+
+        User.objects.update_many({}, first_name="Sam")
+
+        self.assertEqual(list(User.objects.cached().find().values_list("first_name", flat=True)), ["Sam", "Sam"])
+
+        User.objects.filter(email="two@example.com").delete()
+
+        self.assertEqual(len(User.objects.cached().find()), 1)
+
+    def test_m2m_invalidates(self):
+        """Changing related models should invalidate queries joining them."""
+
+        group = Group.objects.create(name="Staff")
+
+        self.assertEqual(len(User.objects.cached().find(groups=group)), 0)
+
+        self.user.groups.add(group)
+
+        self.assertEqual(len(User.objects.cached().find(groups=group)), 1)
+
+    def test_pending_writes_not_cached(self):
+        """Results read after an uncommitted write should not be cached."""
+
+        with transaction.atomic():
+            User.objects.create_user(email="two@example.com")
+
+            with self.assertNumQueries(2):
+                self.assertEqual(len(User.objects.cached().find()), 2)
+                self.assertEqual(len(User.objects.cached().find()), 2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(len(User.objects.cached().find()), 2)
+            self.assertEqual(len(User.objects.cached().find()), 2)
+
+    def test_uncacheable_models(self):
+        """Writes to models that did not opt in should not bump versions, or block fast deletes."""
+
+        query = QueryProfile.objects.all()
+
+        with patch.object(query_cache.store, "bump_version") as bump_version:
+            QueryProfile.objects.create(fingerprint="a", sql="SELECT 1")
+            QueryProfile.objects.update_many({}, calls=2)
+            query.delete()
+
+        bump_version.assert_not_called()
+        self.assertTrue(Collector(using="default", origin=query).can_fast_delete(query))
+
+        with self.assertRaises(AssertionError):
+            query.cached()
+
+    @override_settings(QUERY_CACHE={"STORE": "core.cache.DjangoCacheStore", "OPTIONS": {"alias": "default"}})
+    def test_local_store_disabled(self):
+        """Cache should be disabled by default when the store is local to the process."""
+
+        self.assertFalse(query_cache.enabled)
+
+        with self.assertNumQueries(2):
+            User.objects.cached().find_by_id(self.user.id)
+            User.objects.cached().find_by_id(self.user.id)
+
+
+class QueryCacheStoreTests(TestsBase):
+    """Unit tests for query cache stores."""
+
+    def test_locmem_store_lru(self):
+        """Least recently used entries should be evicted."""
+
+        store = LocMemStore(max_entries=2)
+        store.set("a", 1, 60)
+        store.set("b", 2, 60)
+        store.get("a")
+        store.set("c", 3, 60)
+
+        self.assertEqual(store.get("a"), 1)
+        self.assertIsNone(store.get("b"))
+        self.assertEqual(store.get("c"), 3)
+
+    def test_locmem_store_expires(self):
+        """Expired entries should not be returned."""
+
+        store = LocMemStore()
+        store.set("a", 1, -1)
+
+        self.assertIsNone(store.get("a"))
+
+    @override_settings(QUERY_CACHE={"STORE": "core.cache.DjangoCacheStore", "OPTIONS": {"alias": "default"}})
+    def test_django_cache_store_versions(self):
+        """Versions should change when bumped."""
+
+        store = query_cache.store
+        self.assertIsInstance(store, DjangoCacheStore)
+
+        version = store.get_versions(["users_user"])["users_user"]
+        self.assertEqual(store.get_versions(["users_user"])["users_user"], version)
+
+        store.bump_version("users_user")
+        self.assertNotEqual(store.get_versions(["users_user"])["users_user"], version)
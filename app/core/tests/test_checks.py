@@ -0,0 +1,129 @@
+"""
+Tests for performance system checks.
+"""
+
+from io import StringIO
+
+from django.contrib.admin import AdminSite
+from django.contrib.auth.models import Permission
+from django.core.management import call_command
+from django.db import models
+from django.test import override_settings
+from django.test.utils import isolate_apps
+from rest_framework import generics, serializers
+
+from core.abstracts.admin import ModelAdminBase
+from core.abstracts.models import ModelBase
+from core.abstracts.serializers import ModelSerializerBase
+from core.abstracts.tests import TestsBase
+from core.abstracts.viewsets import OptimizedQuerySetMixin
+from core.checks import check_admin, check_model_indexes, check_templates, check_view
+
+
+class PlainPermissionSerializer(ModelSerializerBase):
+    class Meta:
+        model = Permission
+        fields = ["id", "name"]
+
+
+class PermissionSerializer(ModelSerializerBase):
+    content_type_name = serializers.CharField(source="content_type.model", read_only=True)
+
+    class Meta:
+        model = Permission
+        fields = ["id", "name", "content_type_name"]
+
+
+class PerformanceChecksTests(TestsBase):
+    """Unit tests for performance checks."""
+
+    def get_ids(self, warnings) -> list[str]:
+        return [warning.id for warning in warnings]
+
+    def test_admin_select_related(self):
+        """Admins should warn when select related fields are ignored, or list display foreign keys are not joined."""
+
+        class IgnoredAdmin(ModelAdminBase):
+            select_related_fields = ["content_type"]
+
+        class UnjoinedAdmin(ModelAdminBase):
+            list_display = ("name", "content_type")
+            list_select_related = ("permission",)
+
+        class JoinedAdmin(ModelAdminBase):
+            list_display = ("name", "content_type")
+            list_select_related = ("content_type",)
+
+        site = AdminSite(name="checks")
+
+        self.assertEqual(self.get_ids(check_admin(IgnoredAdmin(Permission, site))), ["core.W001"])
+        self.assertEqual(self.get_ids(check_admin(UnjoinedAdmin(Permission, site))), ["core.W002"])
+        self.assertEqual(check_admin(JoinedAdmin(Permission, site)), [])
+
+    def test_view_optimization(self):
+        """Views should warn when serializing related models without optimizing the queryset."""
+
+        class PermissionListView(generics.ListAPIView):
+            queryset = Permission.objects.all()
+            serializer_class = PermissionSerializer
+
+        class OptimizedPermissionListView(OptimizedQuerySetMixin, generics.ListAPIView):
+            queryset = Permission.objects.all()
+            serializer_class = PermissionSerializer
+
+        class PlainPermissionListView(generics.ListAPIView):
+            queryset = Permission.objects.all()
+            serializer_class = PlainPermissionSerializer
+
+        warnings = check_view(PermissionListView)
+
+        self.assertEqual(self.get_ids(warnings), ["core.W003"])
+        self.assertIn("content_type", warnings[0].msg)
+        self.assertEqual(check_view(OptimizedPermissionListView), [])
+        self.assertEqual(check_view(PlainPermissionListView), [])
+
+    @isolate_apps("core")
+    def test_model_indexes(self):
+        """Foreign keys without an index should warn if rows are looked up by them."""
+
+        class Parent(ModelBase):
+            pass
+
+        class Child(ModelBase):
+            parent = models.ForeignKey(Parent, on_delete=models.CASCADE, db_index=False)
+            hidden = models.ForeignKey(Parent, on_delete=models.CASCADE, db_index=False, related_name="+")
+            indexed = models.ForeignKey(Parent, on_delete=models.CASCADE, related_name="+")
+
+        class IndexedChild(ModelBase):
+            parent = models.ForeignKey(Parent, on_delete=models.CASCADE, db_index=False)
+            name = models.CharField(max_length=10)
+
+            class Meta:
+                indexes = [models.Index(fields=["parent", "name"], name="parent_name_idx")]
+
+        warnings = check_model_indexes(Child)
+
+        self.assertEqual(self.get_ids(warnings), ["core.W004"])
+        self.assertIs(warnings[0].obj, Child._meta.get_field("parent"))
+        self.assertEqual(check_model_indexes(IndexedChild), [])
+
+    def test_templates(self):
+        """Explicit template loaders should warn unless wrapped in the cached loader."""
+
+        loaders = ["django.template.loaders.app_directories.Loader"]
+        backend = "django.template.backends.django.DjangoTemplates"
+
+        with override_settings(TEMPLATES=[{"BACKEND": backend, "OPTIONS": {"loaders": loaders}}]):
+            self.assertEqual(self.get_ids(check_templates()), ["core.W005"])
+
+        cached = [("django.template.loaders.cached.Loader", loaders)]
+        with override_settings(TEMPLATES=[{"BACKEND": backend, "OPTIONS": {"loaders": cached}}]):
+            self.assertEqual(check_templates(), [])
+
+    def test_project(self):
+        """Project should pass performance checks."""
+
+        out = StringIO()
+        call_command("check", "--tag", "performance", "--fail-level", "WARNING", stdout=out)
+
+        self.assertIn("no issues", out.getvalue())
@@ -2,11 +2,12 @@
 Test custom Django management commands.
 """
 
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error  # type: ignore
 
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
 from django.test import TestCase
 
@@ -42,3 +43,21 @@ class CommandTests(TestCase):
         # only call command 6 times (2 + 3 + 1)
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=["default"])
+
+
+class BenchmarkCommandTests(TestCase):
+    """Test benchmark command."""
+
+    def test_list_benchmarks(self):
+        """Should list available benchmarks."""
+        out = StringIO()
+
+        call_command("benchmark", stdout=out)
+
+        self.assertIn("asgi:", out.getvalue())
+
+    def test_unknown_benchmark(self):
+        """Should raise error for unknown benchmarks."""
+
+        with self.assertRaises(CommandError):
+            call_command("benchmark", "unknown")
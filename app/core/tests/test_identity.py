@@ -0,0 +1,112 @@
+"""
+Tests for the request identity map.
+"""
+
+from django.contrib.auth.models import Permission
+from django.db.models.deletion import Collector
+from django.test import RequestFactory
+
+from core.abstracts.tests import TestsBase
+from core.identity import IdentityMapForwardManyToOneDescriptor, get_identity_map, identity_map
+from core.middleware import IdentityMapMiddleware
+from core.models import QueryProfile
+from users.models import User
+
+
+class IdentityMapTests(TestsBase):
+    """Unit tests for identity map."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="one@example.com")
+
+    def test_get_by_id_reuses_model(self):
+        """Models loaded by id should be reused without a query."""
+
+        with identity_map() as identity:
+            with self.assertNumQueries(1):
+                user_1 = User.objects.get_by_id(self.user.id)
+                user_2 = User.objects.find_by_id(self.user.id)
+                user_3 = User.objects.get(pk=str(self.user.id))
+
+            self.assertIs(user_1, user_2)
+            self.assertIs(user_1, user_3)
+            self.assertEqual(identity.stats, {"hits": 2, "misses": 1, "saved_queries": 2, "size": 1})
+
+        self.assertIsNone(get_identity_map())
+
+    def test_inactive(self):
+        """Lookups should query the database when no map is active."""
+
+        with self.assertNumQueries(2):
+            user_1 = User.objects.get_by_id(self.user.id)
+            user_2 = User.objects.get_by_id(self.user.id)
+
+        self.assertIsNot(user_1, user_2)
+
+    def test_save_invalidates(self):
+        """Saving or deleting a model should remove it from the map."""
+
+        with identity_map() as identity:
+            user = User.objects.get_by_id(self.user.id)
+            user.first_name = "Alex"
+            user.save()
+
+            self.assertLength(identity, 0)
+
+            User.objects.get_by_id(self.user.id)
+            User.objects.update_one(self.user.id, first_name="Sam")
+
+            self.assertEqual(User.objects.get_by_id(self.user.id).first_name, "Sam")
+
+            User.objects.get_by_id(self.user.id).delete()
+            self.assertLength(identity, 0)
+
+    def test_fast_delete(self):
+        """Delete signals should only be connected while a map is active, so deletes skip loading rows."""
+
+        query = QueryProfile.objects.all()
+
+        self.assertTrue(Collector(using="default", origin=query).can_fast_delete(query))
+
+        with identity_map():
+            self.assertFalse(Collector(using="default", origin=query).can_fast_delete(query))
+
+        self.assertTrue(Collector(using="default", origin=query).can_fast_delete(query))
+
+    def test_foreign_key_descriptor(self):
+        """Foreign keys should resolve from the map."""
+
+        permission = Permission.objects.first()
+        content_type = permission.content_type
+        permission = Permission.objects.get(id=permission.id)
+        descriptor = IdentityMapForwardManyToOneDescriptor(Permission._meta.get_field("content_type"))
+
+        with identity_map() as identity:
+            identity.add(content_type)
+
+            with self.assertNumQueries(0):
+                self.assertIs(descriptor.__get__(permission, Permission), content_type)
+
+    def test_middleware(self):
+        """Middleware should activate map for the request only."""
+
+        def get_response(request):
+            self.assertIsNotNone(get_identity_map())
+            return "response"
+
+        middleware = IdentityMapMiddleware(get_response)
+
+        self.assertEqual(middleware(RequestFactory().get("/")), "response")
+        self.assertIsNone(get_identity_map())
+
+    async def test_middleware_async(self):
+        """Middleware should support async views."""
+
+        async def get_response(request):
+            self.assertIsNotNone(get_identity_map())
+            return "response"
+
+        middleware = IdentityMapMiddleware(get_response)
+
+        self.assertEqual(await middleware(RequestFactory().get("/")), "response")
+        self.assertIsNone(get_identity_map())
@@ -0,0 +1,126 @@
+"""
+Tests for lazy imports and import profiling.
+"""
+
+import os
+import subprocess
+import sys
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import RequestFactory
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.abstracts.tests import TestsBase
+from core.management.commands.import_profile import parse_import_times
+from utils.imports import LAZY_MODULES, LAZY_VIEWS, lazy_import, lazy_view, load_lazy_imports
+
+LAZY_MODULE = "colorsys"
+"""Small stdlib module that the project doesn't import."""
+
+
+class PingView(APIView):
+    authentication_classes = []
+    permission_classes = []
+    message = ""
+
+    def get(self, request):
+        return Response({"message": self.message})
+
+
+class LazyImportTests(TestsBase):
+    """Unit tests for lazy imports."""
+
+    def setUp(self):
+        sys.modules.pop(LAZY_MODULE, None)
+        self.lazy_views = list(LAZY_VIEWS)
+
+    def tearDown(self):
+        sys.modules.pop(LAZY_MODULE, None)
+        LAZY_MODULES.pop(LAZY_MODULE, None)
+        LAZY_VIEWS[:] = self.lazy_views
+
+    def test_lazy_import(self):
+        """Module should be run when an attribute is first used."""
+
+        module = lazy_import(LAZY_MODULE)
+
+        self.assertNotIn("rgb_to_hsv", object.__getattribute__(module, "__dict__"))
+        self.assertEqual(module.rgb_to_hsv(0, 0, 0), (0, 0, 0))
+        self.assertIs(lazy_import(LAZY_MODULE), module)
+
+    def test_eager(self):
+        """Modules should be imported right away when lazy imports are disabled."""
+
+        with patch.dict(os.environ, {"LAZY_IMPORTS": "0"}):
+            module = lazy_import(LAZY_MODULE)
+
+        self.assertIn("rgb_to_hsv", object.__getattribute__(module, "__dict__"))
+
+    def test_missing(self):
+        """Missing modules should raise like a regular import."""
+
+        with self.assertRaises(ModuleNotFoundError):
+            lazy_import("core.missing_module")
+
+    def test_lazy_view(self):
+        """View should be imported on the first request, with its init kwargs."""
+
+        view = lazy_view("core.tests.test_imports.PingView", message="pong")
+        response = view(RequestFactory().get("/"))
+
+        self.assertTrue(view.csrf_exempt)
+        self.assertEqual(response.data, {"message": "pong"})
+
+    def test_load_lazy_imports(self):
+        """Loading should run every lazily imported module."""
+
+        module = lazy_import(LAZY_MODULE)
+        load_lazy_imports()
+
+        self.assertIn("rgb_to_hsv", object.__getattribute__(module, "__dict__"))
+
+    def test_setup_imports(self):
+        """Django setup should not import DRF or optional dependencies."""
+
+        code = (
+            "import django, sys; django.setup(); "
+            "print(*[name for name in sys.modules if name.startswith(('rest_framework.compat', 'faker', 'pygments'))])"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout
+
+        self.assertEqual(output.strip(), "")
+
+
+class ImportProfileTests(TestsBase):
+    """Unit tests for import profile command."""
+
+    def test_parse(self):
+        """Import times should be parsed with their nesting depth."""
+
+        times = parse_import_times(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     django.utils\n"
+            "import time:        80 |        200 |   django\n"
+            "Waiting for database...\n"
+        )
+
+        self.assertEqual([(time.module, time.depth) for time in times], [("django.utils", 2), ("django", 1)])
+        self.assertEqual(times[1].cumulative_us, 200)
+        self.assertEqual(times[0].package, "django")
+
+    def test_command(self):
+        """Command should report the modules imported by Django setup."""
+
+        out = StringIO()
+        call_command("import_profile", "--limit", "3", "--packages", stdout=out)
+        output = out.getvalue()
+
+        self.assertStartsWith(output, "Imported ")
+        self.assertIn("Top modules by cumulative time:", output)
+        self.assertIn("django", output)
@@ -0,0 +1,188 @@
+"""
+Tests for the index advisor.
+"""
+
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+from core.abstracts.tests import TestsBase
+from core.indexes import ExistingIndex, IndexSpec, RecordedQuery, advise, find_redundant_indexes, get_query_specs
+from core.models import QueryProfile, TaskRecord
+from core.profiler import fingerprint_sql
+from users.models import User
+
+
+def normalized(sql: str) -> str:
+    return fingerprint_sql(sql)[0]
+
+
+class IndexAdvisorTests(TestsBase):
+    """Unit tests for index advisor."""
+
+    def test_equality_and_order(self):
+        """Equality columns should lead, followed by order columns."""
+
+        specs = get_query_specs(
+            normalized(
+                'SELECT * FROM "users_user" WHERE ("users_user"."is_active" = %s'
+                ' AND "users_user"."last_name" IN (%s, %s))'
+                ' ORDER BY "users_user"."date_joined" DESC LIMIT 20'
+            )
+        )
+
+        self.assertEqual(specs, [IndexSpec("users_user", ("is_active", "last_name", "-date_joined"))])
+
+    def test_range(self):
+        """A range column should end the index, and orders after it can't use the index."""
+
+        specs = get_query_specs(
+            normalized(
+                'SELECT * FROM "users_user" WHERE "users_user"."is_staff" = %s AND "users_user"."date_joined" >= %s'
+                ' ORDER BY "users_user"."email"'
+            )
+        )
+
+        self.assertEqual(specs, [IndexSpec("users_user", ("is_staff", "date_joined"))])
+
+    def test_or_ignored(self):
+        """Filters combined with OR should not be recommended as one index."""
+
+        specs = get_query_specs(
+            normalized('SELECT * FROM "users_user" WHERE ("users_user"."email" = %s OR "users_user"."id" = %s)')
+        )
+
+        self.assertEqual(specs, [])
+
+    def test_joined_alias(self):
+        """Columns of joined tables should be matched through their alias."""
+
+        specs = get_query_specs(
+            normalized(
+                'SELECT * FROM "auth_permission" INNER JOIN "users_user_user_permissions" T3'
+                ' ON ("auth_permission"."id" = T3."permission_id") WHERE T3."user_id" = %s'
+            )
+        )
+
+        self.assertEqual(specs, [IndexSpec("users_user_user_permissions", ("user_id",))])
+
+    def test_partial_and_expression(self):
+        """IS NULL filters should be index conditions, and case insensitive lookups expressions."""
+
+        specs = get_query_specs(
+            normalized(
+                'SELECT * FROM "users_user" WHERE UPPER("users_user"."email"::text) = UPPER(%s)'
+                ' AND "users_user"."last_login" IS NULL AND "users_user"."first_name" = %s'
+            )
+        )
+
+        self.assertIn(IndexSpec("users_user", expression=("UPPER", "email")), specs)
+        self.assertIn(IndexSpec("users_user", ("first_name",), condition=(("last_login", True),)), specs)
+
+    def test_advise(self):
+        """Indexes should be recommended by recorded time, skipping ones existing indexes cover."""
+
+        queries = [
+            RecordedQuery(
+                normalized(
+                    'SELECT * FROM "users_user" WHERE "users_user"."is_active" = %s'
+                    ' ORDER BY "users_user"."date_joined" DESC LIMIT 20'
+                ),
+                calls=10,
+                total_ms=50,
+            ),
+            RecordedQuery(
+                normalized('SELECT * FROM "users_user" WHERE "users_user"."is_active" = %s'), calls=5, total_ms=100
+            ),
+            RecordedQuery(
+                normalized('SELECT * FROM "users_user" WHERE "users_user"."last_name" = %s'), calls=1, total_ms=1
+            ),
+            # Covered by primary key, unique email, and the task claim index
+            RecordedQuery(
+                normalized(
+                    'SELECT * FROM "users_user" WHERE "users_user"."id" = %s ORDER BY CASE WHEN'
+                    ' ("users_user"."id" = %s) THEN 1 ELSE 0 END DESC, "users_user"."id" DESC LIMIT 1'
+                )
+            ),
+            RecordedQuery(
+                normalized(
+                    'SELECT * FROM "users_user" WHERE "users_user"."email" = %s ORDER BY "users_user"."last_name"'
+                )
+            ),
+            RecordedQuery(
+                normalized(
+                    'SELECT * FROM "core_taskrecord" WHERE "core_taskrecord"."queue" IN (%s)'
+                    ' AND "core_taskrecord"."status" = %s AND "core_taskrecord"."run_at" <= %s'
+                )
+            ),
+            # Not a project model
+            RecordedQuery(normalized('SELECT * FROM "auth_group" WHERE "auth_group"."id" > %s')),
+        ]
+
+        recommendations, _ = advise(queries)
+
+        self.assertEqual(
+            [recommendation.spec.columns for recommendation in recommendations],
+            [("is_active", "-date_joined"), ("last_name",)],
+        )
+        self.assertEqual(recommendations[0].calls, 15)
+        self.assertEqual(recommendations[0].total_ms, 150)
+        self.assertIs(recommendations[0].model, User)
+
+        index = recommendations[0].get_index()
+        self.assertEqual(index.fields, ["is_active", "-date_joined"])
+        self.assertLessEqual(len(index.name), 30)
+
+    def test_redundant_indexes(self):
+        """Non unique indexes leading a longer index should be redundant."""
+
+        indexes = [
+            ExistingIndex(IndexSpec("core_taskrecord", ("id",)), "id", unique=True),
+            ExistingIndex(IndexSpec("core_taskrecord", ("queue",)), "queue"),
+            ExistingIndex(IndexSpec("core_taskrecord", ("queue", "status")), "queue_status"),
+            ExistingIndex(IndexSpec("core_taskrecord", ("status",)), "status_1"),
+            ExistingIndex(IndexSpec("core_taskrecord", ("status",)), "status_2"),
+            ExistingIndex(IndexSpec("core_taskrecord", ("-run_at",)), "run_at"),
+            ExistingIndex(IndexSpec("core_taskrecord", ("run_at", "id")), "run_at_id"),
+        ]
+
+        redundant = find_redundant_indexes(indexes, TaskRecord)
+
+        self.assertEqual(
+            [(redundancy.index.name, redundancy.covered_by.name) for redundancy in redundant],
+            [("queue", "queue_status"), ("status_2", "status_1"), ("run_at", "run_at_id")],
+        )
+
+    def test_command(self):
+        """Command should read profiled queries or a log, and print a migration."""
+
+        with self.assertRaises(CommandError):
+            call_command("advise_indexes", stdout=StringIO())
+
+        sql, fingerprint = fingerprint_sql('SELECT * FROM "users_user" WHERE "users_user"."last_name" = %s')
+        QueryProfile.objects.create(fingerprint=fingerprint, sql=sql, calls=3, total_ms=12)
+
+        out = StringIO()
+        call_command("advise_indexes", "--migration", stdout=out)
+        output = out.getvalue()
+
+        self.assertIn("Analyzed 1 queries.", output)
+        self.assertIn("users.User: 3 calls, 12.0ms in 1 queries", output)
+        self.assertIn("migrations.AddIndex(", output)
+        self.assertIn("fields=['last_name']", output)
+
+        with tempfile.NamedTemporaryFile("w", suffix=".log") as log:
+            log.write(
+                "LOG:  duration: 4.5 ms  statement: "
+                'SELECT * FROM "users_user" WHERE "users_user"."first_name" = \'A\'\n'
+                'SELECT * FROM "users_user" WHERE "users_user"."first_name" = \'B\';\n'
+                "not a query\n"
+            )
+            log.flush()
+
+            out = StringIO()
+            call_command("advise_indexes", "--log", log.name, stdout=out)
+
+        self.assertIn("users.User: 2 calls, 4.5ms in 1 queries", out.getvalue())
+        self.assertIn("fields=['first_name']", out.getvalue())
@@ -0,0 +1,124 @@
+"""
+Tests for request timing instrumentation.
+"""
+
+from django.contrib.auth.models import Permission
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework import serializers
+
+from core.abstracts.serializers import ModelSerializerBase
+from core.abstracts.tests import TestsBase
+from core.instrumentation import get_timings, route_stats, timed_section, timing_request
+from core.middleware import RequestTimingMiddleware
+from users.models import User
+
+
+class TimedUserSerializer(ModelSerializerBase):
+    """Serializer used to check serializer timing."""
+
+    email = serializers.EmailField()
+
+    class Meta:
+        model = User
+        fields = ["id", "email"]
+
+
+class RequestTimingTests(TestsBase):
+    """Unit tests for request timing."""
+
+    def setUp(self):
+        User.objects.create_user(email="one@example.com")
+        route_stats.reset()
+
+    def tearDown(self):
+        route_stats.reset()
+
+    def test_timing_request(self):
+        """Queries and sections run in the block should be added to timings."""
+
+        self.assertIsNone(get_timings())
+
+        with timing_request() as timings:
+            self.assertIs(get_timings(), timings)
+
+            list(User.objects.all())
+            Permission.objects.count()
+            TimedUserSerializer(User.objects.all(), many=True).data
+
+            with timed_section("render"):
+                pass
+
+        self.assertIsNone(get_timings())
+        self.assertEqual(timings.db_queries, 3)
+        self.assertLength(timings.queries, 3)
+        self.assertIn("users_user", timings.queries[0][0])
+        self.assertEqual(set(timings.sections.keys()), {"serializer", "render"})
+        self.assertGreater(timings.total, 0)
+
+    def test_inactive(self):
+        """Queries and sections outside a timed block should not be recorded."""
+
+        with timed_section("render"):
+            list(User.objects.all())
+
+        self.assertIsNone(get_timings())
+
+    def test_sql_limit(self):
+        """Only the first queries should be kept for the log, all should be counted."""
+
+        with timing_request(sql_limit=2) as timings:
+            for _ in range(5):
+                User.objects.count()
+
+        self.assertEqual(timings.db_queries, 5)
+        self.assertLength(timings.queries, 2)
+
+    def test_middleware_server_timing(self):
+        """Responses should have a Server-Timing header with query counts."""
+
+        def view(request):
+            list(User.objects.all())
+            return HttpResponse(TimedUserSerializer(User.objects.first()).data["email"])
+
+        response = RequestTimingMiddleware(view)(RequestFactory().get("/"))
+
+        header = response["Server-Timing"]
+        self.assertStartsWith(header, "total;dur=")
+        self.assertIn("db;dur=", header)
+        self.assertIn('desc="2 queries"', header)
+        self.assertIn("serializer;dur=", header)
+
+        stats = route_stats.snapshot()["unresolved"]
+        self.assertEqual(stats["count"], 1)
+        self.assertEqual(stats["db_queries"], 2)
+        self.assertEqual(stats["response_bytes"], len(b"one@example.com"))
+
+    def test_route_stats(self):
+        """Requests should be aggregated by url name into latency buckets."""
+
+        for _ in range(3):
+            self.client.get(reverse("core:health"))
+
+        stats = route_stats.snapshot()["core:health"]
+
+        self.assertEqual(stats["count"], 3)
+        self.assertEqual(sum(stats["buckets"].values()), 3)
+        self.assertEqual(stats["avg_db_queries"], 0)
+
+    @override_settings(REQUEST_TIMING={"SLOW_REQUEST_MS": 0, "SERVER_TIMING": False})
+    def test_slow_request_log(self):
+        """Slow requests should be logged with their SQL."""
+
+        def view(request):
+            User.objects.count()
+            return HttpResponse()
+
+        with self.assertLogs("core.instrumentation", level="WARNING") as logs:
+            response = RequestTimingMiddleware(view)(RequestFactory().get("/slow/"))
+
+        self.assertNotIn("Server-Timing", response)
+        self.assertIn("Slow request GET /slow/", logs.output[0])
+        self.assertIn("1 queries", logs.output[0])
+        self.assertIn("COUNT(*)", logs.output[0])
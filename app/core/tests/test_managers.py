@@ -0,0 +1,316 @@
+"""
+Tests for the abstract model manager.
+"""
+
+from unittest.mock import patch
+
+from django.db.models import F
+
+from core.abstracts.models import QuerySetBase
+from core.abstracts.tests import TestsBase
+from users.models import User
+
+
+class ManagerBaseTests(TestsBase):
+    """Unit tests for ManagerBase query methods."""
+
+    def setUp(self):
+        self.user_1 = User.objects.create_user(email="one@example.com", first_name="Alex", last_name="Smith")
+        self.user_2 = User.objects.create_user(email="two@example.com", first_name="Alex", last_name="Jones")
+        self.user_3 = User.objects.create_user(email="three@example.com", first_name="Sam", last_name="Jones")
+
+    def test_filter_one_narrows_by_matching_fields(self):
+        """Should narrow results by each field that matches a row."""
+
+        self.assertEqual(User.objects.filter_one(first_name="Alex", last_name="Smith"), self.user_1)
+        self.assertEqual(User.objects.filter_one(first_name="Alex", last_name="Jones"), self.user_2)
+        self.assertEqual(User.objects.filter_one(first_name="Sam", last_name="Smith"), self.user_3)
+
+    def test_filter_one_skips_unmatched_fields(self):
+        """Fields that do not match any remaining rows should be ignored."""
+
+        self.assertEqual(User.objects.filter_one(first_name="Nobody", last_name="Smith"), self.user_1)
+        self.assertEqual(User.objects.filter_one(first_name="Alex", last_name="Nobody"), self.user_2)
+
+    def test_filter_one_no_match(self):
+        """Should return None if no fields match."""
+
+        self.assertIsNone(User.objects.filter_one(first_name="Nobody"))
+        self.assertIsNone(User.objects.filter_one())
+
+    def test_find_by_id(self):
+        """Should find a model by id, even if it is the only row."""
+
+        User.objects.exclude(id=self.user_1.id).delete()
+
+        self.assertEqual(User.objects.find_by_id(self.user_1.id), self.user_1)
+        self.assertIsNone(User.objects.find_by_id(self.user_1.id + 100))
+
+    def test_filter_one_single_query(self):
+        """Lookups should only use one query regardless of field count."""
+
+        with self.assertNumQueries(1):
+            User.objects.filter_one(first_name="Alex", last_name="Jones", email="two@example.com")
+
+        with self.assertNumQueries(1):
+            User.objects.find_by_id(self.user_3.id)
+
+
+class ManagerBaseBulkTests(TestsBase):
+    """Unit tests for ManagerBase bulk operations."""
+
+    def test_create_many(self):
+        """Should create models from dicts in batches."""
+
+        with self.assertNumQueries(2):
+            users = User.objects.create_many(
+                [{"email": f"user{i}@example.com"} for i in range(5)],
+                batch_size=3,
+            )
+
+        self.assertLength(users, 5)
+        self.assertEqual(User.objects.count(), 5)
+
+        for user in User.objects.all():
+            self.assertIsNotNone(user.date_joined)
+            self.assertIsNotNone(user.date_modified)
+
+    def test_upsert_many(self):
+        """Should insert new rows and update rows with conflicting unique fields."""
+
+        existing = User.objects.create_user(email="one@example.com", first_name="Old")
+
+        User.objects.upsert_many(
+            [
+                {"email": "one@example.com", "first_name": "New"},
+                {"email": "two@example.com", "first_name": "Other"},
+            ],
+            unique_fields=["email"],
+            update_fields=["first_name"],
+        )
+
+        updated = User.objects.get(email="one@example.com")
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(updated.id, existing.id)
+        self.assertEqual(updated.first_name, "New")
+        self.assertEqual(updated.date_joined, existing.date_joined)
+        self.assertGreater(updated.date_modified, existing.date_modified)
+
+    def test_upsert_partial(self):
+        """Upserting dicts should only update the given fields of existing rows."""
+
+        existing = User.objects.create_user(email="one@example.com", first_name="Old", last_name="Kept")
+        User.objects.filter(id=existing.id).update(is_staff=True)
+
+        User.objects.upsert_many([{"email": "one@example.com", "first_name": "New"}], unique_fields=["email"])
+
+        updated = User.objects.get(id=existing.id)
+        self.assertEqual(updated.first_name, "New")
+        self.assertEqual(updated.last_name, "Kept")
+        self.assertEqual(updated.password, existing.password)
+        self.assertTrue(updated.is_staff)
+
+        with self.assertRaises(AssertionError):
+            User.objects.upsert_many([User(email="one@example.com")], unique_fields=["email"])
+
+    def test_update_each(self):
+        """Should update each row with different values."""
+
+        user_1 = User.objects.create_user(email="one@example.com")
+        user_2 = User.objects.create_user(email="two@example.com")
+
+        with self.assertNumQueries(1):
+            count = User.objects.update_each({user_1.id: {"first_name": "Alex"}, user_2.id: {"first_name": "Sam"}})
+
+        self.assertEqual(count, 2)
+        self.assertEqual(User.objects.get(id=user_1.id).first_name, "Alex")
+        self.assertEqual(User.objects.get(id=user_2.id).first_name, "Sam")
+        self.assertGreater(User.objects.get(id=user_1.id).date_modified, user_1.date_modified)
+
+    def test_update_many(self):
+        """Should return models that were updated, even if no longer matching query."""
+
+        User.objects.create_user(email="one@example.com", first_name="Alex")
+        User.objects.create_user(email="two@example.com", first_name="Alex")
+
+        users = User.objects.update_many({"first_name": "Alex"}, first_name="Sam")
+
+        self.assertLength(users, 2)
+        self.assertEqual(User.objects.filter(first_name="Sam").count(), 2)
+
+    def test_delete_many(self):
+        """Should delete models in batches and return their ids."""
+
+        users = User.objects.create_many([{"email": f"user{i}@example.com", "is_staff": i < 3} for i in range(5)])
+        staff_ids = [user.id for user in User.objects.filter(is_staff=True)]
+
+        deleted_ids = User.objects.delete_many(batch_size=2, is_staff=True)
+
+        self.assertEqual(sorted(deleted_ids), sorted(staff_ids))
+        self.assertEqual(User.objects.count(), len(users) - 3)
+
+
+class ManagerBaseReturningTests(TestsBase):
+    """Unit tests for ManagerBase update and delete methods."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="one@example.com", first_name="Alex")
+
+    def test_update_one(self):
+        """Should update model and return it with new values."""
+
+        with self.assertNumQueries(3):
+            user = User.objects.update_one(self.user.id, first_name="Sam", last_name=F("first_name"))
+
+        self.assertEqual(user.first_name, "Sam")
+        self.assertEqual(user.last_name, "Alex")
+        self.assertIsNone(User.objects.update_one(self.user.id + 100, first_name="Sam"))
+
+    def test_delete_one(self):
+        """Should delete model and return it."""
+
+        user = User.objects.delete_one(self.user.id)
+
+        self.assertEqual(user.email, self.user.email)
+        self.assertFalse(User.objects.filter(id=self.user.id).exists())
+        self.assertIsNone(User.objects.delete_one(self.user.id))
+
+    @patch.object(User.objects, "returning_vendors", ("sqlite",))
+    def test_update_one_returning(self):
+        """Should update model in one query when the database supports RETURNING."""
+
+        with self.assertNumQueries(1):
+            user = User.objects.update_one(self.user.id, first_name="Sam", last_name=F("first_name"))
+
+        self.assertEqual(user.id, self.user.id)
+        self.assertEqual(user.email, self.user.email)
+        self.assertEqual(user.first_name, "Sam")
+        self.assertEqual(user.last_name, "Alex")
+        self.assertEqual(user.date_joined, self.user.date_joined)
+        self.assertGreater(user.date_modified, self.user.date_modified)
+        self.assertIsNone(User.objects.update_one(self.user.id + 100, first_name="Sam"))
+
+    @patch.object(User.objects, "returning_vendors", ("sqlite",))
+    def test_update_many_returning(self):
+        """Should return updated models using RETURNING."""
+
+        with self.assertNumQueries(1):
+            users = User.objects.update_many({"first_name": "Alex"}, first_name="Sam")
+
+        self.assertEqual(list(users), [self.user])
+
+    @patch.object(User.objects, "returning_vendors", ("sqlite",))
+    def test_delete_one_returning(self):
+        """Models with cascades should not be deleted with RETURNING."""
+
+        self.assertFalse(User.objects._can_fast_delete(User.objects.filter(id=self.user.id)))
+
+        user = User.objects.delete_one(self.user.id)
+
+        self.assertEqual(user.email, self.user.email)
+        self.assertFalse(User.objects.filter(id=self.user.id).exists())
+
+    def test_delete_returning_query(self):
+        """Should build models from rows returned by delete."""
+
+        users = User.objects._delete_returning(User.objects.filter(id=self.user.id))
+
+        self.assertEqual(users, [self.user])
+        self.assertEqual(users[0].date_joined, self.user.date_joined)
+        self.assertFalse(User.objects.filter(id=self.user.id).exists())
+
+
+class ManagerBaseIterTests(TestsBase):
+    """Unit tests for ManagerBase.iter_batches."""
+
+    def setUp(self):
+        User.objects.create_many(
+            [{"email": f"user{i}@example.com", "first_name": "Alex" if i % 2 else "Sam"} for i in range(7)]
+        )
+
+    def test_iter_batches(self):
+        """Should return all models in batches ordered by id."""
+
+        batches = list(User.objects.iter_batches(batch_size=3))
+
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+        self.assertEqual(
+            [user.id for batch in batches for user in batch],
+            list(User.objects.order_by("id").values_list("id", flat=True)),
+        )
+
+    def test_iter_batches_descending_filter(self):
+        """Should filter and order models descending."""
+
+        batches = list(User.objects.iter_batches({"first_name": "Alex"}, batch_size=2, order="-id"))
+
+        self.assertEqual(
+            [user.id for batch in batches for user in batch],
+            list(User.objects.filter(first_name="Alex").order_by("-id").values_list("id", flat=True)),
+        )
+
+    def test_iter_batches_non_unique_order(self):
+        """Should order by non unique fields without skipping ties."""
+
+        batches = list(User.objects.iter_batches(batch_size=2, order="first_name"))
+
+        self.assertEqual(
+            [user.id for batch in batches for user in batch],
+            list(User.objects.order_by("first_name", "id").values_list("id", flat=True)),
+        )
+
+    def test_iter_batches_queries(self):
+        """Each batch should be one query."""
+
+        with self.assertNumQueries(3):
+            for _ in User.objects.iter_batches(batch_size=3):
+                pass
+
+
+class ManagerBaseAsyncTests(TestsBase):
+    """Unit tests for ManagerBase async methods."""
+
+    async def test_async_crud(self):
+        """Should create, find, update, and delete models."""
+
+        user = await User.objects.acreate(email="one@example.com", first_name="Alex")
+
+        self.assertEqual(await User.objects.afind_by_id(user.id), user)
+        self.assertEqual(await User.objects.afind_one(email="nobody@example.com", first_name="Alex"), user)
+        self.assertEqual(await User.objects.aget_by_id(user.id), user)
+        self.assertEqual(await User.objects.afind(first_name="Alex"), [user])
+        self.assertIsNone(await User.objects.afind_one())
+
+        user = await User.objects.aupdate_one(user.id, first_name="Sam")
+        self.assertEqual(user.first_name, "Sam")
+
+        await User.objects.adelete_one(user.id)
+        self.assertIsNone(await User.objects.afind_by_id(user.id))
+
+
+class ManagerBaseCountTests(TestsBase):
+    """Unit tests for ManagerBase.estimated_count."""
+
+    def setUp(self):
+        User.objects.create_many([{"email": f"user{i}@example.com", "is_staff": i < 2} for i in range(5)])
+
+    def test_exact_count_fallback(self):
+        """Should count exactly when no estimate is available."""
+
+        self.assertEqual(User.objects.estimated_count(), 5)
+
+    @patch.object(QuerySetBase, "_table_estimate", return_value=5_000_000)
+    def test_estimated_count(self, patched_estimate):
+        """Should use table estimate for large unfiltered tables."""
+
+        with self.assertNumQueries(0):
+            self.assertEqual(User.objects.estimated_count(threshold=1000), 5_000_000)
+
+        self.assertEqual(User.objects.filter(is_staff=True).estimated_count(threshold=1000), 2)
+        self.assertEqual(User.objects.all()[:3].estimated_count(threshold=1000), 3)
+
+    @patch.object(QuerySetBase, "_table_estimate", return_value=500)
+    def test_estimated_count_threshold(self, patched_estimate):
+        """Should count exactly when estimate is under threshold."""
+
+        self.assertEqual(User.objects.estimated_count(threshold=1000), 5)
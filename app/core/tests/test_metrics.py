@@ -0,0 +1,156 @@
+"""
+Tests for multi-process Prometheus metrics.
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+from django.test import override_settings
+from django.urls import reverse
+
+from core.abstracts.tests import TestsBase
+from core.metrics import Counter, Gauge, Histogram, MetricsRegistry, MmapStore, registry
+
+
+class MetricsTests(TestsBase):
+    """Unit tests for metrics."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(METRICS={"ENABLED": True, "DIRECTORY": self.directory.name})
+        self.settings_override.enable()
+
+        self.registry = MetricsRegistry()
+        self.counter = Counter("jobs_total", "Jobs run.", ["queue"], registry=self.registry)
+        self.gauge = Gauge("queue_size", "Jobs waiting.", registry=self.registry)
+        self.histogram = Histogram("job_seconds", "Job time.", ["queue"], buckets=[0.1, 1], registry=self.registry)
+
+    def tearDown(self):
+        self.registry.reset()
+        self.settings_override.disable()
+        self.directory.cleanup()
+
+    def test_render(self):
+        """Metrics should be rendered in the Prometheus text format."""
+
+        self.counter.inc(queue="default")
+        self.counter.inc(2, queue="default")
+        self.counter.inc(queue='say "hi"')
+        self.gauge.set(5)
+        self.histogram.observe(0.05, queue="default")
+        self.histogram.observe(0.5, queue="default")
+        self.histogram.observe(5, queue="default")
+
+        output = self.registry.render()
+
+        self.assertIn("# TYPE jobs_total counter", output)
+        self.assertIn('jobs_total{queue="default"} 3', output)
+        self.assertIn('jobs_total{queue="say \\"hi\\""} 1', output)
+        self.assertIn(f'queue_size{{pid="{os.getpid()}"}} 5', output)
+        self.assertIn('job_seconds_bucket{queue="default",le="0.1"} 1', output)
+        self.assertIn('job_seconds_bucket{queue="default",le="1.0"} 2', output)
+        self.assertIn('job_seconds_bucket{queue="default",le="+Inf"} 3', output)
+        self.assertIn('job_seconds_sum{queue="default"} 5.55', output)
+        self.assertIn('job_seconds_count{queue="default"} 3', output)
+
+    def test_labels_required(self):
+        """Samples should need exactly the metric's labels."""
+
+        with self.assertRaises(ValueError):
+            self.counter.inc()
+
+        with self.assertRaises(ValueError):
+            self.counter.inc(queue="default", extra="1")
+
+    def test_disabled(self):
+        """Nothing should be written when metrics are disabled."""
+
+        with override_settings(METRICS={"ENABLED": False, "DIRECTORY": self.directory.name}):
+            self.counter.inc(queue="default")
+
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_processes_aggregated(self):
+        """Counters should be added up across processes, gauges only listed for live processes."""
+
+        def work():
+            self.counter.inc(5, queue="default")
+            self.gauge.set(10)
+
+        self.counter.inc(queue="default")
+
+        process = multiprocessing.get_context("fork").Process(target=work)
+        process.start()
+        process.join()
+
+        self.assertLength(os.listdir(self.directory.name), 2)
+
+        output = self.registry.render()
+
+        self.assertIn('jobs_total{queue="default"} 6', output)
+        self.assertNotIn(f'pid="{process.pid}"', output)
+
+    def test_store_grows(self):
+        """Store should grow past its initial size and keep values."""
+
+        path = os.path.join(self.directory.name, "1.db")
+        store = MmapStore(path)
+
+        for i in range(5000):
+            store.set(f"key-{i}", i)
+
+        store.close()
+
+        self.assertGreater(os.path.getsize(path), MmapStore.initial_size)
+
+        store = MmapStore(path)
+        store.inc("key-4999", 1)
+        self.assertEqual(store.get("key-4999"), 5000)
+        store.close()
+
+        values = dict(MmapStore.read(path))
+        self.assertEqual(len(values), 5000)
+        self.assertEqual(values["key-10"], 10)
+
+    def test_endpoint(self):
+        """Metrics endpoint should include request metrics recorded by middleware."""
+
+        registry.reset()
+        self.client.get(reverse("core:health"))
+
+        with override_settings(DEBUG=True):
+            response = self.client.get(reverse("core:metrics"))
+
+        registry.reset()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertStartsWith(response["Content-Type"], "text/plain")
+
+        content = response.content.decode()
+        self.assertIn('http_requests_total{method="GET",route="core:health",status="200"} 1', content)
+        self.assertIn('http_request_duration_seconds_count{route="core:health"} 1', content)
+        self.assertIn("process_resident_memory_bytes{pid=", content)
+
+    def test_endpoint_token(self):
+        """Metrics endpoint should need the token if one is set."""
+
+        with override_settings(METRICS={"ENABLED": True, "DIRECTORY": self.directory.name, "TOKEN": "secret"}):
+            url = reverse("core:metrics")
+
+            self.assertEqual(self.client.get(url).status_code, 403)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer secret").status_code, 200)
+
+        registry.reset()
+
+    def test_endpoint_no_token(self):
+        """Metrics endpoint should refuse scrapes without a configured token, unless debugging."""
+
+        url = reverse("core:metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        registry.reset()
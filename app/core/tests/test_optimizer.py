@@ -0,0 +1,156 @@
+"""
+Tests for the serializer queryset optimizer.
+"""
+
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from rest_framework import generics, serializers
+from rest_framework.test import APIRequestFactory
+
+from core.abstracts.serializers import ModelSerializerBase
+from core.abstracts.tests import TestsBase
+from core.abstracts.viewsets import OptimizedQuerySetMixin
+from core.optimizer import QueryOptimizer, optimize_queryset
+from core.pagination import EstimatedCountPagination
+from core.tests.test_serializers import UserSerializer
+from users.models import User
+
+
+class ContentTypeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ContentType
+        fields = ["id", "app_label", "model"]
+
+
+class PermissionSerializer(serializers.ModelSerializer):
+    content_type = ContentTypeSerializer()
+
+    class Meta:
+        model = Permission
+        fields = ["id", "name", "content_type"]
+
+
+class GroupSerializer(serializers.ModelSerializer):
+    permissions = PermissionSerializer(many=True)
+
+    class Meta:
+        model = Group
+        fields = ["id", "name", "permissions"]
+
+
+class UserGroupsSerializer(ModelSerializerBase):
+    created_at = serializers.DateTimeField(source="date_joined", read_only=True)
+    updated_at = serializers.DateTimeField(source="date_modified", read_only=True)
+    groups = GroupSerializer(many=True)
+
+    class Meta:
+        model = User
+        fields = ["id", "email", "groups", "created_at", "updated_at"]
+
+
+class UserListView(OptimizedQuerySetMixin, generics.ListAPIView):
+    queryset = User.objects.all().order_by("id")
+    serializer_class = UserGroupsSerializer
+    pagination_class = EstimatedCountPagination
+
+
+class QueryOptimizerTests(TestsBase):
+    """Unit tests for inferring queryset optimizations from serializers."""
+
+    def setUp(self):
+        permissions = list(Permission.objects.order_by("id")[:3])
+
+        for i in range(3):
+            group = Group.objects.create(name=f"Group {i}")
+            group.permissions.set(permissions[: i + 1])
+
+        groups = list(Group.objects.all())
+        for i in range(12):
+            user = User.objects.create(email=f"user{i}@example.com")
+            user.groups.set(groups[: i % 3 + 1])
+
+    def serialize(self, serializer_class, size: int):
+        queryset = optimize_queryset(User.objects.order_by("id")[:size], serializer_class())
+        return serializer_class(queryset, many=True).data
+
+    def test_plan(self):
+        """Should join forward relations, prefetch to-many relations, and limit columns."""
+
+        optimizer = QueryOptimizer.from_serializer(UserGroupsSerializer())
+        self.assertEqual(optimizer.select_related, set())
+        self.assertEqual(optimizer.get_only_fields(), ["date_joined", "date_modified", "email", "id"])
+
+        groups = optimizer.prefetch_related["groups"]
+        self.assertEqual(groups.get_only_fields(), ["id", "name"])
+
+        permissions = groups.prefetch_related["permissions"]
+        self.assertEqual(permissions.select_related, {"content_type"})
+        self.assertEqual(
+            permissions.get_only_fields(),
+            ["content_type", "content_type__app_label", "content_type__id", "content_type__model", "id", "name"],
+        )
+
+    def test_pk_related_fields(self):
+        """Primary key related fields should not join, many related should prefetch only pks."""
+
+        optimizer = QueryOptimizer.from_serializer(UserSerializer())
+
+        self.assertEqual(optimizer.select_related, set())
+        self.assertEqual(optimizer.prefetch_related["groups"].get_only_fields(), ["pk"])
+
+    def test_unknown_sources_load_full_model(self):
+        """Method fields should disable column limits for their model."""
+
+        class LabelSerializer(serializers.ModelSerializer):
+            label = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Permission
+                fields = ["id", "label"]
+
+            def get_label(self, obj):
+                return obj.codename
+
+        self.assertIsNone(QueryOptimizer.from_serializer(LabelSerializer()).get_only_fields())
+
+    def test_nested_query_count(self):
+        """Nested serializers should run a fixed number of queries."""
+
+        self.assertConstantQueries(lambda size: self.serialize(UserGroupsSerializer, size), sizes=(1, 5, 12), num=3)
+        self.assertConstantQueries(lambda size: self.serialize(UserSerializer, size), sizes=(1, 5, 12), num=2)
+
+        with self.assertRaises(AssertionError):
+            self.assertConstantQueries(
+                lambda size: UserGroupsSerializer(User.objects.all()[:size], many=True).data, sizes=(1, 5)
+            )
+
+    def test_optimized_output(self):
+        """Optimized queryset should serialize the same data."""
+
+        expected = UserGroupsSerializer(User.objects.order_by("id"), many=True).data
+        self.assertEqual(self.serialize(UserGroupsSerializer, 12), expected)
+
+    def test_viewset_mixin(self):
+        """Viewsets should apply optimizations for every page size."""
+
+        factory = APIRequestFactory()
+        view = UserListView.as_view()
+
+        def get_page(size: int):
+            res = view(factory.get("/users/", {"page_size": size}))
+            self.assertEqual(res.status_code, 200)
+            self.assertLength(res.data["results"], size)
+
+        self.assertConstantQueries(get_page, sizes=(1, 5, 10), num=4)
+
+    def test_viewset_sparse_fields(self):
+        """Requested fields should drop unneeded prefetches."""
+
+        factory = APIRequestFactory()
+        view = UserListView.as_view()
+
+        with self.assertNumQueries(2) as context:
+            res = view(factory.get("/users/", {"fields": "id,email", "page_size": 5}))
+
+        self.assertEqual(res.data["results"][0].keys(), {"id", "email"})
+        self.assertNotIn("date_joined", context.captured_queries[1]["sql"])
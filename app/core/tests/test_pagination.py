@@ -0,0 +1,81 @@
+"""
+Tests for api pagination classes.
+"""
+
+from django.db import connection
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from unittest.mock import patch
+
+from core.abstracts.models import QuerySetBase
+from core.abstracts.tests import AuthViewsTestsBase, TestsBase
+from core.pagination import EstimatedCountPagination, KeysetPagination
+from users.models import User
+
+
+class KeysetPaginationTests(TestsBase):
+    """Unit tests for keyset pagination."""
+
+    def setUp(self):
+        self.users = User.objects.create_many([{"email": f"user{i}@example.com"} for i in range(5)])
+        self.factory = APIRequestFactory()
+
+    def paginate(self, url: str):
+        paginator = KeysetPagination()
+        request = Request(self.factory.get(url))
+
+        with CaptureQueriesContext(connection) as context:
+            page = paginator.paginate_queryset(User.objects.all(), request)
+
+        return paginator, page, context.captured_queries
+
+    def test_pages(self):
+        """Should page through models by id, without offsets."""
+
+        ids = list(User.objects.order_by("-id").values_list("id", flat=True))
+
+        paginator, page, queries = self.paginate("/users/?page_size=2")
+        self.assertEqual([user.id for user in page], ids[:2])
+        self.assertLength(queries, 1)
+
+        paginator, page, queries = self.paginate(paginator.get_next_link())
+        self.assertEqual([user.id for user in page], ids[2:4])
+        self.assertIn(f"< {ids[1]}", queries[0]["sql"])
+        self.assertNotIn("OFFSET", queries[0]["sql"])
+
+
+@patch.object(QuerySetBase, "_table_estimate", return_value=5_000_000)
+class EstimatedCountPaginationTests(TestsBase):
+    """Unit tests for estimated count pagination."""
+
+    def setUp(self):
+        User.objects.create_many([{"email": f"user{i}@example.com"} for i in range(5)])
+        self.factory = APIRequestFactory()
+
+    def test_estimated_count(self, patched_estimate):
+        """Should report estimated count without counting rows."""
+
+        paginator = EstimatedCountPagination()
+        request = Request(self.factory.get("/users/?page_size=2"))
+
+        with self.assertNumQueries(1):
+            page = paginator.paginate_queryset(User.objects.order_by("id"), request)
+
+        self.assertLength(page, 2)
+        self.assertEqual(paginator.page.paginator.count, 5_000_000)
+
+
+class AdminPaginationTests(AuthViewsTestsBase):
+    """Admin changelists should not run a full count."""
+
+    @patch.object(QuerySetBase, "_table_estimate", return_value=5_000_000)
+    def test_user_changelist(self, patched_estimate):
+        """User changelist should render with estimated count."""
+
+        res = self.client.get(reverse("admin:users_user_changelist"))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.context["cl"].result_count, 5_000_000)
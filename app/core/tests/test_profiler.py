@@ -0,0 +1,152 @@
+"""
+Tests for the sampled SQL profiler.
+"""
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import override_settings
+from django.urls import path, reverse
+from rest_framework import serializers
+
+from core.abstracts.serializers import ModelSerializerBase
+from core.abstracts.tests import TestsBase
+from core.models import QueryProfile
+from core.profiler import fingerprint_sql, profiler, profiling_queries
+from users.models import User
+
+
+class ProfiledUserSerializer(ModelSerializerBase):
+    """Serializer used to check call sites."""
+
+    email = serializers.EmailField()
+
+    class Meta:
+        model = User
+        fields = ["id", "email"]
+
+
+def user_count(request):
+    return HttpResponse(str(User.objects.count()))
+
+
+urlpatterns = [path("users/count/", user_count, name="user-count")]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class QueryProfilerTests(TestsBase):
+    """Unit tests for SQL profiler."""
+
+    def setUp(self):
+        profiler.reset()
+        self.user = User.objects.create_user(email="one@example.com")
+
+    def tearDown(self):
+        profiler.reset()
+
+    def test_fingerprint(self):
+        """Queries differing only by values should have the same fingerprint."""
+
+        sql_1, fingerprint_1 = fingerprint_sql("SELECT * FROM t1 WHERE id IN (%s, %s) AND name = 'a'")
+        sql_2, fingerprint_2 = fingerprint_sql("SELECT *  FROM t1\nWHERE id IN (%s) AND name = 'it''s'")
+        _, fingerprint_3 = fingerprint_sql("SELECT * FROM t1 WHERE id = %s")
+
+        self.assertEqual(sql_1, "SELECT * FROM t1 WHERE id IN (...) AND name = ?")
+        self.assertEqual(sql_1, sql_2)
+        self.assertEqual(fingerprint_1, fingerprint_2)
+        self.assertNotEqual(fingerprint_1, fingerprint_3)
+
+        sql, _ = fingerprint_sql("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)")
+        self.assertEqual(sql, "INSERT INTO t (a, b) VALUES (?, ?), ...")
+
+    def test_call_sites(self):
+        """Queries should be recorded with their manager method, serializer, and project code."""
+
+        with profiling_queries():
+            User.objects.find_by_id(self.user.id)
+            ProfiledUserSerializer(User.objects.all(), many=True).data
+
+        self.assertEqual(profiler.flush(), 2)
+
+        sites = [site for profile in QueryProfile.objects.all() for site in profile.call_sites.keys()]
+        self.assertLength(sites, 2)
+        self.assertTrue(any("manager=UserManager.find_by_id" in site for site in sites))
+        self.assertTrue(any("serializer=ProfiledUserSerializer" in site for site in sites))
+        self.assertTrue(all("code=core/tests/test_profiler.py:" in site for site in sites))
+
+    def test_inactive(self):
+        """Queries outside a profiled block should not be recorded."""
+
+        User.objects.find_by_id(self.user.id)
+
+        self.assertEqual(profiler.flush(), 0)
+
+    def test_flush_merges(self):
+        """Flushing again should add to existing totals."""
+
+        for _ in range(2):
+            with profiling_queries():
+                User.objects.find_by_id(self.user.id)
+                User.objects.find_by_id(self.user.id)
+
+            profiler.flush()
+
+        profile = QueryProfile.objects.get()
+        self.assertEqual(profile.calls, 4)
+        self.assertEqual(sum(profile.call_sites.values()), 4)
+        self.assertGreaterEqual(profile.total_ms, profile.max_ms)
+
+    @override_settings(SQL_PROFILER={"EXPLAIN_THRESHOLD_MS": 0})
+    def test_explain(self):
+        """Plans should be captured for selects slower than the threshold."""
+
+        with profiling_queries():
+            User.objects.find_by_id(self.user.id)
+            User.objects.update_many({"id": self.user.id}, first_name="Sam")
+
+        profiler.flush()
+
+        self.assertTrue(QueryProfile.objects.exclude(sql__startswith="SELECT").exists())
+
+        for profile in QueryProfile.objects.all():
+            if profile.sql.startswith("SELECT"):
+                self.assertNotEqual(profile.plan, "")
+                self.assertNotIn("Could not explain", profile.plan)
+            else:
+                self.assertEqual(profile.plan, "")
+
+    @override_settings(SQL_PROFILER={"SAMPLE_RATE": 1, "FLUSH_INTERVAL": 0})
+    def test_middleware(self):
+        """Sampled requests should be profiled and flushed with their view name."""
+
+        self.client.get(reverse("user-count"))
+
+        self.assertTrue(QueryProfile.objects.filter(call_sites__icontains="view=user-count").exists())
+
+    @override_settings(SQL_PROFILER={"SAMPLE_RATE": 0})
+    def test_middleware_not_sampled(self):
+        """Requests should not be profiled when not sampled."""
+
+        self.client.get(reverse("user-count"))
+
+        self.assertEqual(profiler.flush(), 0)
+
+    def test_slow_queries_command(self):
+        """Command should report top queries by total time and count."""
+
+        with profiling_queries():
+            User.objects.find_by_id(self.user.id)
+
+        out = StringIO()
+        call_command("slow_queries", "--flush", "--reset", stdout=out)
+        output = out.getvalue()
+
+        self.assertIn("Top queries by total time:", output)
+        self.assertIn("Top queries by count:", output)
+        self.assertIn("manager=UserManager.find_by_id", output)
+        self.assertFalse(QueryProfile.objects.exists())
+
+        out = StringIO()
+        call_command("slow_queries", stdout=out)
+        self.assertIn("No queries recorded", out.getvalue())
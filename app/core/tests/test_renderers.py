@@ -0,0 +1,112 @@
+"""
+Tests for the JSON backends, renderer and parser.
+"""
+
+import io
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from uuid import uuid4
+from zoneinfo import ZoneInfo
+
+from django.test import override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+
+from core.abstracts.tests import TestsBase
+from core.renderers import JSONParser, JSONRenderer, JsonResponse
+from utils import json
+
+
+class JSONBackendTests(TestsBase):
+    """Unit tests for JSON backends."""
+
+    def setUp(self):
+        self.payload = {
+            "id": 1,
+            "uuid": uuid4(),
+            "name": "Ünïcode",
+            "balance": Decimal("10.25"),
+            "label": gettext_lazy("Active"),
+            "created_at": timezone.now(),
+            "duration": timedelta(seconds=5),
+            "nested": [{"value": None, "score": 2.5}],
+            "line": "a\u2028b",
+        }
+
+    def test_datetimes_match_drf(self):
+        """Datetimes should be formatted by DRF's encoder, with Z for UTC."""
+
+        payload = {
+            "utc": datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+            "offset": datetime(2024, 1, 2, 3, 4, 5, 120000, tzinfo=dt_timezone(timedelta(hours=2))),
+            "naive": datetime(2024, 1, 2, 3, 4, 5),
+            # Local mean time offsets have seconds, orjson rounds them to minutes
+            "historic": datetime(1900, 1, 1, tzinfo=ZoneInfo("Europe/Amsterdam")),
+            "date": date(2024, 1, 2),
+            "time": time(3, 4, 5, 999999),
+        }
+        expected = renderers.JSONRenderer().render(payload)
+
+        self.assertIn(b'"2024-01-02T03:04:05.123456Z"', expected)
+
+        for name in json.BACKENDS.keys():
+            with self.subTest(backend=name), override_settings(JSON_BACKEND=name):
+                self.assertEqual(JSONRenderer().render(payload), expected)
+
+    def test_backends_match_drf(self):
+        """Every backend should render the same bytes as DRF's renderer."""
+
+        expected = renderers.JSONRenderer().render(self.payload)
+        # Integers larger than 64 bits are encoded by the stdlib
+        expected_big = renderers.JSONRenderer().render({"big": 2**70})
+
+        for name in json.BACKENDS.keys():
+            with self.subTest(backend=name), override_settings(JSON_BACKEND=name):
+                self.assertEqual(JSONRenderer().render(self.payload), expected)
+                self.assertEqual(JSONRenderer().render({"big": 2**70}), expected_big)
+
+    def test_round_trip(self):
+        """Encoded data should decode to the same values."""
+
+        for name, backend in json.BACKENDS.items():
+            with self.subTest(backend=name):
+                data = backend.loads(backend.dumps({"a": [1, 2.5, "ü", None, True]}, indent=True))
+                self.assertEqual(data, {"a": [1, 2.5, "ü", None, True]})
+
+    def test_default_backend(self):
+        """Auto should prefer orjson, unknown backends should raise."""
+
+        with override_settings(JSON_BACKEND="auto"):
+            self.assertEqual(json.get_backend().name, "orjson" if "orjson" in json.BACKENDS else "json")
+
+        with override_settings(JSON_BACKEND="unknown"), self.assertRaises(ValueError):
+            json.get_backend()
+
+    def test_parser(self):
+        """Parser should decode request bodies, and raise parse errors."""
+
+        parser = JSONParser()
+
+        self.assertEqual(parser.parse(io.BytesIO('{"name": "ü"}'.encode())), {"name": "ü"})
+        self.assertEqual(
+            parser.parse(io.BytesIO('{"name": "ü"}'.encode("utf-16")), parser_context={"encoding": "utf-16"}),
+            {"name": "ü"},
+        )
+
+        for body in (b"{invalid", b'{"value": NaN}'):
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                parser.parse(io.BytesIO(body))
+
+    def test_json_response(self):
+        """Response should encode dicts, and only allow other types if not safe."""
+
+        res = JsonResponse({"created_at": self.payload["created_at"]})
+
+        self.assertEqual(res["Content-Type"], "application/json")
+        self.assertEqual(json.loads(res.content), {"created_at": self.payload["created_at"].isoformat()[:-6] + "Z"})
+        self.assertEqual(JsonResponse([1], safe=False).content, b"[1]")
+
+        with self.assertRaises(TypeError):
+            JsonResponse([1])
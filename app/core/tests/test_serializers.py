@@ -0,0 +1,402 @@
+"""
+Tests for the abstract model serializer.
+"""
+
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_save
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.abstracts.serializers import ListSerializerBase, ModelListSerializerBase, ModelSerializerBase
+from core.abstracts.tests import TestsBase
+from core.optimizer import QueryOptimizer, optimize_queryset
+from core.registry import registry
+from users.models import User
+
+
+class UserSerializer(ModelSerializerBase):
+    created_at = serializers.DateTimeField(
+        source="date_joined", format=ModelSerializerBase.datetime_format, read_only=True
+    )
+    updated_at = serializers.DateTimeField(
+        source="date_modified", format=ModelSerializerBase.datetime_format, read_only=True
+    )
+
+    class Meta:
+        model = User
+        fields = ["id", "email", "first_name", "last_name", "is_staff", "groups", "created_at", "updated_at"]
+
+
+class PermissionSerializer(ModelSerializerBase):
+    class Meta:
+        model = Permission
+        fields = ["id", "name", "codename", "content_type"]
+
+
+class SerializerMetadataTests(TestsBase):
+    """Unit tests for serializer field name properties."""
+
+    def test_field_names(self):
+        """Should list fields by type."""
+
+        serializer = UserSerializer()
+
+        self.assertEqual(
+            serializer.readable_field_names,
+            ("id", "email", "first_name", "last_name", "is_staff", "groups", "created_at", "updated_at"),
+        )
+        self.assertEqual(serializer.writable_field_names, ("email", "first_name", "last_name", "is_staff", "groups"))
+        self.assertEqual(serializer.readonly_field_names, ("id", "created_at", "updated_at"))
+        self.assertEqual(serializer.unique_field_names, ("id", "email"))
+        self.assertEqual(serializer.related_field_names, ())
+        self.assertEqual(serializer.many_related_field_names, ("groups",))
+        self.assertEqual(serializer.any_related_field_names, ("groups",))
+        self.assertEqual(PermissionSerializer().related_field_names, ("content_type",))
+
+    def test_metadata_cached_per_class(self):
+        """Metadata should be computed once per serializer class."""
+
+        self.assertIs(UserSerializer().metadata, UserSerializer().metadata)
+        self.assertIsNot(UserSerializer().metadata, PermissionSerializer().metadata)
+
+    def test_dynamic_serializers(self):
+        """Serializers built at runtime should get their own metadata."""
+
+        def build_serializer(field_names):
+            meta = type("Meta", (), {"model": Permission, "fields": field_names})
+            return type("DynamicSerializer", (ModelSerializerBase,), {"Meta": meta})
+
+        self.assertEqual(build_serializer(["id", "name"])().readable_field_names, ("id", "name"))
+        self.assertEqual(build_serializer(["id", "codename"])().readable_field_names, ("id", "codename"))
+
+        serializer_class = build_serializer(["id", "name"])
+        serializer_class().metadata
+        serializer_class.Meta.fields = ["id"]
+        registry.invalidate(serializer_class)
+
+        self.assertEqual(serializer_class().readable_field_names, ("id",))
+
+    def test_get_fields_override_not_cached(self):
+        """Serializers that override get_fields should compute metadata per instance."""
+
+        class ContextSerializer(PermissionSerializer):
+            def get_fields(self):
+                fields = super().get_fields()
+
+                if not self.context.get("detail"):
+                    fields.pop("codename")
+
+                return fields
+
+        self.assertEqual(ContextSerializer().readable_field_names, ("id", "name", "content_type"))
+        self.assertEqual(
+            ContextSerializer(context={"detail": True}).readable_field_names,
+            ("id", "name", "codename", "content_type"),
+        )
+
+    def test_model_fields(self):
+        """Model field names should be stored once per model and options."""
+
+        fields = registry.model_fields(User)
+        editable_fields = registry.model_fields(User, exclude_read_only=True)
+
+        self.assertEqual(fields, tuple(field.name for field in User._meta.get_fields()))
+        self.assertIs(registry.model_fields(User), fields)
+        self.assertNotIn("date_joined", editable_fields)
+        self.assertIn("email", editable_fields)
+
+
+class ReadUserSerializer(ModelSerializerBase):
+    created_at = serializers.DateTimeField(
+        source="date_joined", format=ModelSerializerBase.datetime_format, read_only=True
+    )
+    updated_at = serializers.DateTimeField(
+        source="date_modified", format=ModelSerializerBase.datetime_format, read_only=True
+    )
+
+    class Meta:
+        model = User
+        fields = ["id", "email", "first_name", "last_name", "is_staff", "last_login", "created_at", "updated_at"]
+
+
+class CompiledReaderTests(TestsBase):
+    """Unit tests for compiled read serializers."""
+
+    def setUp(self):
+        for i in range(3):
+            User.objects.create(email=f"user{i}@example.com", first_name=f"User {i}", is_staff=i % 2 == 0)
+
+    def assertSameOutput(self, serializer_class, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        actual = JSONRenderer().render(serializer_class.read_many(queryset))
+
+        self.assertEqual(actual, expected)
+
+    def test_read_many(self):
+        """Compiled output should match the serializer exactly."""
+
+        self.assertIsNotNone(ReadUserSerializer.compile_reader())
+        self.assertSameOutput(ReadUserSerializer, User.objects.order_by("id"))
+
+    def test_read_many_related_pk(self):
+        """Primary key related fields should read the foreign key column."""
+
+        self.assertIsNotNone(PermissionSerializer.compile_reader())
+        self.assertSameOutput(PermissionSerializer, Permission.objects.order_by("id")[:20])
+
+    def test_read_many_single_query(self):
+        """Compiled reader should run one query selecting only the serializer's columns."""
+
+        with self.assertNumQueries(1) as context:
+            ReadUserSerializer.read_many(User.objects.all())
+
+        self.assertNotIn("password", context.captured_queries[0]["sql"])
+
+    def test_unsupported_fields_fall_back(self):
+        """Serializers with many related or method fields should use the normal serializer."""
+
+        class MethodSerializer(PermissionSerializer):
+            label = serializers.SerializerMethodField()
+
+            class Meta(PermissionSerializer.Meta):
+                fields = ["id", "label"]
+
+            def get_label(self, obj):
+                return obj.codename.upper()
+
+        self.assertIsNone(UserSerializer.compile_reader())
+        self.assertIsNone(MethodSerializer.compile_reader())
+        self.assertSameOutput(UserSerializer, User.objects.order_by("id"))
+        self.assertSameOutput(MethodSerializer, Permission.objects.order_by("id")[:5])
+
+
+class ContentTypeSerializer(ModelSerializerBase):
+    class Meta:
+        model = ContentType
+        fields = ["id", "app_label", "model"]
+
+
+class ExpandablePermissionSerializer(ModelSerializerBase):
+    class Meta:
+        model = Permission
+        fields = ["id", "name", "codename", "content_type"]
+        expandable_fields = {"content_type": ContentTypeSerializer}
+
+
+class SparseFieldsetTests(TestsBase):
+    """Unit tests for fields, omit and expand options."""
+
+    def setUp(self):
+        self.permission = Permission.objects.select_related("content_type").order_by("id").first()
+        self.content_type = self.permission.content_type
+
+    def test_fields(self):
+        """Should only include requested fields."""
+
+        data = ExpandablePermissionSerializer(self.permission, fields="id,name").data
+        self.assertEqual(data, {"id": self.permission.id, "name": self.permission.name})
+
+    def test_omit(self):
+        """Should exclude omitted fields."""
+
+        data = ExpandablePermissionSerializer(self.permission, omit=["codename", "content_type"]).data
+        self.assertEqual(data, {"id": self.permission.id, "name": self.permission.name})
+
+    def test_expand(self):
+        """Expanded fields should use the nested serializer, with nested fields."""
+
+        data = ExpandablePermissionSerializer(
+            self.permission, fields="id,content_type.model", expand="content_type"
+        ).data
+        self.assertEqual(data, {"id": self.permission.id, "content_type": {"model": self.content_type.model}})
+
+        data = ExpandablePermissionSerializer(self.permission).data
+        self.assertEqual(data["content_type"], self.content_type.id)
+
+    def test_query_params(self):
+        """Top level serializers should read options from the request."""
+
+        request = Request(APIRequestFactory().get("/", {"fields": "id,codename,content_type", "omit": "content_type"}))
+        serializer = ExpandablePermissionSerializer([self.permission], many=True, context={"request": request})
+
+        self.assertEqual(serializer.data, [{"id": self.permission.id, "codename": self.permission.codename}])
+        self.assertTrue(serializer.child.is_sparse)
+        self.assertFalse(ExpandablePermissionSerializer().is_sparse)
+
+    def test_write(self):
+        """Options should only select output fields, input is validated with all fields."""
+
+        request = Request(APIRequestFactory().post("/?fields=id&omit=email"))
+        serializer = UserWriteSerializer(data={"first_name": "Alex"}, context={"request": request})
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("email", serializer.errors)
+
+        serializer = UserWriteSerializer(data={"email": "one@example.com"}, context={"request": request})
+
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data, {"email": "one@example.com"})
+
+        user = serializer.save()
+        self.assertEqual(serializer.data, {"id": user.id})
+
+    def test_queryset_columns(self):
+        """Optimizer should only select requested columns, and only join expanded relations."""
+
+        serializer = ExpandablePermissionSerializer(fields="id,name")
+        self.assertEqual(QueryOptimizer.from_serializer(serializer).get_only_fields(), ["id", "name"])
+
+        serializer = ExpandablePermissionSerializer(fields="id,content_type.app_label", expand="content_type")
+        optimizer = QueryOptimizer.from_serializer(serializer)
+        self.assertEqual(optimizer.select_related, {"content_type"})
+        self.assertEqual(optimizer.get_only_fields(), ["content_type", "content_type__app_label", "id"])
+
+        with self.assertNumQueries(1) as context:
+            data = ExpandablePermissionSerializer(
+                optimize_queryset(Permission.objects.order_by("id")[:5], serializer),
+                many=True,
+                fields="id,content_type.app_label",
+                expand="content_type",
+            ).data
+
+        self.assertLength(data, 5)
+        self.assertNotIn("codename", context.captured_queries[0]["sql"])
+
+    def test_read_many(self):
+        """Compiled reader should respect sparse fieldsets."""
+
+        queryset = Permission.objects.order_by("id")[:5]
+
+        with self.assertNumQueries(1) as context:
+            data = ExpandablePermissionSerializer.read_many(queryset, fields="id,codename")
+
+        self.assertEqual(data, ExpandablePermissionSerializer(queryset, many=True, fields="id,codename").data)
+        self.assertNotIn("content_type", context.captured_queries[0]["sql"])
+
+
+class UserWriteSerializer(ModelSerializerBase):
+    class Meta:
+        model = User
+        fields = ["id", "email", "first_name"]
+        list_serializer_class = ModelListSerializerBase
+
+
+class GroupWriteSerializer(ModelSerializerBase):
+    class Meta:
+        model = Group
+        fields = ["id", "name"]
+        list_serializer_class = ModelListSerializerBase
+
+
+class BulkListSerializerTests(TestsBase):
+    """Unit tests for saving lists of models."""
+
+    def setUp(self):
+        self.user = User.objects.create(email="existing@example.com")
+
+    def test_list_serializer_class(self):
+        """Bulk list serializer should only be used when set in Meta."""
+
+        class DefaultSerializer(ModelSerializerBase):
+            class Meta:
+                model = User
+                fields = ["id", "email"]
+
+        self.assertIsInstance(UserWriteSerializer(many=True), ModelListSerializerBase)
+        self.assertIsInstance(DefaultSerializer(many=True), ListSerializerBase)
+        self.assertNotIsInstance(DefaultSerializer(many=True), ModelListSerializerBase)
+
+    def test_bulk_create(self):
+        """Should check unique fields with one query, and insert in bulk."""
+
+        data = [{"name": f"Group {i}"} for i in range(50)]
+        serializer = GroupWriteSerializer(data=data, many=True)
+
+        with self.assertNumQueries(1):
+            self.assertValidSerializer(serializer)
+
+        with self.assertNumQueries(1):
+            groups = serializer.save()
+
+        self.assertLength(groups, 50)
+        self.assertEqual(Group.objects.filter(name__startswith="Group").count(), 50)
+
+    def test_save_override(self):
+        """Models that override save() should be saved one at a time."""
+
+        data = [{"email": "one@example.com"}, {"email": "two@example.com"}]
+        serializer = UserWriteSerializer(data=data, many=True)
+        self.assertValidSerializer(serializer)
+
+        self.assertFalse(serializer.can_bulk_save(serializer.validated_data, "create"))
+
+        with self.assertNumQueries(2):
+            users = serializer.save()
+
+        self.assertLength(users, 2)
+        self.assertTrue(all(user.pk for user in users))
+
+    def test_save_receivers(self):
+        """Models with save signal receivers should be saved one at a time."""
+
+        received = []
+
+        def receiver(sender, instance, **kwargs):
+            received.append(instance.name)
+
+        post_save.connect(receiver, sender=Group)
+        self.addCleanup(post_save.disconnect, receiver, sender=Group)
+
+        serializer = GroupWriteSerializer(data=[{"name": "One"}, {"name": "Two"}], many=True)
+        self.assertValidSerializer(serializer)
+        serializer.save()
+
+        self.assertEqual(received, ["One", "Two"])
+
+    def test_unique_errors(self):
+        """Should report existing and repeated values per item, in the same shape as the default serializer."""
+
+        data = [
+            {"email": "new@example.com"},
+            {"email": "existing@example.com"},
+            {"email": "new@example.com"},
+            {"email": "invalid"},
+        ]
+        serializer = UserWriteSerializer(data=data, many=True)
+        default_serializer = serializers.ListSerializer(child=UserWriteSerializer(), data=data)
+
+        self.assertFalse(serializer.is_valid())
+        self.assertFalse(default_serializer.is_valid())
+
+        self.assertEqual(serializer.errors[0], {})
+        self.assertEqual(serializer.errors[1], default_serializer.errors[1])
+        self.assertEqual(serializer.errors[2], default_serializer.errors[1])
+        self.assertEqual(serializer.errors[3], default_serializer.errors[3])
+        self.assertEqual(serializer.errors[1]["email"][0].code, "unique")
+
+    def test_bulk_update(self):
+        """Should match items to models by id, and update in bulk."""
+
+        group = Group.objects.create(name="Existing")
+        other = Group.objects.create(name="Other")
+        data = [{"id": group.id, "name": "Existing"}, {"id": other.id, "name": "Changed"}]
+        serializer = GroupWriteSerializer(Group.objects.filter(id__in=[group.id, other.id]), data=data, many=True)
+        self.assertValidSerializer(serializer)
+
+        with self.assertNumQueries(1):
+            serializer.save()
+
+        group.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(group.name, "Existing")
+        self.assertEqual(other.name, "Changed")
+
+        serializer = GroupWriteSerializer(
+            Group.objects.filter(id=other.id), data=[{"id": other.id, "name": group.name}, {"id": 0}], many=True
+        )
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors[0]["name"][0].code, "unique")
+        self.assertEqual(list(serializer.errors[1].keys()), ["id"])
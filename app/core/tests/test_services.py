@@ -0,0 +1,90 @@
+"""
+Tests for the abstract service class.
+"""
+
+from core.abstracts.services import ServiceBase
+from core.abstracts.tests import TestsBase
+from core.identity import identity_map
+from users.models import User
+
+
+class UserService(ServiceBase[User]):
+    model = User
+    str_lookup = "email"
+
+
+class ServiceBaseTests(TestsBase):
+    """Unit tests for ServiceBase."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="one@example.com")
+
+    def test_init(self):
+        """Should resolve object from instance, id, or lookup string."""
+
+        self.assertEqual(UserService(self.user).obj, self.user)
+        self.assertEqual(UserService(self.user.id).obj, self.user)
+        self.assertEqual(UserService(str(self.user.id)).obj, self.user)
+        self.assertEqual(UserService(self.user.email).obj, self.user)
+
+    async def test_aload(self):
+        """Should resolve object with the async ORM."""
+
+        self.assertEqual((await UserService.aload(self.user.id)).obj, self.user)
+        self.assertEqual((await UserService.aload(self.user.email)).obj, self.user)
+
+    def test_many(self):
+        """Should load services for ids, lookups, and models with one query, in order."""
+
+        other = User.objects.create_user(email="two@example.com")
+
+        with self.assertNumQueries(1):
+            services = UserService.many(
+                [other.id, "one@example.com", str(self.user.id), other, 0, "missing@example.com"]
+            )
+
+        self.assertEqual([service.obj for service in services], [other, self.user, self.user, other, None, None])
+
+    def test_many_identity_map(self):
+        """Models in the identity map should not be queried again."""
+
+        with identity_map():
+            User.objects.find_by_id(self.user.id)
+
+            with self.assertNumQueries(0):
+                services = UserService.many([self.user.id])
+
+        self.assertEqual(services[0].obj, self.user)
+
+    def test_many_shared_models(self):
+        """Models added to the identity map should not carry extra attributes."""
+
+        with identity_map():
+            services = UserService.many([self.user.email])
+
+            with self.assertNumQueries(0):
+                user = User.objects.get_by_id(self.user.id)
+
+        self.assertIs(user, services[0].obj)
+        self.assertNotIn("_service_key", user.__dict__)
+
+    def test_lazy(self):
+        """Lazy services should only query when obj is accessed."""
+
+        with self.assertNumQueries(0):
+            service = UserService(self.user.email, lazy=True)
+
+        self.assertFalse(service.is_loaded)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(service.obj, self.user)
+            self.assertEqual(service.obj, self.user)
+
+        self.assertTrue(service.is_loaded)
+        self.assertTrue(UserService(self.user).is_loaded)
+
+    async def test_amany(self):
+        """Should load services in an async context."""
+
+        services = await UserService.amany([self.user.id, self.user.email])
+        self.assertEqual([service.obj for service in services], [self.user, self.user])
@@ -0,0 +1,83 @@
+"""
+Tests for streaming list responses.
+"""
+
+import json
+
+from django.contrib.auth.models import Group
+from rest_framework import generics
+from rest_framework.test import APIRequestFactory
+
+from core.abstracts.tests import TestsBase
+from core.abstracts.viewsets import OptimizedQuerySetMixin, StreamingListMixin
+from core.pagination import EstimatedCountPagination
+from core.streaming import iter_serialized
+from core.tests.test_optimizer import UserGroupsSerializer
+from core.tests.test_serializers import ReadUserSerializer
+from users.models import User
+
+
+class UserStreamView(StreamingListMixin, OptimizedQuerySetMixin, generics.ListAPIView):
+    queryset = User.objects.all().order_by("id")
+    serializer_class = UserGroupsSerializer
+    pagination_class = EstimatedCountPagination
+    stream_chunk_size = 2
+
+
+class StreamingTests(TestsBase):
+    """Unit tests for streaming serialized querysets."""
+
+    def setUp(self):
+        group = Group.objects.create(name="Group")
+
+        for i in range(5):
+            User.objects.create(email=f"user{i}@example.com").groups.add(group)
+
+        self.factory = APIRequestFactory()
+        self.view = UserStreamView.as_view()
+        self.expected = json.loads(json.dumps(UserGroupsSerializer(User.objects.order_by("id"), many=True).data))
+
+    def test_chunks(self):
+        """Should serialize in chunks, with compiled reader if possible."""
+
+        chunks = list(iter_serialized(User.objects.order_by("id"), UserGroupsSerializer, chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+
+        chunks = list(iter_serialized(User.objects.order_by("id"), ReadUserSerializer, chunk_size=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 2])
+        self.assertEqual(chunks[0] + chunks[1], ReadUserSerializer.read_many(User.objects.order_by("id")))
+
+    def test_stream_json(self):
+        """Should stream a JSON array matching the serializer."""
+
+        res = self.view(self.factory.get("/users/", {"stream": "json"}))
+        content = list(res.streaming_content)
+
+        self.assertEqual(res["Content-Type"], "application/json")
+        self.assertEqual(json.loads(b"".join(content)), self.expected)
+        self.assertLength(content, 5)
+
+    def test_stream_ndjson(self):
+        """Should stream one object per line."""
+
+        res = self.view(self.factory.get("/users/", HTTP_ACCEPT="application/x-ndjson"))
+        lines = b"".join(res.streaming_content).splitlines()
+
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertEqual([json.loads(line) for line in lines], self.expected)
+
+    def test_stream_empty(self):
+        """Empty querysets should stream an empty array."""
+
+        User.objects.all().delete()
+        res = self.view(self.factory.get("/users/", {"stream": "json"}))
+
+        self.assertEqual(b"".join(res.streaming_content), b"[]")
+
+    def test_not_streamed(self):
+        """Without stream options, lists should be paginated."""
+
+        res = self.view(self.factory.get("/users/"))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["count"], 5)
@@ -0,0 +1,202 @@
+"""
+Tests for background tasks and the durable queue.
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from core.abstracts.tests import TestsBase
+from core.models import TaskRecord
+from core.tasks import TASKS, TaskNotRegistered, Worker, executor, get_retry_delay, get_task, task
+from users.models import User
+
+calls = []
+
+
+@task
+def record_call(value):
+    calls.append(value)
+
+
+@task(max_retries=1)
+def fail_task():
+    raise ValueError("Task failed.")
+
+
+@task(queue="users")
+def create_user_task(email: str):
+    User.objects.create(email=email)
+
+
+def plain_function(value):
+    calls.append(value * 2)
+
+
+class TaskTests(TestsBase):
+    """Unit tests for task registration and deferred tasks."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_register(self):
+        """Tasks should be registered by import path, and callable inline."""
+
+        self.assertIs(TASKS["core.tests.test_tasks.record_call"], record_call)
+        self.assertIs(get_task("core.tests.test_tasks.record_call"), record_call)
+
+        record_call(1)
+        self.assertEqual(calls, [1])
+
+    def test_unregistered(self):
+        """Functions not decorated with @task should be refused."""
+
+        for name in ["core.tests.test_tasks.plain_function", "os.system", "core.tests.missing_task"]:
+            with self.subTest(name=name), self.assertRaises(TaskNotRegistered):
+                get_task(name)
+
+        self.assertNotIn("os.system", TASKS)
+
+    def test_defer(self):
+        """Deferred tasks should run after the transaction commits."""
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record_call.defer("deferred")
+            self.assertEqual(calls, [])
+
+        self.assertEqual(calls, ["deferred"])
+
+    @override_settings(TASKS={"EAGER": False, "THREADS": 2})
+    def test_thread_pool(self):
+        """Deferred tasks should run in the thread pool, errors should not propagate."""
+
+        try:
+            with self.assertLogs("core.tasks", level="ERROR"):
+                futures = [executor.submit(record_call, i) for i in range(5)]
+                futures.append(executor.submit(fail_task))
+
+                for future in futures:
+                    future.result(timeout=5)
+        finally:
+            executor.shutdown()
+
+        self.assertEqual(sorted(calls), [0, 1, 2, 3, 4])
+
+    def test_retry_delay(self):
+        """Retries should back off exponentially, up to the max."""
+
+        self.assertEqual(get_retry_delay(1), timedelta(seconds=2))
+        self.assertEqual(get_retry_delay(3), timedelta(seconds=8))
+        self.assertEqual(get_retry_delay(20), timedelta(seconds=3600))
+
+
+class TaskQueueTests(TestsBase):
+    """Unit tests for the durable queue and workers."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """Workers should run due tasks from their queues."""
+
+        record = record_call.enqueue("queued")
+        create_user_task.enqueue("worker@example.com")
+        record_call.enqueue("later", run_at=timezone.now() + timedelta(hours=1))
+
+        metrics = Worker().run(burst=True)
+
+        record.refresh_from_db()
+        self.assertEqual(record.status, TaskRecord.Status.SUCCEEDED)
+        self.assertEqual(record.attempts, 1)
+        self.assertEqual(calls, ["queued"])
+        self.assertEqual(metrics["succeeded"], 1)
+        self.assertFalse(User.objects.filter(email="worker@example.com").exists())
+
+        Worker(queues=["users"]).run(burst=True)
+        self.assertTrue(User.objects.filter(email="worker@example.com").exists())
+
+    def test_retry_and_fail(self):
+        """Failed tasks should be retried with backoff, then marked failed."""
+
+        record = fail_task.enqueue()
+        worker = Worker()
+
+        with self.assertLogs("core.tasks", level="WARNING"):
+            worker.run(burst=True)
+
+        record.refresh_from_db()
+        self.assertEqual(record.status, TaskRecord.Status.QUEUED)
+        self.assertGreater(record.run_at, timezone.now())
+        self.assertIn("Task failed.", record.error)
+
+        TaskRecord.objects.filter(id=record.id).update(run_at=timezone.now())
+        with self.assertLogs("core.tasks", level="ERROR"):
+            metrics = worker.run(burst=True)
+
+        record.refresh_from_db()
+        self.assertEqual(record.status, TaskRecord.Status.FAILED)
+        self.assertEqual(record.attempts, 2)
+        self.assertEqual((metrics["retried"], metrics["failed"]), (1, 1))
+
+    def test_unregistered_fails(self):
+        """Records naming an unregistered function should fail without running or retrying."""
+
+        record = TaskRecord.objects.create(name="core.tests.test_tasks.plain_function", args=[1], max_retries=3)
+
+        with self.assertLogs("core.tasks", level="ERROR"):
+            metrics = Worker().run(burst=True)
+
+        record.refresh_from_db()
+        self.assertEqual(record.status, TaskRecord.Status.FAILED)
+        self.assertIn("Unregistered task", record.error)
+        self.assertEqual(calls, [])
+        self.assertEqual(metrics["failed"], 1)
+
+    def test_claim(self):
+        """Claimed tasks should not be claimed by other workers, unless their lock expired."""
+
+        records = [record_call.enqueue(i) for i in range(3)]
+
+        first = TaskRecord.objects.claim("first", ["default"], limit=2)
+        second = TaskRecord.objects.claim("second", ["default"], limit=2)
+
+        self.assertEqual([record.id for record in first], [records[0].id, records[1].id])
+        self.assertEqual([record.id for record in second], [records[2].id])
+        self.assertEqual(TaskRecord.objects.claim("third", ["default"]), [])
+
+        TaskRecord.objects.filter(id=records[0].id).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual([record.id for record in TaskRecord.objects.claim("third", ["default"])], [records[0].id])
+
+    def test_stop_releases_tasks(self):
+        """Stopped workers should release claimed tasks they didn't run."""
+
+        records = [record_call.enqueue(i) for i in range(3)]
+        worker = Worker()
+
+        @task(name="stop_worker")
+        def stop_worker():
+            worker.stop()
+
+        stop_worker.enqueue(run_at=timezone.now() - timedelta(minutes=1))
+        worker.run()
+
+        self.assertEqual(worker.metrics["processed"], 1)
+
+        for record in records:
+            record.refresh_from_db()
+            self.assertEqual((record.status, record.attempts), (TaskRecord.Status.QUEUED, 0))
+
+    def test_run_worker_command(self):
+        """Command should run tasks and report metrics."""
+
+        for i in range(3):
+            record_call.enqueue(i)
+
+        out = StringIO()
+        call_command("run_worker", "--burst", stdout=out)
+
+        self.assertEqual(calls, [0, 1, 2])
+        self.assertIn("succeeded: 3", out.getvalue())
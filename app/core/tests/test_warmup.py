@@ -0,0 +1,42 @@
+"""
+Tests for worker warm-up.
+"""
+
+from django.template import engines
+from django.test import override_settings
+from django.urls import get_resolver
+
+from core.abstracts.tests import TestsBase
+from core.warmup import DEFAULTS, warm_up
+
+
+@override_settings(WARMUP={"FREEZE_GC": False})
+class WarmUpTests(TestsBase):
+    """Unit tests for worker warm-up."""
+
+    def test_warm_up(self):
+        """Warm-up should run every step, filling url and template caches."""
+
+        timings = warm_up(force=True)
+
+        self.assertEqual(list(timings.keys()), DEFAULTS["STEPS"])
+        self.assertTrue(get_resolver()._populated)
+
+        loader = engines["django"].engine.template_loaders[0]
+        self.assertIn("admin/login.html", {key.split("-")[0] for key in loader.get_template_cache})
+
+    @override_settings(WARMUP={"ENABLED": False, "FREEZE_GC": False})
+    def test_disabled(self):
+        """Warm-up should do nothing when disabled, unless forced."""
+
+        self.assertEqual(warm_up(), {})
+        self.assertNotEqual(warm_up(force=True), {})
+
+    @override_settings(WARMUP={"STEPS": ["missing", "urls"], "FREEZE_GC": False})
+    def test_failed_step(self):
+        """A failed step should be logged, and the others still run."""
+
+        with self.assertLogs("core.warmup", level="ERROR"):
+            timings = warm_up(force=True)
+
+        self.assertEqual(list(timings.keys()), ["urls"])
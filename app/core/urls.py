@@ -6,4 +6,5 @@ app_name = "core"
 urlpatterns = [
     path("", views.health_check, name="index"),
     path("health/", views.health_check, name="health"),
+    path("metrics/", views.metrics, name="metrics"),
 ]
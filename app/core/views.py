@@ -2,11 +2,15 @@
 Api Views for core app functionalities.
 """
 
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import exception_handler
 
+from core.metrics import get_metrics_setting, registry
+from core.renderers import JsonResponse
 from utils.logging import print_error
 
 
@@ -17,6 +21,21 @@ def health_check(request):
     return JsonResponse(payload, status=200)
 
 
+def metrics(request):
+    """
+    Prometheus metrics of all worker processes, see `core.metrics`.
+    Scrapes need the `METRICS["TOKEN"]` bearer token, without one metrics are only served when DEBUG is on.
+    """
+
+    token = get_metrics_setting("TOKEN")
+    if not token and not settings.DEBUG:
+        return JsonResponse({"status": 403, "message": "Metrics token is not configured."}, status=403)
+    elif token and not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return JsonResponse({"status": 403, "message": "Invalid metrics token."}, status=403)
+
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 def custom404(request, exception):
     """Custom 404 response."""
 
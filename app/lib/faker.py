@@ -7,10 +7,14 @@ Docs:
 - https://dev.to/ankitmalikg/python-generate-fake-data-with-faker-1ecj
 """
 
-from faker import Faker
+from django.utils.functional import SimpleLazyObject
 
+from utils.imports import lazy_import
 
-fake = Faker("en_US")
+faker = lazy_import("faker")
+
+# Loading locale providers is slow, only done when first used
+fake = SimpleLazyObject(lambda: faker.Faker("en_US"))
 
 
 def fake_words(count: int = 2):
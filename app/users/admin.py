@@ -5,6 +5,7 @@ Users admin config.
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
+from core.paginator import EstimatedCountPaginator
 from users.models import User
 
 
@@ -14,5 +15,8 @@ class UserAdmin(BaseUserAdmin):
     readonly_fields = BaseUserAdmin.readonly_fields + ("date_joined", "date_modified")
     ordering = ("email",)
 
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
 
 admin.site.register(User, UserAdmin)
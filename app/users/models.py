@@ -16,6 +16,8 @@ from core.abstracts.models import ManagerBase
 class UserManager(BaseUserManager, ManagerBase["User"]):
     """Manager for users."""
 
+    cacheable = True
+
     def create_user(self, email, password=None, **extra_fields) -> "User":
         """Create, save, and return a new user. Add user to base group."""
         if not email:
@@ -0,0 +1,125 @@
+"""
+Lazy imports for heavy optional dependencies.
+
+A lazily imported module is only executed when one of its attributes is
+first used, so management commands and workers that never use it don't pay
+for importing it. Profile import costs with `python manage.py import_profile`.
+
+Usage:
+```
+faker = lazy_import("faker")
+
+faker.Faker()  # faker is imported here
+```
+
+Modules that replace themselves in `sys.modules` when run, like
+`pygments.formatters`, can't be imported lazily, import them in the
+function that uses them instead.
+
+Class based views can be imported on their first request with `lazy_view`:
+```
+path("api/v1/schema/", lazy_view("drf_spectacular.views.SpectacularAPIView"))
+```
+
+Set the `LAZY_IMPORTS=0` environment variable to import modules right away,
+to surface import errors at startup. It is read from the environment, since
+these modules are imported while settings are loading.
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+from types import ModuleType
+from typing import Callable
+
+from django.utils.module_loading import import_string
+
+LAZY_MODULES: dict[str, ModuleType] = {}
+"""Modules imported with `lazy_import`, by name."""
+
+LAZY_VIEWS: list[Callable] = []
+"""Functions that import the views of `lazy_view`."""
+
+
+def is_lazy_enabled() -> bool:
+    return os.environ.get("LAZY_IMPORTS", "1").lower() not in ("0", "false", "no")
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Import module by name, deferring its execution until an attribute is used.
+
+    Parent packages are imported right away, and missing modules raise
+    ModuleNotFoundError here like a regular import.
+
+    Parameters
+    ----------
+        - name (str): Absolute module name, like "faker".
+    """
+    if name in sys.modules or not is_lazy_enabled():
+        return importlib.import_module(name)
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+
+    LAZY_MODULES[name] = module
+    return module
+
+
+def lazy_view(import_path: str, **initkwargs) -> Callable:
+    """
+    View that imports a DRF class based view on its first request.
+
+    Like `APIView.as_view()`, the view is exempt from Django's CSRF middleware,
+    DRF enforces CSRF for session authenticated requests itself.
+
+    Parameters
+    ----------
+        - import_path (str): Dotted path to the view class.
+        - initkwargs: Passed to the view's `as_view`.
+    """
+    view = None
+
+    def get_view() -> Callable:
+        nonlocal view
+        if view is None:
+            view = import_string(import_path).as_view(**initkwargs)
+
+        return view
+
+    def wrapper(request, *args, **kwargs):
+        return get_view()(request, *args, **kwargs)
+
+    wrapper.csrf_exempt = True
+    wrapper.__name__ = import_path.rpartition(".")[2]
+    wrapper.__qualname__ = wrapper.__name__
+
+    if not is_lazy_enabled():
+        get_view()
+
+    LAZY_VIEWS.append(get_view)
+    return wrapper
+
+
+def load_lazy_imports() -> int:
+    """Execute all lazily imported modules and views, returns the number loaded."""
+    for module in LAZY_MODULES.values():
+        # Any attribute access runs the module
+        module.__dict__
+
+    for get_view in LAZY_VIEWS:
+        get_view()
+
+    return len(LAZY_MODULES) + len(LAZY_VIEWS)
@@ -0,0 +1,107 @@
+"""
+Pluggable JSON encoding, uses orjson if installed and falls back to the stdlib.
+
+Values that aren't JSON types, like Decimals, timedeltas and lazy translation
+strings, are encoded the same way as the api's DRF encoder. orjson passes
+datetimes, dates and times to the DRF encoder too, instead of formatting them
+itself.
+
+orjson writes floats in exponent notation without a "+", like `1e16` instead
+of `1e+16`, and out of range floats as null instead of raising. Other output
+is the same bytes as the stdlib backend.
+
+Configured in settings.py as `JSON_BACKEND`, one of "auto", "orjson", or "json".
+"""
+
+import json
+from typing import Any
+
+from django.conf import settings
+from django.utils.functional import cached_property
+
+from utils.imports import lazy_import
+
+encoders = lazy_import("rest_framework.utils.encoders")
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class JSONBackend:
+    """Encode and decode with the stdlib json module."""
+
+    name = "json"
+
+    def dumps(self, obj: Any, indent=False) -> bytes:
+        """Encode obj as compact utf-8 JSON, or indented with 2 spaces."""
+        if indent:
+            return json.dumps(obj, cls=encoders.JSONEncoder, ensure_ascii=False, indent=2).encode()
+
+        return json.dumps(obj, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes | str) -> Any:
+        """Decode JSON, raises ValueError if invalid."""
+        return json.loads(data, parse_constant=_reject_constant)
+
+
+class OrjsonBackend(JSONBackend):
+    """
+    Encode and decode with orjson, falls back to the stdlib for values orjson doesn't support.
+    Datetimes, dates and times are passed through to the DRF encoder, to match its format.
+    """
+
+    name = "orjson"
+
+    @cached_property
+    def _default_encoder(self):
+        return encoders.JSONEncoder()
+
+    def _default(self, obj):
+        return self._default_encoder.default(obj)
+
+    def dumps(self, obj, indent=False):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            options |= orjson.OPT_INDENT_2
+
+        try:
+            return orjson.dumps(obj, default=self._default, option=options)
+        except orjson.JSONEncodeError:
+            # Integers larger than 64 bits, circular references
+            return super().dumps(obj, indent=indent)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+def _reject_constant(value: str):
+    raise ValueError(f"Out of range float values are not JSON compliant: {value}")
+
+
+BACKENDS: dict[str, JSONBackend] = {"json": JSONBackend()}
+if orjson is not None:
+    BACKENDS["orjson"] = OrjsonBackend()
+
+
+def get_backend() -> JSONBackend:
+    """Get the JSON backend from settings, "auto" uses the fastest installed backend."""
+    name = getattr(settings, "JSON_BACKEND", "auto")
+
+    if name == "auto":
+        return BACKENDS.get("orjson", BACKENDS["json"])
+    elif name not in BACKENDS:
+        raise ValueError(f"JSON backend {name} is not installed, options are: {', '.join(BACKENDS.keys())}.")
+
+    return BACKENDS[name]
+
+
+def dumps(obj: Any, indent=False) -> bytes:
+    """Encode obj as utf-8 JSON bytes with the configured backend."""
+    return get_backend().dumps(obj, indent=indent)
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode JSON with the configured backend, raises ValueError if invalid."""
+    return get_backend().loads(data)
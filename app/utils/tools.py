@@ -2,6 +2,7 @@ import logging
 import traceback
 
 from collections.abc import Iterable
+from itertools import islice
 from django.utils.module_loading import import_string
 
 from app.settings import TESTING
@@ -76,3 +77,19 @@ def clean_list(target: list):
     """Remove None values and empty strings from list."""
 
     return [item for item in target if item is not None and item != ""]
+
+
+def chunk_list(target: Iterable, size: int):
+    """
+    Split an iterable into lists of at most `size` items.
+
+    Parameters
+    ----------
+        - target (Iterable): Items to split, can be a generator.
+        - size (int): Max number of items in each chunk.
+    """
+
+    iterator = iter(target)
+
+    while chunk := list(islice(iterator, size)):
+        yield chunk
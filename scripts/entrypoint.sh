@@ -6,5 +6,8 @@ python manage.py collectstatic --no-input
 python manage.py wait_for_db
 python manage.py migrate
 
+## Clear metrics left by workers of the previous run
+rm -rf "${METRICS_DIR:-/tmp/metrics}"
+
 ## Run WSGI socket for NGINX
 uwsgi --socket :${PORT} --workers 4 --master --enable-threads --module app.wsgi